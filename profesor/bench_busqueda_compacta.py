@@ -0,0 +1,125 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Comparación de memoria: búsqueda ciega de SimpleAI vs busqueda_compacta
+#
+#    Mide con tracemalloc el pico de memoria y el tiempo de breadth_first, depth_first y limited_depth_first
+#    en problemas de ejemplo (Lights Out 4x4 en búsqueda de árbol y de grafo, y el 8-puzzle en búsqueda de
+#    grafo), y verifica que ambas implementaciones encuentren soluciones con el mismo costo.
+#
+#    Uso: python bench_busqueda_compacta.py [--scramble N] [--seed S]
+#---------------------------------------------------------------------------------------------------------------
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from simpleai.search import SearchProblem
+import simpleai.search as simpleai_search
+
+import busqueda_compacta
+
+#---------------------------------------------------------------------------------------------------------------
+#   Problemas de prueba
+#---------------------------------------------------------------------------------------------------------------
+
+class LightsOut(SearchProblem):
+    """ Lights Out 4x4 con estados como tuplas de 16 enteros (como en tareas/all_out_puzzle.ipynb). """
+
+    def actions(self, state):
+        return [(r, c) for r in range(4) for c in range(4)]
+
+    def result(self, state, action):
+        r, c = action
+        s = list(state)
+        for dr, dc in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+            rr, cc = r + dr, c + dc
+            if 0 <= rr < 4 and 0 <= cc < 4:
+                s[rr*4 + cc] = 1 - s[rr*4 + cc]
+        return tuple(s)
+
+    def is_goal(self, state):
+        return not any(state)
+
+
+class EightPuzzle(SearchProblem):
+    """ 8-puzzle: el estado es una tupla de 9 enteros (0 = hueco); la acción es la casilla que se mueve. """
+
+    GOAL = (1, 2, 3, 4, 5, 6, 7, 8, 0)
+
+    def actions(self, state):
+        e = state.index(0)
+        r, c = divmod(e, 3)
+        return [n for n, ok in ((e - 3, r > 0), (e + 3, r < 2), (e - 1, c > 0), (e + 1, c < 2)) if ok]
+
+    def result(self, state, action):
+        s = list(state)
+        e = s.index(0)
+        s[e], s[action] = s[action], 0
+        return tuple(s)
+
+    def is_goal(self, state):
+        return state == self.GOAL
+
+
+def scrambled_puzzle(moves, rng):
+    """ Regresa un 8-puzzle obtenido con movimientos al azar desde la meta. """
+    problem = EightPuzzle()
+    state = EightPuzzle.GOAL
+    for _ in range(moves):
+        state = problem.result(state, rng.choice(problem.actions(state)))
+    return state
+
+#---------------------------------------------------------------------------------------------------------------
+#   Programa
+#---------------------------------------------------------------------------------------------------------------
+
+def measure(search, problem, **kwargs):
+    """ Regresa (resultado, segundos, pico de memoria en bytes) de una búsqueda. """
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = search(problem, **kwargs)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara la memoria de la búsqueda ciega de SimpleAI.')
+    parser.add_argument('--scramble', type=int, default=40, help='movimientos al azar del 8-puzzle')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lights = (1, 0, 0, 0, 1, 1, 0, 0, 1, 1, 1, 1, 1, 0, 1, 0)
+    # Tablero que necesita 5 clics: con límite 4 la búsqueda en profundidad recorre todo el árbol
+    lights5 = (1, 1, 0, 1, 0, 1, 1, 0, 1, 1, 1, 1, 1, 0, 1, 1)
+    cases = [
+        ('Lights Out, árbol', 'breadth_first', LightsOut(lights), {'graph_search': False}),
+        ('Lights Out, árbol', 'limited_depth_first', LightsOut(lights5), {'depth_limit': 4}),
+        ('Lights Out, grafo', 'breadth_first', LightsOut(lights), {'graph_search': True}),
+        ('8-puzzle, grafo', 'breadth_first', EightPuzzle(scrambled_puzzle(args.scramble, rng)),
+         {'graph_search': True}),
+        ('8-puzzle, grafo', 'depth_first', EightPuzzle(scrambled_puzzle(args.scramble, rng)),
+         {'graph_search': True}),
+    ]
+
+    print('%-18s %-20s %6s %9s %11s   %6s %9s %11s %9s' % ('problema', 'algoritmo', 'costo', 'tiempo',
+                                                         'pico (MB)', 'costo', 'tiempo', 'pico (MB)', 'nodos'))
+    for name, algo, problem, kwargs in cases:
+        a, ta, ma = measure(getattr(simpleai_search, algo), problem, **kwargs)
+        # Las estadísticas se piden aparte para tenerlas también cuando no hay solución
+        stats = {}
+        b, tb, mb = measure(getattr(busqueda_compacta, algo), problem, stats=stats, **kwargs)
+        ca = '%d' % a.cost if a is not None else '-'
+        cb = '%d' % b.cost if b is not None else '-'
+        print('%-18s %-20s %6s %9.3f %11.2f   %6s %9.3f %11.2f %9d%s' % (
+            name, algo, ca, ta, ma / 2**20, cb, tb, mb / 2**20, stats['max_stored_nodes'],
+            '' if ca == cb else '   COSTO DISTINTO'))
+
+if __name__ == '__main__':
+    main()
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,98 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Comparación de A* (SimpleAI) con IDA* e IDDFS en el 8-puzzle
+#
+#    Para cada tablero revuelto reporta el costo, el tiempo, el pico de memoria (tracemalloc), los nodos
+#    expandidos y, para las búsquedas iterativas, el sobrecosto de re-expansión y los nodos en memoria.
+#
+#    Uso: python bench_busqueda_iterativa.py [--boards N] [--scramble M] [--seed S]
+#---------------------------------------------------------------------------------------------------------------
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from simpleai.search import astar
+from simpleai.search.viewers import BaseViewer
+
+from busqueda_iterativa import idastar, iterative_limited_depth_first
+from bench_busqueda_compacta import EightPuzzle, scrambled_puzzle
+
+#---------------------------------------------------------------------------------------------------------------
+#   Problema con heurística
+#---------------------------------------------------------------------------------------------------------------
+
+class EightPuzzleManhattan(EightPuzzle):
+    """ 8-puzzle con la distancia de Manhattan de cada ficha a su lugar como heurística. """
+
+    def cost(self, state, action, state2):
+        return 1
+
+    def heuristic(self, state):
+        h = 0
+        for i, v in enumerate(state):
+            if v:
+                r, c = divmod(i, 3)
+                gr, gc = divmod(v - 1, 3)
+                h += abs(r - gr) + abs(c - gc)
+        return h
+
+#---------------------------------------------------------------------------------------------------------------
+#   Programa
+#---------------------------------------------------------------------------------------------------------------
+
+def measure(search, problem):
+    """ Regresa (resultado, segundos, pico de memoria en bytes) de una búsqueda. """
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = search(problem)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara A* con IDA* e IDDFS en el 8-puzzle.')
+    parser.add_argument('--boards', type=int, default=5)
+    parser.add_argument('--scramble', type=int, default=60, help='movimientos al azar desde la meta')
+    parser.add_argument('--iddfs-max-depth', type=int, default=20, help='profundidad máxima de IDDFS')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    searches = [
+        ('A* (grafo)', lambda p: astar(p, graph_search=True)),
+        ('IDA* (árbol)', lambda p: idastar(p)),
+        ('IDA* (grafo)', lambda p: idastar(p, graph_search=True)),
+        ('IDDFS (grafo)', lambda p: iterative_limited_depth_first(p, graph_search=True,
+                                                                           max_depth=args.iddfs_max_depth)),
+    ]
+
+    rng = random.Random(args.seed)
+    print('%-8s %-14s %6s %9s %10s %10s %6s %10s %10s' % ('tablero', 'algoritmo', 'costo', 'tiempo', 'pico (KB)',
+                                                        'expandidos', 'iter', 're-expan.', 'en memoria'))
+    for k in range(args.boards):
+        problem = EightPuzzleManhattan(scrambled_puzzle(args.scramble, rng))
+        for name, search in searches:
+            result, elapsed, peak = measure(search, problem)
+            if result is None:
+                print('%-8d %-14s %6s %9.3f %10.1f   sin solución dentro del límite' % (k + 1, name, '-', elapsed,
+                                                                                     peak / 2**10))
+                continue
+            if hasattr(result, 'stats'):
+                s = result.stats
+                extra = '%10d %6d %10.2f %10d' % (s['expanded'], s['iterations'], s['reexpansion_overhead'],
+                                                  s['max_stored'])
+            else:
+                # Los nodos se cuentan en otra corrida: BaseViewer procesa toda la frontera en cada iteración
+                viewer = BaseViewer()
+                astar(problem, graph_search=True, viewer=viewer)
+                extra = '%10d %6s %10s %10s' % (viewer.stats['visited_nodes'], '', '', '')
+            print('%-8d %-14s %6d %9.3f %10.1f %s' % (k + 1, name, result.cost, elapsed, peak / 2**10, extra))
+
+if __name__ == '__main__':
+    main()
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
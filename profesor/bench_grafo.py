@@ -0,0 +1,70 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Búsqueda de rutas en redes de caminos grandes con psa_grafo
+#
+#    Construye una red de caminos al azar (bench_suite.road_graph) y la resuelve con breadth_first() y
+#    astar() de psa_grafo, que usan los arreglos CSR directamente. Con --simpleai-nodes también resuelve una
+#    red más chica con las funciones de SimpleAI y las de psa_grafo, y verifica que den el mismo costo.
+#
+#    Uso: python bench_grafo.py [--nodes N] [--simpleai-nodes M] [--seed S]
+#---------------------------------------------------------------------------------------------------------------
+
+import argparse
+import random
+import time
+
+import simpleai.search as simpleai_search
+
+import psa_grafo
+from psa_grafo import GraphSearchProblem
+from bench_suite import road_graph
+
+#---------------------------------------------------------------------------------------------------------------
+#   Programa
+#---------------------------------------------------------------------------------------------------------------
+
+def run(label, search, problem):
+    """ Corre una búsqueda e imprime su renglón de resultados; regresa el resultado. """
+    t0 = time.perf_counter()
+    result = search(problem, graph_search=True)
+    elapsed = time.perf_counter() - t0
+    if result is None:
+        print('%-38s %12s %8s %10.3f' % (label, '-', '-', elapsed))
+    else:
+        print('%-38s %12.2f %8d %10.3f' % (label, result.cost, len(result.path()) - 1, elapsed))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Busca rutas en redes de caminos grandes con psa_grafo.')
+    parser.add_argument('--nodes', type=int, default=100000, help='nodos de la red grande')
+    parser.add_argument('--simpleai-nodes', type=int, default=2000,
+                        help='nodos de la red que también se resuelve con SimpleAI (0 para omitirla)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print('%-38s %12s %8s %10s' % ('búsqueda', 'costo', 'aristas', 'tiempo (s)'))
+    if args.simpleai_nodes:
+        grafo, origen, destino, h = road_graph(args.simpleai_nodes, random.Random(args.seed))
+        problem = GraphSearchProblem(grafo, origen, destino, h)
+        for name in ('breadth_first', 'astar'):
+            a = run('SimpleAI %s (%d nodos)' % (name, len(grafo)), getattr(simpleai_search, name), problem)
+            b = run('psa_grafo %s (%d nodos)' % (name, len(grafo)), getattr(psa_grafo, name), problem)
+            if (a is None) != (b is None) or (a is not None and abs(a.cost - b.cost) > 1e-6):
+                print('COSTO DISTINTO')
+
+    t0 = time.perf_counter()
+    grafo, origen, destino, h = road_graph(args.nodes, random.Random(args.seed))
+    problem = GraphSearchProblem(grafo, origen, destino, h)
+    print('Red de %d nodos y %d aristas construida en %.1f s' % (len(grafo), len(grafo.destino),
+                                                                time.perf_counter() - t0))
+    for name in ('breadth_first', 'astar'):
+        result = run('psa_grafo %s (%d nodos)' % (name, len(grafo)), getattr(psa_grafo, name), problem)
+        if result is not None:
+            print('%38s expandidos: %d' % ('', result.stats['expanded']))
+
+if __name__ == '__main__':
+    main()
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
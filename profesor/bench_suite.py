@@ -0,0 +1,474 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Suite de benchmarks de búsqueda para los problemas del curso
+#
+#    Genera instancias escaladas de cinco familias de problemas y corre en cada una los algoritmos que le
+#    corresponden:
+#
+#      jarras:     N jarras con capacidades grandes (generaliza ProblemaDeLas3Jarras).
+#      grafo:      redes de caminos aleatorias (puntos en el plano unidos con sus vecinos más cercanos), con
+#                  GraphSearchProblem y la distancia en línea recta como heurística (como el Tour de Europa).
+#      lights-out: tableros de n x n revueltos con clics al azar (tareas/all_out.py); el óptimo se obtiene con
+#                  el solucionador GF(2).
+#      reinas:     N reinas con búsqueda local (como n_queens_problem_*.py).
+#      tsp:        agente viajero con vecindario 2-opt (como HC_TSP_10ciudades.ipynb).
+#
+#    Por cada corrida se registran los nodos expandidos (llamadas a actions()), nodos por segundo, el pico de
+#    memoria (tracemalloc, en una segunda corrida con la misma semilla), el tiempo a la primera solución (la
+#    primera vez que is_goal() fue verdadero) y la calidad de la solución (mejor costo conocido / costo, 1.0
+#    es lo mejor). Cuando el mejor costo conocido es 0 (los conflictos de reinas) la calidad es
+#    1 / (1 + costo), así que una corrida con 1 conflicto (0.5) se distingue de una con 20 (0.048). Los
+#    resultados se guardan en JSON; con --baseline se comparan con un archivo anterior.
+#
+#    Uso: python bench_suite.py [--size small|medium|large] [--families f1,f2] [--output archivo.json]
+#                               [--baseline anterior.json] [--time-limit S] [--no-memory] [--seed S]
+#---------------------------------------------------------------------------------------------------------------
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from simpleai.search import SearchProblem, astar, greedy
+from simpleai.search import hill_climbing, hill_climbing_random_restarts, simulated_annealing
+
+from psa_grafo import Grafo, GraphSearchProblem
+from busqueda_compacta import breadth_first
+from busqueda_iterativa import idastar
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tareas'))
+from all_out import BitboardAllOutProblem, GF2Solver, click_masks
+
+#---------------------------------------------------------------------------------------------------------------
+#   Problemas escalados
+#---------------------------------------------------------------------------------------------------------------
+
+class JarrasN(SearchProblem):
+    """
+        Problema de N jarras: la primera empieza llena y la meta es repartir su contenido a la mitad entre las
+        dos primeras, con las demás vacías. Una acción (i, j) vierte la jarra i en la j.
+    """
+
+    def __init__(self, capacities):
+        """ capacities: capacidades de las jarras (la primera es par). """
+        self.capacities = tuple(capacities)
+        n = len(capacities)
+        A = capacities[0]
+        self.goal_state = (A // 2, A // 2) + (0,)*(n - 2)
+        self.pairs = [(i, j) for i in range(n) for j in range(n) if i != j]
+        SearchProblem.__init__(self, (A,) + (0,)*(n - 1))
+
+    def actions(self, state):
+        return [(i, j) for i, j in self.pairs if state[i] > 0 and state[j] < self.capacities[j]]
+
+    def result(self, state, action):
+        i, j = action
+        amount = min(state[i], self.capacities[j] - state[j])
+        s = list(state)
+        s[i] -= amount
+        s[j] += amount
+        return tuple(s)
+
+    def is_goal(self, state):
+        return state == self.goal_state
+
+    def heuristic(self, state):
+        # Cada trasvase cambia dos jarras
+        return -(-sum(a != b for a, b in zip(state, self.goal_state)) // 2)
+
+
+class NQueens(SearchProblem):
+    """
+        N reinas para búsqueda local: el estado es la tupla del renglón de la reina de cada columna y una
+        acción (columna, renglón) mueve una reina. value() es el negativo del número de pares atacados.
+    """
+
+    goal_value = 0
+
+    def __init__(self, n, rng):
+        self.n = n
+        self.rng = rng
+        SearchProblem.__init__(self, self.generate_random_state())
+
+    def actions(self, state):
+        return [(c, r) for c in range(self.n) for r in range(self.n) if state[c] != r]
+
+    def result(self, state, action):
+        c, r = action
+        s = list(state)
+        s[c] = r
+        return tuple(s)
+
+    def conflicts(self, state):
+        k = 0
+        for i in range(self.n - 1):
+            for j in range(i + 1, self.n):
+                if state[i] == state[j] or j - i == abs(state[i] - state[j]):
+                    k += 1
+        return k
+
+    def value(self, state):
+        return -self.conflicts(state)
+
+    def is_goal(self, state):
+        return self.conflicts(state) == 0
+
+    def generate_random_state(self):
+        return tuple(self.rng.randrange(self.n) for _ in range(self.n))
+
+    def objective(self, state):
+        return self.conflicts(state)
+
+
+class TSP(SearchProblem):
+    """
+        Agente viajero para búsqueda local: el estado es una permutación de las ciudades y una acción (i, j)
+        invierte el tramo i..j (2-opt). value() es el negativo de la longitud del ciclo.
+    """
+
+    goal_value = None
+
+    def __init__(self, dist, rng):
+        self.dist = dist
+        self.n = len(dist)
+        self.rng = rng
+        SearchProblem.__init__(self, self.generate_random_state())
+
+    def actions(self, state):
+        return [(i, j) for i in range(self.n - 1) for j in range(i + 1, self.n)]
+
+    def result(self, state, action):
+        i, j = action
+        return state[:i] + state[i:j + 1][::-1] + state[j + 1:]
+
+    def length(self, state):
+        return sum(self.dist[state[i - 1]][state[i]] for i in range(self.n))
+
+    def value(self, state):
+        return -self.length(state)
+
+    def is_goal(self, state):
+        return False
+
+    def generate_random_state(self):
+        s = list(range(self.n))
+        self.rng.shuffle(s)
+        return tuple(s)
+
+    def objective(self, state):
+        return self.length(state)
+
+# Matriz de distancias de HC_TSP_10ciudades.ipynb
+TSP_10 = [
+    [0, 120, 250, 310, 180, 200, 270, 150, 340, 290],
+    [120, 0, 190, 220, 270, 150, 280, 200, 300, 250],
+    [250, 190, 0, 110, 160, 210, 140, 180, 90, 220],
+    [310, 220, 110, 0, 140, 180, 130, 150, 100, 200],
+    [180, 270, 160, 140, 0, 190, 170, 210, 120, 240],
+    [200, 150, 210, 180, 190, 0, 160, 120, 230, 210],
+    [270, 280, 140, 130, 170, 160, 0, 90, 150, 100],
+    [150, 200, 180, 150, 210, 120, 90, 0, 180, 160],
+    [340, 300, 90, 100, 120, 230, 150, 180, 0, 170],
+    [290, 250, 220, 200, 240, 210, 100, 160, 170, 0],
+]
+
+#---------------------------------------------------------------------------------------------------------------
+#   Generadores de instancias
+#---------------------------------------------------------------------------------------------------------------
+
+# Parámetros de cada familia por tamaño
+SIZES = {
+    'small': {'jarras': [(8, 5, 3), (12, 7, 5)], 'grafo': [200], 'lights-out': [(4, 6)], 'reinas': [8],
+              'tsp': [10]},
+    'medium': {'jarras': [(8, 5, 3), (16, 9, 7, 3), (24, 13, 11)], 'grafo': [200, 2000],
+               'lights-out': [(4, 6), (5, 5)], 'reinas': [8, 16], 'tsp': [10, 20]},
+    'large': {'jarras': [(16, 9, 7, 3), (40, 21, 17, 9), (64, 33, 29, 13, 5)], 'grafo': [2000, 20000],
+              'lights-out': [(5, 7), (6, 7)], 'reinas': [16, 32], 'tsp': [20, 40]},
+}
+
+# Vecinos más cercanos de cada punto en las redes de caminos
+ROAD_NEIGHBORS = 3
+
+def road_graph(n, rng):
+    """
+        Regresa (Grafo, origen, destino, heurística) de una red de n puntos al azar en un cuadrado de 1000 x
+        1000, cada uno unido (en ambos sentidos) con sus ROAD_NEIGHBORS vecinos más cercanos. La búsqueda de
+        vecinos usa una rejilla de celdas. El origen y el destino son puntos en esquinas opuestas.
+    """
+    points = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(n)]
+    cell = 1000 / max(1, int(math.sqrt(n / 2)))
+    grid = {}
+    for i, (x, y) in enumerate(points):
+        grid.setdefault((int(x // cell), int(y // cell)), []).append(i)
+
+    edges = []
+    for i, (x, y) in enumerate(points):
+        cx, cy = int(x // cell), int(y // cell)
+        near = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in grid.get((cx + dx, cy + dy), ()) if j != i]
+        near.sort(key=lambda j: (points[j][0] - x)**2 + (points[j][1] - y)**2)
+        for j in near[:ROAD_NEIGHBORS]:
+            edges.append((i, j, math.hypot(points[j][0] - x, points[j][1] - y)))
+
+    start = min(range(n), key=lambda i: points[i][0] + points[i][1])
+    goal = max(range(n), key=lambda i: points[i][0] + points[i][1])
+    gx, gy = points[goal]
+    heuristic = {str(i): math.hypot(x - gx, y - gy) for i, (x, y) in enumerate(points)}
+    return Grafo.from_edges(edges, dirigido=False), str(start), str(goal), heuristic
+
+
+def instances(family, size, seed):
+    """
+        Regresa la lista de instancias (nombre, tamaño, fábrica del problema, mejor costo conocido o None) de
+        una familia. La fábrica construye un problema nuevo para cada corrida.
+    """
+    rng = random.Random('%s-%s' % (family, seed))
+    result = []
+    for params in SIZES[size][family]:
+        if family == 'jarras':
+            result.append(('jarras-%s' % '-'.join(map(str, params)), len(params),
+                           lambda c=params: JarrasN(c), None))
+        elif family == 'grafo':
+            graph, start, goal, h = road_graph(params, rng)
+            result.append(('grafo-%d' % params, params,
+                           lambda g=graph, s=start, t=goal, h=h: GraphSearchProblem(g, s, t, h), None))
+        elif family == 'lights-out':
+            n, clicks = params
+            masks = click_masks(n, n)
+            state = 0
+            for k in rng.sample(range(n*n), clicks):
+                state ^= masks[k]
+            optimum = len(GF2Solver(n).solve(state))
+            result.append(('lights-out-%dx%d' % (n, n), n*n,
+                           lambda s=state, n=n: BitboardAllOutProblem(s, n), optimum))
+        elif family == 'reinas':
+            result.append(('reinas-%d' % params, params,
+                           lambda n=params, r=rng.random(): NQueens(n, random.Random(r)), 0))
+        elif family == 'tsp':
+            if params == 10:
+                dist = TSP_10
+            else:
+                pts = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(params)]
+                dist = [[round(math.hypot(a[0] - b[0], a[1] - b[1])) for b in pts] for a in pts]
+            result.append(('tsp-%d' % params, params, lambda d=dist, r=rng.random(): TSP(d, random.Random(r)),
+                           None))
+    return result
+
+#---------------------------------------------------------------------------------------------------------------
+#   Algoritmos por familia
+#---------------------------------------------------------------------------------------------------------------
+
+PATH_ALGORITHMS = [
+    ('bfs', lambda p: breadth_first(p, graph_search=True)),
+    ('greedy', lambda p: greedy(p, graph_search=True)),
+    ('astar', lambda p: astar(p, graph_search=True)),
+    ('idastar', lambda p: idastar(p, graph_search=True)),
+]
+
+LOCAL_ALGORITHMS = [
+    ('hill_climbing', lambda p: hill_climbing(p, iterations_limit=1000)),
+    ('hill_climbing_restarts', lambda p: hill_climbing_random_restarts(p, restarts_limit=10,
+                                                                       iterations_limit=1000)),
+    ('simulated_annealing', lambda p: simulated_annealing(p, iterations_limit=2000)),
+]
+
+ALGORITHMS = {'jarras': PATH_ALGORITHMS, 'grafo': PATH_ALGORITHMS, 'lights-out': PATH_ALGORITHMS,
+              'reinas': LOCAL_ALGORITHMS, 'tsp': LOCAL_ALGORITHMS}
+
+#---------------------------------------------------------------------------------------------------------------
+#   Medición
+#---------------------------------------------------------------------------------------------------------------
+
+class BudgetExceeded(Exception):
+    """ Se lanza dentro de actions() cuando una corrida excede su tiempo. """
+
+
+def instrument(problem, deadline):
+    """
+        Reemplaza actions() e is_goal() del problema por versiones que cuentan las expansiones, registran
+        el tiempo de la primera solución y cortan la búsqueda al pasar el tiempo límite. Regresa el
+        diccionario de contadores.
+    """
+    counters = {'expanded': 0, 'first_solution': None, 't0': time.perf_counter()}
+    actions = problem.actions
+    is_goal = problem.is_goal
+
+    def counted_actions(state):
+        counters['expanded'] += 1
+        if time.perf_counter() > deadline:
+            raise BudgetExceeded()
+        return actions(state)
+
+    def timed_is_goal(state):
+        found = is_goal(state)
+        if found and counters['first_solution'] is None:
+            counters['first_solution'] = time.perf_counter() - counters['t0']
+        return found
+
+    problem.actions = counted_actions
+    problem.is_goal = timed_is_goal
+    if getattr(problem, 'goal_value', None) is not None:
+        # En búsqueda local la meta se detecta al evaluar los estados
+        value = problem.value
+
+        def timed_value(state):
+            v = value(state)
+            if v >= problem.goal_value and counters['first_solution'] is None:
+                counters['first_solution'] = time.perf_counter() - counters['t0']
+            return v
+
+        problem.value = timed_value
+    return counters
+
+
+def run_once(make_problem, algorithm, time_limit, seed):
+    """ Corre un algoritmo y regresa (contadores, segundos, resultado o None, excedió el tiempo). """
+    random.seed(seed)
+    problem = make_problem()
+    t0 = time.perf_counter()
+    counters = instrument(problem, t0 + time_limit)
+    counters['t0'] = t0
+    try:
+        result = algorithm(problem)
+        exceeded = False
+    except BudgetExceeded:
+        result = None
+        exceeded = True
+    return problem, counters, time.perf_counter() - t0, result, exceeded
+
+
+def measure(family, name, size, make_problem, label, algorithm, time_limit, memory, seed):
+    """ Regresa el registro de una corrida (sin la calidad, que depende de las demás). """
+    problem, counters, elapsed, result, exceeded = run_once(make_problem, algorithm, time_limit, seed)
+    record = {
+        'family': family, 'instance': name, 'size': size, 'algorithm': label,
+        'expanded': counters['expanded'], 'elapsed': elapsed,
+        'nodes_per_sec': counters['expanded'] / elapsed if elapsed > 0 else None,
+        'time_to_first_solution': counters['first_solution'],
+        'status': 'timeout' if exceeded else ('no solution' if result is None else 'ok'),
+        'cost': None, 'peak_bytes': None,
+    }
+    if result is not None:
+        record['cost'] = problem.objective(result.state) if hasattr(problem, 'objective') else result.cost
+
+    if memory:
+        tracemalloc.start()
+        run_once(make_problem, algorithm, time_limit, seed)
+        record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return record
+
+
+def quality(cost, best):
+    """
+        Regresa la calidad de una corrida (1.0 es lo mejor), o None si no tuvo costo.
+
+        cost: costo de la solución de la corrida.
+        best: mejor costo conocido de la instancia (el óptimo, si se conoce).
+    """
+    if cost is None:
+        return None
+    if best > 0:
+        return best / cost
+    # Con óptimo 0 el cociente sería 0 para cualquier solución que no sea óptima
+    return 1.0 / (1.0 + cost - best)
+
+
+def git_commit():
+    """ Regresa el commit actual del repositorio, o None si no se puede obtener. """
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+#---------------------------------------------------------------------------------------------------------------
+#   Programa
+#---------------------------------------------------------------------------------------------------------------
+
+def compare(records, baseline_file):
+    """ Imprime el cambio de nodos por segundo y de calidad contra un archivo de resultados anterior. """
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {(r['family'], r['instance'], r['algorithm']): r for r in json.load(f)['results']}
+    print()
+    print('Comparación con %s' % baseline_file)
+    print('%-24s %-24s %14s %14s' % ('instancia', 'algoritmo', 'nodos/s (x)', 'calidad (dif.)'))
+    for r in records:
+        old = baseline.get((r['family'], r['instance'], r['algorithm']))
+        if old is None:
+            continue
+        speed = '%.2f' % (r['nodes_per_sec'] / old['nodes_per_sec']) if r['nodes_per_sec'] and \
+            old.get('nodes_per_sec') else '-'
+        quality = '%+.3f' % (r['quality'] - old['quality']) if r.get('quality') is not None and \
+            old.get('quality') is not None else '-'
+        print('%-24s %-24s %14s %14s' % (r['instance'], r['algorithm'], speed, quality))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de benchmarks de búsqueda para los problemas del curso.')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--families', default=','.join(ALGORITHMS), help='familias separadas por comas')
+    parser.add_argument('--output', default='bench_suite.json')
+    parser.add_argument('--baseline', help='archivo JSON de una corrida anterior para comparar')
+    parser.add_argument('--time-limit', type=float, default=30.0, help='segundos máximos por corrida')
+    parser.add_argument('--no-memory', action='store_true', help='no mide el pico de memoria')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    families = [f.strip() for f in args.families.split(',')]
+    for f in families:
+        if f not in ALGORITHMS:
+            parser.error('familia desconocida: %s' % f)
+
+    records = []
+    print('%-20s %-24s %10s %10s %12s %10s %10s %9s %8s' % ('instancia', 'algoritmo', 'expandidos', 'tiempo',
+                                                           'nodos/s', 'primera', 'pico (KB)', 'costo',
+                                                           'calidad'))
+    for family in families:
+        for name, size, make_problem, best_known in instances(family, args.size, args.seed):
+            group = [measure(family, name, size, make_problem, label, algorithm, args.time_limit,
+                             not args.no_memory, args.seed)
+                     for label, algorithm in ALGORITHMS[family]]
+
+            costs = [r['cost'] for r in group if r['cost'] is not None]
+            best = best_known if best_known is not None else (min(costs) if costs else None)
+            for r in group:
+                r['best_known'] = best
+                r['quality'] = quality(r['cost'], best)
+                print('%-20s %-24s %10d %10.4f %12s %10s %10s %9s %8s' % (
+                    name, r['algorithm'], r['expanded'], r['elapsed'],
+                    '%.0f' % r['nodes_per_sec'] if r['nodes_per_sec'] else '-',
+                    '%.4f' % r['time_to_first_solution'] if r['time_to_first_solution'] is not None else '-',
+                    '%.1f' % (r['peak_bytes'] / 2**10) if r['peak_bytes'] is not None else '-',
+                    '%g' % r['cost'] if r['cost'] is not None else r['status'],
+                    '%.3f' % r['quality'] if r['quality'] is not None else '-'))
+            records.extend(group)
+
+    report = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': records,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1, ensure_ascii=False)
+    print()
+    print('Resultados guardados en %s' % args.output)
+
+    if args.baseline:
+        compare(records, args.baseline)
+
+if __name__ == '__main__':
+    main()
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,239 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Búsqueda ciega con almacenamiento compacto de nodos
+#
+#    breadth_first() y depth_first() de SimpleAI crean un objeto SearchNode por cada estado generado y el
+#    camino de cada nodo es una cadena de objetos. Aquí los nodos no son objetos: cada estado se guarda una
+#    sola vez en una tabla (con un diccionario como índice para detectar repetidos) y los nodos son posiciones
+#    en arreglos paralelos (estado, padre, acción, costo y profundidad) de tipo array. El camino solo se
+#    reconstruye para la solución.
+#
+#    Las funciones reciben los mismos argumentos que las de SimpleAI y regresan un objeto con path() y cost,
+#    así que para usarlas basta con cambiar el import:
+#
+#        from busqueda_compacta import breadth_first, depth_first
+#
+#    Las estadísticas (nodos expandidos, frontera máxima, nodos y bytes guardados) quedan en result.stats; si
+#    no se encuentra la meta se pueden obtener con el argumento stats, un diccionario que se llena siempre:
+#
+#        stats = {}
+#        result = depth_first(problem, stats=stats)
+#
+#    Con graph_search=True se exploran los estados en el mismo orden que SimpleAI (un estado generado no se
+#    agrega si ya está en la frontera o ya fue expandido), por lo que la solución es la misma. En búsqueda de
+#    árbol en profundidad los nodos que quedan arriba del nodo que se saca de la pila ya no se usan y se
+#    descartan, así que en memoria solo quedan el camino actual y sus hermanos pendientes.
+#---------------------------------------------------------------------------------------------------------------
+
+from array import array
+
+#---------------------------------------------------------------------------------------------------------------
+#   Almacén de nodos
+#---------------------------------------------------------------------------------------------------------------
+
+class NodeStore(object):
+    """
+        Clase que guarda los estados (una vez cada uno) y los nodos de la búsqueda en arreglos paralelos.
+        Un nodo es un entero: su posición en los arreglos.
+    """
+
+    def __init__(self):
+        """ Constructor de la clase. Crea las tablas vacías. """
+        self.states = []            # estado de cada identificador de estado
+        self.index = {}             # estado -> identificador
+        self.actions = []           # acciones distintas (también se guardan una sola vez)
+        self.action_index = {}
+        self.node_state = array('q')
+        self.parent = array('q')
+        self.action = array('q')
+        self.cost = array('d')
+        self.depth = array('l')
+
+    def intern(self, state):
+        """ Regresa (identificador, es_nuevo) del estado, agregándolo a la tabla si no estaba. """
+        i = self.index.get(state)
+        if i is None:
+            i = len(self.states)
+            self.index[state] = i
+            self.states.append(state)
+            return i, True
+        return i, False
+
+    def intern_action(self, action):
+        """ Regresa el identificador de la acción; las acciones no hashables se guardan sin compartir. """
+        try:
+            a = self.action_index.get(action)
+        except TypeError:
+            self.actions.append(action)
+            return len(self.actions) - 1
+        if a is None:
+            a = len(self.actions)
+            self.action_index[action] = a
+            self.actions.append(action)
+        return a
+
+    def add(self, state_id, parent, action_id, cost, depth):
+        """ Agrega un nodo y regresa su número. """
+        self.node_state.append(state_id)
+        self.parent.append(parent)
+        self.action.append(action_id)
+        self.cost.append(cost)
+        self.depth.append(depth)
+        return len(self.parent) - 1
+
+    def truncate(self, n):
+        """ Descarta los nodos a partir del número n. """
+        for a in (self.node_state, self.parent, self.action, self.cost, self.depth):
+            del a[n:]
+
+    def __len__(self):
+        return len(self.parent)
+
+    def nbytes(self):
+        """ Bytes de los arreglos de nodos (sin contar los estados y acciones guardados). """
+        return sum(a.itemsize*len(a) for a in (self.node_state, self.parent, self.action, self.cost, self.depth))
+
+
+class CompactResult(object):
+    """
+        Clase con el resultado de una búsqueda: el nodo meta dentro de un NodeStore. Ofrece lo que usan las
+        funciones display() de los ejemplos (path() y cost), además de state, action, depth y stats.
+    """
+
+    def __init__(self, store, node, stats):
+        self.store = store
+        self.node = node
+        self.stats = stats
+        self.state = store.states[store.node_state[node]]
+        self.cost = store.cost[node]
+        self.depth = store.depth[node]
+        a = store.action[node]
+        self.action = store.actions[a] if a >= 0 else None
+
+    def path(self):
+        """ Camino (lista de tuplas (acción, estado)) desde la raíz hasta la meta. """
+        store = self.store
+        path = []
+        node = self.node
+        while node >= 0:
+            a = store.action[node]
+            path.append((store.actions[a] if a >= 0 else None, store.states[store.node_state[node]]))
+            node = store.parent[node]
+        return list(reversed(path))
+
+    def __repr__(self):
+        return 'Node <%s>' % str(self.state).replace('\n', ' ')
+
+#---------------------------------------------------------------------------------------------------------------
+#   Algoritmos de búsqueda
+#---------------------------------------------------------------------------------------------------------------
+
+def _finish(store, stats):
+    """ Agrega a las estadísticas los tamaños del almacén al terminar la búsqueda. """
+    stats['max_stored_nodes'] = max(stats['max_stored_nodes'], len(store))
+    stats['stored_nodes'] = len(store)
+    stats['stored_states'] = len(store.states)
+    stats['node_bytes'] = store.nbytes()
+    return stats
+
+
+def _search(problem, lifo, graph_search=False, depth_limit=None, viewer=None, stats=None):
+    """
+        Búsqueda ciega sobre un NodeStore. La frontera es un arreglo de números de nodo: en anchura se recorre
+        con un apuntador (los nodos se agregan en orden) y en profundidad es una pila.
+
+        problem: SearchProblem con actions(), result(), is_goal() y cost().
+        lifo: True para profundidad, False para anchura.
+        graph_search: si es True no se repiten estados.
+        depth_limit: profundidad máxima de expansión (None sin límite).
+        stats: diccionario opcional que se llena con las estadísticas, aunque no se encuentre la meta.
+    """
+    if viewer is not None:
+        raise ValueError('busqueda_compacta no usa viewers; las estadísticas están en result.stats')
+
+    store = NodeStore()
+    if stats is None:
+        stats = {}
+    stats.update(expanded=0, generated=1, max_fringe=1, max_stored_nodes=1)
+    # En árbol la pila siempre está ordenada por número de nodo: los nodos arriba del que se saca son
+    # descendientes de nodos ya expandidos y ninguno de la frontera los tiene como ancestros
+    discard = lifo and not graph_search
+
+    sid, _ = store.intern(problem.initial_state)
+    fringe = array('q', [store.add(sid, -1, -1, 0.0, 0)])
+    head = 0
+
+    while head < len(fringe):
+        if lifo:
+            node = fringe.pop()
+            if discard and len(store) > node + 1:
+                stats['max_stored_nodes'] = max(stats['max_stored_nodes'], len(store))
+                store.truncate(node + 1)
+        else:
+            node = fringe[head]
+            head += 1
+
+        state = store.states[store.node_state[node]]
+        if problem.is_goal(state):
+            return CompactResult(store, node, _finish(store, stats))
+
+        depth = store.depth[node]
+        if depth_limit is not None and depth >= depth_limit:
+            continue
+        stats['expanded'] += 1
+        cost = store.cost[node]
+        for action in problem.actions(state):
+            child = problem.result(state, action)
+            stats['generated'] += 1
+            cid, new = store.intern(child)
+            # Un estado que ya está en la tabla ya fue generado: está en la frontera o ya se expandió
+            if graph_search and not new:
+                continue
+            fringe.append(store.add(cid, node, store.intern_action(action),
+                                    cost + problem.cost(state, action, child), depth + 1))
+
+        if not lifo and head > 4096 and 2*head > len(fringe):
+            # Descarta la parte ya recorrida de la frontera de anchura
+            del fringe[:head]
+            head = 0
+        stats['max_fringe'] = max(stats['max_fringe'], len(fringe) - head)
+
+    _finish(store, stats)
+    return None
+
+
+def breadth_first(problem, graph_search=False, viewer=None, stats=None):
+    """
+        Búsqueda primero en anchura (como simpleai.search.breadth_first).
+
+        problem: SearchProblem.
+        graph_search: si es True no se exploran estados repetidos.
+        stats: diccionario opcional que se llena con las estadísticas, aunque no se encuentre la meta.
+    """
+    return _search(problem, False, graph_search, viewer=viewer, stats=stats)
+
+
+def depth_first(problem, graph_search=False, viewer=None, stats=None):
+    """
+        Búsqueda primero en profundidad (como simpleai.search.depth_first).
+
+        problem: SearchProblem.
+        graph_search: si es True no se exploran estados repetidos.
+        stats: diccionario opcional que se llena con las estadísticas, aunque no se encuentre la meta.
+    """
+    return _search(problem, True, graph_search, viewer=viewer, stats=stats)
+
+
+def limited_depth_first(problem, depth_limit, graph_search=False, viewer=None, stats=None):
+    """
+        Búsqueda primero en profundidad con límite (como simpleai.search.limited_depth_first).
+
+        problem: SearchProblem.
+        depth_limit: profundidad máxima.
+        graph_search: si es True no se exploran estados repetidos.
+        stats: diccionario opcional que se llena con las estadísticas, aunque no se encuentre la meta.
+    """
+    return _search(problem, True, graph_search, depth_limit, viewer, stats)
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,185 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Búsqueda por profundización iterativa: IDDFS e IDA*
+#
+#    Ambas hacen búsquedas en profundidad acotadas, cada vez con una cota mayor: la profundidad en IDDFS y
+#    f = g + h en IDA*. En memoria solo está el camino actual (una pila con el estado, su costo y el iterador
+#    de sus acciones), en lugar de toda la frontera como en breadth_first() o astar(), a cambio de volver a
+#    expandir los nodos de las iteraciones anteriores.
+#
+#    Con graph_search=True se usa además una tabla de transposiciones: en cada iteración guarda, para cada
+#    estado visitado, el menor valor acotado (profundidad o f) con el que se llegó a él, y poda los caminos
+#    que llegan al mismo estado sin mejorarlo. Su tamaño se limita con max_table.
+#
+#    Funcionan con cualquier SearchProblem que defina actions(), result(), is_goal(), cost() y (para IDA*)
+#    heuristic(), y se llaman como las de SimpleAI:
+#
+#        result = idastar(problem, graph_search=True)
+#        display(result)            # result.path() y result.cost
+#        print(result.stats)        # iteraciones, expansiones, sobrecosto de re-expansión y memoria máxima
+#---------------------------------------------------------------------------------------------------------------
+
+import math
+
+#---------------------------------------------------------------------------------------------------------------
+#   Resultado
+#---------------------------------------------------------------------------------------------------------------
+
+# Número máximo de estados en la tabla de transposiciones
+MAX_TABLE = 1000000
+
+class PathResult(object):
+    """
+        Clase con el resultado de una búsqueda iterativa. Ofrece lo que usan las funciones display() de los
+        ejemplos (path() y cost), además de state, action, depth y stats.
+    """
+
+    def __init__(self, path, cost, stats):
+        self._path = path
+        self.cost = cost
+        self.stats = stats
+        self.action, self.state = path[-1]
+        self.depth = len(path) - 1
+
+    def path(self):
+        """ Camino (lista de tuplas (acción, estado)) desde la raíz hasta la meta. """
+        return list(self._path)
+
+    def __repr__(self):
+        return 'Node <%s>' % str(self.state).replace('\n', ' ')
+
+#---------------------------------------------------------------------------------------------------------------
+#   Búsqueda en profundidad acotada
+#---------------------------------------------------------------------------------------------------------------
+
+_END = object()
+
+def _bounded_search(problem, bound, value, table, max_table, stats):
+    """
+        Búsqueda en profundidad de los nodos con value(state, g, depth) <= bound. Regresa (camino, costo) si
+        encuentra la meta, o (None, menor valor que excedió la cota) si no.
+
+        problem: SearchProblem.
+        bound: cota de la iteración.
+        value: función (state, g, depth) -> valor acotado.
+        table: diccionario de transposiciones (None si no se usa).
+        max_table: número máximo de estados en la tabla.
+        stats: diccionario de estadísticas que se actualiza.
+    """
+    root = problem.initial_state
+    if problem.is_goal(root):
+        return [(None, root)], 0
+    next_bound = math.inf
+    stack = [(root, 0, 0, iter(problem.actions(root)))]
+    actions = []
+    on_path = {root}
+    expanded = 1
+
+    while stack:
+        state, g, depth, it = stack[-1]
+        action = next(it, _END)
+        if action is _END:
+            stack.pop()
+            on_path.discard(state)
+            if actions:
+                actions.pop()
+            continue
+
+        child = problem.result(state, action)
+        stats['generated'] += 1
+        # Los ciclos en el camino actual nunca llevan a una solución mejor
+        if child in on_path:
+            continue
+        cg = g + problem.cost(state, action, child)
+        v = value(child, cg, depth + 1)
+        if v > bound:
+            if v < next_bound:
+                next_bound = v
+            continue
+        if table is not None:
+            seen = table.get(child)
+            if seen is not None and seen <= v:
+                continue
+            if seen is not None or len(table) < max_table:
+                table[child] = v
+
+        if problem.is_goal(child):
+            stats['expanded'] += expanded
+            stats['expanded_last'] = expanded
+            states = [s for s, _, _, _ in stack] + [child]
+            return list(zip([None] + actions + [action], states)), cg
+
+        stack.append((child, cg, depth + 1, iter(problem.actions(child))))
+        on_path.add(child)
+        actions.append(action)
+        expanded += 1
+        stored = len(stack) + (len(table) if table is not None else 0)
+        if stored > stats['max_stored']:
+            stats['max_stored'] = stored
+
+    stats['expanded'] += expanded
+    stats['expanded_last'] = expanded
+    return None, next_bound
+
+
+def _iterate(problem, value, first_bound, graph_search, max_bound, max_table):
+    """ Repite la búsqueda acotada con la cota siguiente hasta encontrar la meta o agotar el espacio. """
+    stats = {'iterations': 0, 'expanded': 0, 'generated': 0, 'expanded_last': 0, 'max_stored': 1,
+             'bounds': []}
+    bound = first_bound
+    while True:
+        stats['iterations'] += 1
+        stats['bounds'].append(bound)
+        table = {} if graph_search else None
+        path, cost = _bounded_search(problem, bound, value, table, max_table, stats)
+        if table is not None:
+            stats['max_table'] = max(stats.get('max_table', 0), len(table))
+        if path is not None or math.isinf(cost) or (max_bound is not None and cost > max_bound):
+            break
+        bound = cost
+
+    # Cuántas veces más se expandió que en la última iteración (lo que haría una sola búsqueda acotada)
+    stats['reexpansion_overhead'] = stats['expanded'] / max(stats['expanded_last'], 1)
+    # Nodos que una búsqueda con frontera habría guardado contra los que hubo a la vez en memoria
+    stats['memory_ratio'] = stats['generated'] / max(stats['max_stored'], 1)
+    if path is None:
+        return None
+    return PathResult(path, cost, stats)
+
+#---------------------------------------------------------------------------------------------------------------
+#   Algoritmos de búsqueda
+#---------------------------------------------------------------------------------------------------------------
+
+def iterative_limited_depth_first(problem, graph_search=False, viewer=None, max_depth=None, max_table=MAX_TABLE):
+    """
+        Búsqueda en profundidad con profundización iterativa (límites 0, 1, 2, ...). Encuentra la solución
+        con menos acciones.
+
+        problem: SearchProblem.
+        graph_search: si es True usa una tabla de transposiciones.
+        max_depth: profundidad máxima (None sin límite).
+        max_table: número máximo de estados en la tabla de transposiciones.
+    """
+    if viewer is not None:
+        raise ValueError('busqueda_iterativa no usa viewers; las estadísticas están en result.stats')
+    return _iterate(problem, lambda state, g, depth: depth, 0, graph_search, max_depth, max_table)
+
+
+def idastar(problem, graph_search=False, viewer=None, max_cost=None, max_table=MAX_TABLE):
+    """
+        IDA*: profundización iterativa sobre f = g + h. Con una heurística admisible encuentra la solución
+        de costo mínimo, como astar().
+
+        problem: SearchProblem con heuristic().
+        graph_search: si es True usa una tabla de transposiciones.
+        max_cost: cota máxima de f (None sin límite).
+        max_table: número máximo de estados en la tabla de transposiciones.
+    """
+    if viewer is not None:
+        raise ValueError('busqueda_iterativa no usa viewers; las estadísticas están en result.stats')
+    h = problem.heuristic
+    return _iterate(problem, lambda state, g, depth: g + h(state), h(problem.initial_state), graph_search,
+                    max_cost, max_table)
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,166 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Carrera de algoritmos de búsqueda en paralelo
+#
+#    Los scripts de ejemplo corren BFS, DFS y A* uno tras otro y construyen el problema para cada uno. race()
+#    construye el problema una vez y lanza cada algoritmo (o cada variante de heurística) en su propio
+#    proceso, hasta `workers` a la vez:
+#
+#      mode='all':   espera a todos y regresa la tabla comparativa.
+#      mode='first': el primero que encuentra una solución gana y los procesos que siguen corriendo se
+#                    terminan (quedan como 'cancelado').
+#
+#    Cada renglón de la tabla tiene el tiempo de la búsqueda, el tiempo desde el inicio de la carrera, los
+#    nodos expandidos (llamadas a actions()), el costo y la profundidad de la solución. Ejemplo:
+#
+#        rows = race(ProblemaDeLas3Jarras(8, 5, 3), [
+#            ('BFS', breadth_first, {'graph_search': True}),
+#            ('DFS', depth_first, {'graph_search': True}),
+#            ('A*', astar, {'graph_search': True}),
+#        ])
+#        print(format_table(rows))
+#
+#    Los algoritmos y problemas se envían a los procesos con pickle: deben ser funciones y clases definidas a
+#    nivel de módulo.
+#---------------------------------------------------------------------------------------------------------------
+
+import multiprocessing as mp
+import os
+import queue
+import time
+
+#---------------------------------------------------------------------------------------------------------------
+#   Procesos de la carrera
+#---------------------------------------------------------------------------------------------------------------
+
+# Segundos entre revisiones de los procesos mientras se esperan resultados
+POLL = 0.05
+
+def _count_expansions(problem):
+    """ Reemplaza problem.actions() por una versión que cuenta las llamadas; regresa el contador. """
+    counter = [0]
+    actions = problem.actions
+
+    def counted(state):
+        counter[0] += 1
+        return actions(state)
+
+    problem.actions = counted
+    return counter
+
+
+def _run(task_id, algorithm, problem, kwargs, results):
+    """ Corre una búsqueda en un proceso y pone su renglón de resultados en la cola. """
+    row = {'status': 'error', 'cost': None, 'depth': None, 'expanded': 0, 'elapsed': 0.0}
+    try:
+        counter = _count_expansions(problem)
+        t0 = time.perf_counter()
+        result = algorithm(problem, **kwargs)
+        row['elapsed'] = time.perf_counter() - t0
+        row['expanded'] = counter[0]
+        if result is None:
+            row['status'] = 'sin solución'
+        else:
+            row['status'] = 'ok'
+            row['cost'] = result.cost
+            row['depth'] = len(result.path()) - 1
+            row['path'] = result.path()
+    except Exception as e:
+        row['error'] = repr(e)
+    results.put((task_id, row))
+
+
+def race(problem, algorithms, mode='all', workers=None, timeout=None):
+    """
+        Corre varios algoritmos sobre un problema en procesos paralelos. Regresa la lista de renglones (un
+        diccionario por algoritmo, en el orden recibido) con label, status, cost, depth, expanded, elapsed
+        (segundos de la búsqueda), wall (segundos desde el inicio de la carrera) y path si hubo solución.
+
+        problem: SearchProblem que se usa en todos los algoritmos que no den el suyo.
+        algorithms: lista de tuplas (etiqueta, algoritmo), (etiqueta, algoritmo, kwargs) o
+                    (etiqueta, algoritmo, kwargs, problema) para comparar variantes de un problema (por
+                    ejemplo con otra heurística).
+        mode: 'all' para esperar a todos o 'first' para terminar cuando uno encuentre solución.
+        workers: número máximo de procesos a la vez. Por omisión es el número de CPUs en modo 'all' y el
+                 número de algoritmos en modo 'first' (todos deben estar corriendo para que sea una carrera).
+        timeout: segundos máximos de la carrera; los que sigan corriendo quedan como 'tiempo agotado'.
+    """
+    if mode not in ('all', 'first'):
+        raise ValueError("mode debe ser 'all' o 'first'")
+
+    tasks = []
+    rows = []
+    for spec in algorithms:
+        label, algorithm = spec[0], spec[1]
+        kwargs = spec[2] if len(spec) > 2 and spec[2] is not None else {}
+        task_problem = spec[3] if len(spec) > 3 else problem
+        tasks.append((algorithm, task_problem, kwargs))
+        rows.append({'label': label, 'status': 'pendiente', 'cost': None, 'depth': None, 'expanded': 0,
+                     'elapsed': None, 'wall': None})
+
+    if workers is None:
+        workers = len(tasks) if mode == 'first' else os.cpu_count() or 1
+    results = mp.Queue()
+    running = {}
+    pending = list(range(len(tasks)))
+    t0 = time.perf_counter()
+    winner = None
+
+    while pending or running:
+        # Lanza procesos hasta llenar los lugares disponibles
+        while pending and len(running) < workers and winner is None:
+            i = pending.pop(0)
+            algorithm, task_problem, kwargs = tasks[i]
+            p = mp.Process(target=_run, args=(i, algorithm, task_problem, kwargs, results), daemon=True)
+            p.start()
+            running[i] = p
+            rows[i]['status'] = 'corriendo'
+        if winner is not None:
+            break
+
+        if timeout is not None and time.perf_counter() - t0 >= timeout:
+            break
+        try:
+            i, row = results.get(timeout=POLL)
+        except queue.Empty:
+            # Un proceso que terminó con error sin poner su renglón (por ejemplo, sin memoria)
+            for i, p in list(running.items()):
+                if p.exitcode not in (None, 0):
+                    running.pop(i)
+                    rows[i].update(status='error', error='exit code %d' % p.exitcode,
+                                   wall=time.perf_counter() - t0)
+            continue
+        running.pop(i).join()
+        rows[i].update(row)
+        rows[i]['wall'] = time.perf_counter() - t0
+        if mode == 'first' and row['status'] == 'ok':
+            winner = i
+
+    # Termina los procesos que siguen corriendo
+    status = 'cancelado' if winner is not None else 'tiempo agotado'
+    for i, p in running.items():
+        p.terminate()
+        p.join()
+        rows[i]['status'] = status
+    for i in pending:
+        rows[i]['status'] = 'cancelado' if winner is not None else 'no iniciado'
+    results.close()
+    return rows
+
+
+def format_table(rows):
+    """ Regresa la tabla comparativa de race() como texto. """
+    lines = ['%-24s %-16s %10s %11s %10s %10s %6s' % ('algoritmo', 'estado', 'tiempo (s)', 'carrera (s)',
+                                                      'expandidos', 'costo', 'prof.')]
+    for r in rows:
+        lines.append('%-24s %-16s %10s %11s %10s %10s %6s' % (
+            r['label'], r['status'],
+            '%.4f' % r['elapsed'] if r['elapsed'] is not None else '-',
+            '%.4f' % r['wall'] if r['wall'] is not None else '-',
+            r['expanded'] if r['status'] == 'ok' or r['status'] == 'sin solución' else '-',
+            '%g' % r['cost'] if r['cost'] is not None else '-',
+            r['depth'] if r['depth'] is not None else '-'))
+    return '\n'.join(lines)
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
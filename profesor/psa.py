@@ -4,6 +4,8 @@
 
 from simpleai.search import SearchProblem, depth_first, breadth_first, uniform_cost, greedy, astar
 from simpleai.search.viewers import BaseViewer, ConsoleViewer, WebViewer
+#from busqueda_compacta import breadth_first, depth_first  # Nodos compactos (menos memoria, sin viewers)
+#from busqueda_iterativa import idastar, iterative_limited_depth_first  # Solo guardan el camino actual
 
 #-------------------------------------------------------------------------------
 #   Definición del problema
@@ -1,19 +1,23 @@
 #---------------------------------------------------------------------------------------------------------------
 #    Agente Solucionador de Problemas para el Tour de Europa
-#    Versión que utiliza condiciones para implementar las funciones
+#    Versión que utiliza una tabla (grafo en formato CSR cargado de europa.json) en lugar de condiciones
 #---------------------------------------------------------------------------------------------------------------
 
-from simpleai.search import SearchProblem, depth_first, breadth_first, uniform_cost, greedy, astar
+import os
+
+from simpleai.search import depth_first, breadth_first, uniform_cost, greedy, astar
 from simpleai.search.viewers import BaseViewer, ConsoleViewer, WebViewer
+from psa_grafo import Grafo, GraphSearchProblem
 
 #---------------------------------------------------------------------------------------------------------------
 #   Definición del problema del Tour de Europa
 #---------------------------------------------------------------------------------------------------------------
 
-class TourDeEuropa(SearchProblem):
+class TourDeEuropa(GraphSearchProblem):
     """ 
-        Clase utilizada para describir el problema del Tour de Europa. Los estados son representados 
-        por medio del nombre de de las ciudades europeas.
+        Clase utilizada para describir el problema del Tour de Europa. Las ciudades, los caminos entre
+        ellas con su distancia y la heurística hacia Cannes se leen del archivo europa.json; los estados
+        son los identificadores enteros de las ciudades (ver psa_grafo.GraphSearchProblem).
     """
 
     def __init__(self, origen, destino):
@@ -24,156 +28,32 @@ class TourDeEuropa(SearchProblem):
             destino: ciudad donde termina el tour
         """
         
-        # Llama al constructor de su superclase SearchProblem (estado inicial = ciudad de inicio).
-        SearchProblem.__init__(self, origen)
-
-        # Define el estado meta = ciudad de destino.
-        self.goal_state = destino
-
-    def actions(self, state):
-        """ 
-            Este método regresa una lista con las acciones legales que pueden ser ejecutadas de 
-            acuerdo con el estado especificado.
-            
-            state: ciudad actual.
-        """
-        if state == 'Paris':
-            actions = ['Burdeos','Estrasburgo']
-        elif state == 'Burdeos':
-            actions = ['Paris','San Sebastian','Lyon']
-        elif state == 'Estrasburgo':
-            actions = ['Paris','Lyon','Ginebra']
-        elif state == 'San Sebastian':
-            actions = ['Burdeos','Barcelona']
-        elif state == 'Lyon':
-            actions = ['Burdeos','Estrasburgo','Grenoble']
-        elif state == 'Ginebra':
-            actions = ['Estrasburgo','Cannes']
-        elif state == 'Barcelona':
-            actions = ['San Sebastian','Cannes']
-        elif state == 'Grenoble':
-            actions = ['Lyon','Cannes']
-        elif state == 'Cannes':
-            actions = ['Barcelona','Grenoble','Ginebra']
-        return actions
-
-    def result(self, state, action):
-        """ 
-            Este método regresa la ciudad vecina en la que terminaría el agente si se usa la acción. 
-
-            state: Una ciudad actual.
-            action: Acción de traslado especificada como (ciudad vecina, distancia).
-        """
-        return action
-
-    def is_goal(self, state):
-        """ 
-            Este método evalua si un estado es meta.
-
-            state: estado a ser evaluado
-        """
-        return state == self.goal_state
-        
-    def cost(self, state, action, state2):
-        """ 
-            Regresa el costo de aplicar la acción para trasladarse de state a state2.
+        # Llama al constructor de su superclase GraphSearchProblem con el grafo de las ciudades.
+        GraphSearchProblem.__init__(self, europa(), origen, destino)
 
-            state: Una ciudad origen.
-            action: trasladarse a una ciudad vecina, especificada como (ciudad vecina, distancia)
-            state2: Una ciudad vecina de la ciudad origen
-        """
-        if state == 'Paris':
-            if action == 'Burdeos':
-                return 300
-            elif action == 'Estrasburgo':
-                return 320
-        elif state == 'Burdeos':
-            if action == 'Paris':
-                return 300
-            elif action == 'San Sebastian':
-                return 250
-            elif action == 'Lyon':
-                return 350
-        elif state == 'Estrasburgo':
-            if action == 'Paris':
-                return 320
-            elif action == 'Lyon':
-                return 340
-            elif action == 'Ginebra':
-                return 510
-        elif state == 'San Sebastian':
-            if action == 'Burdeos':
-                return 250
-            elif action == 'Barcelona':
-                return 430
-        elif state == 'Lyon':
-            if action == 'Burdeos':
-                return 350
-            elif action == 'Estrasburgo':
-                return 340
-            elif action == 'Grenoble':
-                return 125
-        elif state == 'Ginebra':
-            if action == 'Estrasburgo':
-                return 510
-            elif action == 'Cannes':
-                return 630
-        elif state == 'Barcelona':
-            if action == 'San Sebastian':
-                return 430
-            elif action == 'Cannes':
-                return 485
-        elif state == 'Grenoble':
-            if action == 'Lyon':
-                return 125
-            elif action == 'Cannes':
-                return 680
-        elif state == 'Cannes':
-            if action == 'Barcelona':
-                return 485
-            elif action == 'Grenoble':
-                return 680
-            elif action == 'Ginebra':
-                return 630
-        
-    def heuristic(self, state):
-        """ 
-            Este método regresa un estimado de la distancia desde el estado a la meta.
+# El grafo se carga una sola vez y se comparte entre los problemas
+_europa = None
 
-            state: ciudad del nodo
-        """
-        if state == 'Paris':
-            return 1400
-        elif state == 'Burdeos':
-            return 1100
-        elif state == 'Estrasburgo':
-            return 1120
-        elif state == 'San Sebastian':
-            return 900
-        elif state == 'Lyon':
-            return 780
-        elif state == 'Ginebra':
-            return 630
-        elif state == 'Barcelona':
-            return 480
-        elif state == 'Grenoble':
-            return 680
-        elif state == 'Cannes':
-            return 0
+def europa():
+    global _europa
+    if _europa is None:
+        _europa = Grafo.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'europa.json'))
+    return _europa
 
 # Despliega la secuencia de estados y acciones obtenidas como resultado
 def display(result):
     if result is not None:
+        problem = result.problem
         for i, (action, state) in enumerate(result.path()):
             if action == None:
                 print('Configuración inicial')
             elif i == len(result.path()) - 1:
-                print(i,'- Después de moverse a', 'Ir a '+action)
+                print(i,'- Después de moverse a', problem.action_representation(action))
                 print('¡Meta lograda con costo = ', result.cost,'!')
             else:
-                print(i,'- Después de moverse a', 'Ir a '+action)
+                print(i,'- Después de moverse a', problem.action_representation(action))
 
-            print('  ', state)
+            print('  ', problem.state_representation(state))
     else:
         print('Mala configuración del problema')
 
@@ -0,0 +1,369 @@
+#---------------------------------------------------------------------------------------------------------------
+#    PSA genérico para problemas de rutas en grafos
+#
+#    El grafo se carga de un archivo (CSV o JSON) a una representación compacta CSR (compressed sparse row):
+#    los nodos se identifican con enteros 0..n-1 y las aristas que salen del nodo i ocupan las posiciones
+#    inicio[i]..inicio[i+1]-1 de los arreglos destino y costo. Así, actions() es O(1) (un rango de índices de
+#    aristas) y result(), cost() y heuristic() son accesos directos a arreglos, sin comparar cadenas.
+#
+#    GraphSearchProblem funciona con breadth_first, astar, etc. de SimpleAI, pero su búsqueda de grafo revisa
+#    toda la frontera cada vez que agrega un nodo, así que solo es práctica hasta unos miles de nodos (con
+#    20,000 nodos astar tarda minutos). Para redes de caminos con cientos de miles de nodos este módulo
+#    tiene breadth_first() y astar() propios, que usan los arreglos CSR directamente (una cola o un
+#    montículo y arreglos indexados por nodo) y regresan un resultado con path() y cost como los de SimpleAI
+#    (ver bench_grafo.py).
+#
+#    Formatos de archivo:
+#      CSV:  una arista por renglón con encabezado origen,destino,costo.
+#            La heurística (opcional) va en otro CSV con encabezado nodo,heuristica.
+#      JSON: {"vecinos": {nodo: {vecino: costo, ...}, ...}}           (lista de adyacencia, dirigida)
+#            o {"aristas": [[origen, destino, costo], ...], "dirigido": false}
+#            y opcionalmente {"heuristica": {meta: {nodo: valor, ...}, ...}} con una tabla por meta.
+#---------------------------------------------------------------------------------------------------------------
+
+import csv
+import json
+import math
+import os
+from array import array
+from collections import deque
+from heapq import heappush, heappop
+
+from simpleai.search import SearchProblem
+
+#---------------------------------------------------------------------------------------------------------------
+#   Grafo en formato CSR
+#---------------------------------------------------------------------------------------------------------------
+
+class Grafo(object):
+    """
+        Clase que guarda un grafo dirigido con costos en formato CSR. Los nodos tienen un nombre (cadena) y
+        un identificador entero; las aristas que salen de un nodo conservan el orden del archivo.
+    """
+
+    def __init__(self, nombres, inicio, destino, costo, heuristicas=None):
+        """ Constructor de la clase. Normalmente se usa from_edges() o load().
+
+            nombres: lista con el nombre de cada nodo (el índice es su identificador).
+            inicio: array('q') de n+1 elementos con el inicio de las aristas de cada nodo.
+            destino: array('q') con el nodo destino de cada arista.
+            costo: array('d') con el costo de cada arista.
+            heuristicas: diccionario opcional {meta: {nodo: valor}} con las tablas de heurística del archivo.
+        """
+        self.nombres = nombres
+        self.ids = {nombre: i for i, nombre in enumerate(nombres)}
+        self.inicio = inicio
+        self.destino = destino
+        self.costo = costo
+        self.heuristicas = heuristicas if heuristicas is not None else {}
+
+    @classmethod
+    def from_edges(cls, aristas, dirigido=True, heuristicas=None):
+        """ Construye el grafo a partir de una secuencia de aristas.
+
+            aristas: iterable de tuplas (origen, destino, costo) con los nombres de los nodos.
+            dirigido: si es False, cada arista se agrega en ambos sentidos.
+            heuristicas: diccionario opcional {meta: {nodo: valor}}.
+        """
+        ids = {}
+        origenes = array('q')
+        destinos = array('q')
+        costos = array('d')
+        for a, b, c in aristas:
+            i = ids.setdefault(str(a), len(ids))
+            j = ids.setdefault(str(b), len(ids))
+            origenes.append(i)
+            destinos.append(j)
+            costos.append(float(c))
+            if not dirigido:
+                origenes.append(j)
+                destinos.append(i)
+                costos.append(float(c))
+
+        # Ordenamiento por conteo (estable) de las aristas según su origen
+        n = len(ids)
+        inicio = array('q', bytes(8*(n + 1)))
+        for i in origenes:
+            inicio[i + 1] += 1
+        for i in range(n):
+            inicio[i + 1] += inicio[i]
+        siguiente = array('q', inicio[:n])
+        destino = array('q', bytes(8*len(destinos)))
+        costo = array('d', bytes(8*len(costos)))
+        for i, j, c in zip(origenes, destinos, costos):
+            k = siguiente[i]
+            destino[k] = j
+            costo[k] = c
+            siguiente[i] = k + 1
+
+        nombres = [None]*n
+        for nombre, i in ids.items():
+            nombres[i] = nombre
+        return cls(nombres, inicio, destino, costo, heuristicas)
+
+    @classmethod
+    def from_csv(cls, archivo, dirigido=False):
+        """ Carga el grafo de un CSV con encabezado origen,destino,costo.
+
+            archivo: ruta del archivo.
+            dirigido: si es False, cada renglón es un camino de doble sentido.
+        """
+        with open(archivo, newline='', encoding='utf-8') as f:
+            lector = csv.DictReader(f)
+            return cls.from_edges(((r['origen'], r['destino'], r['costo']) for r in lector), dirigido)
+
+    @classmethod
+    def from_json(cls, archivo):
+        """ Carga el grafo de un JSON con "vecinos" o con "aristas" (ver el encabezado del archivo).
+
+            archivo: ruta del archivo.
+        """
+        with open(archivo, encoding='utf-8') as f:
+            datos = json.load(f)
+        if 'vecinos' in datos:
+            aristas = ((a, b, c) for a, vecinos in datos['vecinos'].items() for b, c in vecinos.items())
+            dirigido = True
+        else:
+            aristas = datos['aristas']
+            dirigido = datos.get('dirigido', False)
+        return cls.from_edges(aristas, dirigido, datos.get('heuristica'))
+
+    @classmethod
+    def load(cls, archivo, dirigido=False):
+        """ Carga el grafo de un archivo .csv o .json según su extensión.
+
+            archivo: ruta del archivo.
+            dirigido: solo para CSV; si es False, cada renglón es un camino de doble sentido.
+        """
+        if os.path.splitext(archivo)[1].lower() == '.json':
+            return cls.from_json(archivo)
+        return cls.from_csv(archivo, dirigido)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def node_id(self, nombre):
+        """ Regresa el identificador entero de un nodo dado su nombre. """
+        return self.ids[str(nombre)]
+
+    def neighbors(self, i):
+        """ Regresa una lista de tuplas (vecino, costo) del nodo i. """
+        return [(self.destino[k], self.costo[k]) for k in range(self.inicio[i], self.inicio[i + 1])]
+
+#---------------------------------------------------------------------------------------------------------------
+#   Definición del problema
+#---------------------------------------------------------------------------------------------------------------
+
+def load_heuristic(archivo):
+    """ Carga una tabla de heurística {nodo: valor} de un CSV con encabezado nodo,heuristica.
+
+        archivo: ruta del archivo.
+    """
+    with open(archivo, newline='', encoding='utf-8') as f:
+        return {r['nodo']: float(r['heuristica']) for r in csv.DictReader(f)}
+
+
+class GraphSearchProblem(SearchProblem):
+    """
+        Clase que define el problema de encontrar una ruta entre dos nodos de un Grafo. Los estados son los
+        identificadores enteros de los nodos y las acciones son los índices de las aristas en el formato CSR;
+        state_representation() y action_representation() regresan los nombres de los nodos.
+    """
+
+    def __init__(self, grafo, origen, destino, heuristica=None):
+        """ Constructor de la clase.
+
+            grafo: Grafo (o ruta de un archivo que se carga con Grafo.load).
+            origen: nombre del nodo inicial.
+            destino: nombre del nodo meta.
+            heuristica: diccionario {nodo: valor} o ruta de un CSV nodo,heuristica. Si no se especifica se
+                        usa la tabla del grafo para esta meta, si existe; si no, la heurística es 0.
+        """
+        if not isinstance(grafo, Grafo):
+            grafo = Grafo.load(grafo)
+        self.grafo = grafo
+
+        # Llama al constructor de su superclase SearchProblem (estado inicial = nodo origen).
+        SearchProblem.__init__(self, grafo.node_id(origen))
+
+        # Define el estado meta = nodo destino.
+        self.goal_state = grafo.node_id(destino)
+
+        # Heurística de cada nodo en un arreglo indexado por identificador
+        if heuristica is None:
+            heuristica = grafo.heuristicas.get(str(destino), {})
+        elif isinstance(heuristica, str):
+            heuristica = load_heuristic(heuristica)
+        self.h = array('d', bytes(8*len(grafo)))
+        for nombre, valor in heuristica.items():
+            self.h[grafo.node_id(nombre)] = valor
+
+    def actions(self, state):
+        """
+            Regresa los índices de las aristas que salen del nodo.
+
+            state: identificador del nodo actual.
+        """
+        return range(self.grafo.inicio[state], self.grafo.inicio[state + 1])
+
+    def result(self, state, action):
+        """
+            Regresa el nodo al que lleva la arista.
+
+            state: identificador del nodo actual.
+            action: índice de la arista.
+        """
+        return self.grafo.destino[action]
+
+    def is_goal(self, state):
+        """
+            Determina si el nodo es la meta.
+
+            state: identificador del nodo.
+        """
+        return state == self.goal_state
+
+    def cost(self, state, action, state2):
+        """
+            Regresa el costo de la arista.
+
+            state: nodo origen.
+            action: índice de la arista.
+            state2: nodo destino.
+        """
+        return self.grafo.costo[action]
+
+    def heuristic(self, state):
+        """
+            Regresa el estimado de la distancia desde el nodo a la meta.
+
+            state: identificador del nodo.
+        """
+        return self.h[state]
+
+    def state_representation(self, state):
+        return self.grafo.nombres[state]
+
+    def action_representation(self, action):
+        return 'Ir a ' + self.grafo.nombres[self.grafo.destino[action]]
+
+#---------------------------------------------------------------------------------------------------------------
+#   Búsquedas de grafo sobre los arreglos CSR
+#---------------------------------------------------------------------------------------------------------------
+
+class Ruta(object):
+    """
+        Clase con el resultado de breadth_first() y astar(). Ofrece lo que usan las funciones display() de los
+        ejemplos (path() y cost), además de state, action, depth y stats.
+    """
+
+    def __init__(self, path, cost, stats):
+        self._path = path
+        self.cost = cost
+        self.stats = stats
+        self.action, self.state = path[-1]
+        self.depth = len(path) - 1
+
+    def path(self):
+        """ Camino (lista de tuplas (arista, nodo)) desde el origen hasta la meta. """
+        return list(self._path)
+
+    def __repr__(self):
+        return 'Node <%s>' % self.state
+
+
+def _path(padre, arista, nodo, costo, stats):
+    """ Reconstruye el resultado desde el nodo meta siguiendo los padres. """
+    path = []
+    while nodo >= 0:
+        path.append((arista[nodo] if arista[nodo] >= 0 else None, nodo))
+        nodo = padre[nodo]
+    path.reverse()
+    return Ruta(path, costo, stats)
+
+
+def breadth_first(problem, graph_search=True, viewer=None):
+    """
+        Búsqueda primero en anchura de grafo (como simpleai.search.breadth_first con graph_search=True: un
+        nodo no se agrega si ya está en la frontera o ya fue expandido). Regresa la ruta con menos aristas.
+
+        problem: GraphSearchProblem.
+        graph_search: solo se acepta True; en un grafo la búsqueda de árbol no termina si hay ciclos.
+    """
+    if viewer is not None or not graph_search:
+        raise ValueError('psa_grafo.breadth_first solo hace búsqueda de grafo y no usa viewers')
+    grafo = problem.grafo
+    inicio, destino, costo = grafo.inicio, grafo.destino, grafo.costo
+    n = len(grafo)
+    padre = array('q', [-1])*n
+    arista = array('q', [-1])*n
+    g = array('d', bytes(8*n))
+    visto = bytearray(n)
+    stats = {'expanded': 0, 'generated': 1}
+
+    origen = problem.initial_state
+    visto[origen] = 1
+    cola = deque([origen])
+    while cola:
+        nodo = cola.popleft()
+        if nodo == problem.goal_state:
+            return _path(padre, arista, nodo, g[nodo], stats)
+        stats['expanded'] += 1
+        for e in range(inicio[nodo], inicio[nodo + 1]):
+            v = destino[e]
+            stats['generated'] += 1
+            if not visto[v]:
+                visto[v] = 1
+                padre[v] = nodo
+                arista[v] = e
+                g[v] = g[nodo] + costo[e]
+                cola.append(v)
+    return None
+
+
+def astar(problem, graph_search=True, viewer=None):
+    """
+        Búsqueda A* de grafo con un montículo. Con la heurística del problema admisible y consistente (o
+        sin heurística, como uniform_cost) regresa la ruta de costo mínimo.
+
+        problem: GraphSearchProblem.
+        graph_search: solo se acepta True; en un grafo la búsqueda de árbol no termina si hay ciclos.
+    """
+    if viewer is not None or not graph_search:
+        raise ValueError('psa_grafo.astar solo hace búsqueda de grafo y no usa viewers')
+    grafo = problem.grafo
+    inicio, destino, costo = grafo.inicio, grafo.destino, grafo.costo
+    h = problem.h
+    n = len(grafo)
+    padre = array('q', [-1])*n
+    arista = array('q', [-1])*n
+    g = array('d', [math.inf])*n
+    cerrado = bytearray(n)
+    stats = {'expanded': 0, 'generated': 1}
+
+    origen = problem.initial_state
+    g[origen] = 0.0
+    monticulo = [(h[origen], origen)]
+    while monticulo:
+        _, nodo = heappop(monticulo)
+        if cerrado[nodo]:
+            continue
+        if nodo == problem.goal_state:
+            return _path(padre, arista, nodo, g[nodo], stats)
+        cerrado[nodo] = 1
+        stats['expanded'] += 1
+        gn = g[nodo]
+        for e in range(inicio[nodo], inicio[nodo + 1]):
+            v = destino[e]
+            stats['generated'] += 1
+            gv = gn + costo[e]
+            if gv < g[v] and not cerrado[v]:
+                g[v] = gv
+                padre[v] = nodo
+                arista[v] = e
+                heappush(monticulo, (gv + h[v], v))
+    return None
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,188 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Structured trace capture for the rover agents
+#
+#   Instead of printing every neighbour on every step, the agents of rover_agents.py record events into an
+#   AgentTrace: a preallocated ring buffer with one numpy array per field (the oldest records are overwritten
+#   when it is full). The trace is switched between three modes:
+#
+#       off      nothing is recorded; the agents skip the tracing code entirely
+#       sampled  one event out of every sample_every is recorded
+#       full     every event is recorded
+#
+#   The records are exported as columns (one numpy array per field) and saved as a directory with one .npy
+#   file per column plus a small meta.json, which can be memory-mapped back for plotting.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import json
+import os
+import sys
+
+import numpy as np
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+TRACE_OFF = 'off'
+TRACE_SAMPLED = 'sampled'
+TRACE_FULL = 'full'
+TRACE_MODES = (TRACE_OFF, TRACE_SAMPLED, TRACE_FULL)
+
+# Event codes
+EVENT_INVALID = 0       # neighbour outside the map, invalid or too steep
+EVENT_REJECTED = 1      # valid candidate that was not taken
+EVENT_ACCEPTED = 2      # candidate the rover moved to
+EVENT_STOP = 3          # the agent stopped at (row, col)
+EVENT_NAMES = ('invalid', 'rejected', 'accepted', 'stop')
+
+# Fields of a record, in the order in which the agents pass them
+FIELDS = (('run', np.int32), ('step', np.int32), ('row', np.int32), ('col', np.int32), ('height', np.float32),
+          ('cand_row', np.int32), ('cand_col', np.int32), ('cand_height', np.float32),
+          ('candidates', np.uint8), ('event', np.uint8), ('temperature', np.float32))
+
+# Default number of records kept
+CAPACITY = 1 << 20
+
+# Default sampling period of the sampled mode
+SAMPLE_EVERY = 64
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class AgentTrace(object):
+    """
+        Class that stores the events of the rover agents in a ring buffer.
+    """
+
+    def __init__(self, mode=TRACE_FULL, capacity=CAPACITY, sample_every=SAMPLE_EVERY):
+        """
+            This constructor preallocates the buffer.
+
+            mode: 'off', 'sampled' or 'full'.
+            capacity: Maximum number of records kept (the oldest ones are overwritten).
+            sample_every: Sampling period of the sampled mode.
+        """
+        if mode not in TRACE_MODES:
+            raise ValueError('unknown trace mode %r' % mode)
+        self.mode = mode
+        self.capacity = capacity
+        self.sample_every = max(1, int(sample_every))
+        self.clear()
+
+    def clear(self):
+        """ Removes all the records. """
+        # One preallocated numpy array per field; the record function writes through memoryviews of them,
+        # which is cheaper than indexing the arrays
+        size = self.capacity if self.mode != TRACE_OFF else 0
+        self._columns = [np.empty(size, dtype=dtype) for _, dtype in FIELDS]
+        self._views = [memoryview(column) for column in self._columns]
+        self.seen = 0
+        self.recorded = 0
+        self.runs = 0
+
+    def __len__(self):
+        return min(self.recorded, self.capacity)
+
+    @property
+    def dropped(self):
+        """ Number of recorded events overwritten because the buffer was full. """
+        return max(0, self.recorded - self.capacity)
+
+    def new_run(self):
+        """ Returns the number of a new agent run. """
+        self.runs += 1
+        return self.runs - 1
+
+    def recorder(self):
+        """
+            Returns the function record(run, step, row, col, height, cand_row, cand_col, cand_height,
+            candidates, event, temperature) of the current mode, or None when the trace is off so the agents
+            can skip the tracing code.
+        """
+        if self.mode == TRACE_OFF:
+            return None
+
+        (run_v, step_v, row_v, col_v, height_v, cand_row_v, cand_col_v, cand_height_v, candidates_v, event_v,
+         temperature_v) = self._views
+        capacity = self.capacity
+        every = self.sample_every if self.mode == TRACE_SAMPLED else 1
+
+        def record(run, step, row, col, height, cand_row, cand_col, cand_height, candidates, event, temperature):
+            # The sampling check comes first, so skipped events do not touch the buffer
+            self.seen += 1
+            if every > 1 and self.seen % every:
+                return
+            i = self.recorded % capacity
+            run_v[i] = run
+            step_v[i] = step
+            row_v[i] = row
+            col_v[i] = col
+            height_v[i] = height
+            cand_row_v[i] = cand_row
+            cand_col_v[i] = cand_col
+            cand_height_v[i] = cand_height
+            candidates_v[i] = candidates
+            event_v[i] = event
+            temperature_v[i] = temperature
+            self.recorded += 1
+
+        return record
+
+    def columns(self):
+        """ Returns a dictionary with one numpy array per field, oldest record first. """
+        n = len(self)
+        start = self.recorded % self.capacity if self.recorded > self.capacity else 0
+        out = {}
+        for (name, _), column in zip(FIELDS, self._columns):
+            out[name] = np.concatenate((column[start:n], column[:start]))
+        return out
+
+    def records(self):
+        """ Returns the list of records (tuples in the order of FIELDS), oldest first. """
+        return list(zip(*(values.tolist() for values in self.columns().values())))
+
+    def save(self, directory):
+        """
+            Saves the columns as <directory>/<field>.npy plus <directory>/meta.json.
+
+            directory: Output directory (created if needed).
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, values in self.columns().items():
+            np.save(os.path.join(directory, name + '.npy'), values)
+        meta = {'mode': self.mode, 'sample_every': self.sample_every, 'capacity': self.capacity,
+                'seen': self.seen, 'recorded': self.recorded, 'dropped': self.dropped, 'runs': self.runs,
+                'fields': [name for name, _ in FIELDS], 'events': list(EVENT_NAMES)}
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+    @staticmethod
+    def load(directory, mmap_mode='r'):
+        """
+            Loads the columns saved by save(). Returns (columns, meta).
+
+            directory: Directory written by save().
+            mmap_mode: Memory-map mode of the columns (None to read them into memory).
+        """
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+                   for name in meta['fields']}
+        return columns, meta
+
+    def dump(self, file=sys.stdout):
+        """ Prints the records in a readable form, like the messages of the notebook agents. """
+        for run, step, row, col, h, cr, cc, ch, n, event, T in self.records():
+            line = 'run %d step %d (%d, %d) h=%.2f -> (%d, %d) h=%.2f dh=%+.2f %s' % (
+                run, step, row, col, h, cr, cc, ch, ch - h, EVENT_NAMES[event])
+            if T == T:
+                line += ' T=%.3f' % T
+            print(line, file=file)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
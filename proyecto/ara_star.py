@@ -0,0 +1,186 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Anytime Repairing A* (ARA*) for route planning on the Mars map
+#
+#   The search first runs with an inflated heuristic (f = g + epsilon*h), which finds a route quickly whose
+#   cost is at most epsilon times the optimal one. Then epsilon is lowered step by step down to 1, and every
+#   iteration repairs the previous one instead of starting over: g-scores and parents are kept, the cells
+#   whose g-score improved after they were expanded (the inconsistent ones) are set aside and put back in the
+#   open list for the next iteration, and only the keys of the open list are recomputed.
+#
+#   After every iteration the route found and the suboptimality bound actually achieved are known:
+#
+#       bound = min(epsilon, cost / min over OPEN and INCONS of (g + h))
+#
+#   When the deadline passes the best route found so far is returned with its bound.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+import time
+from array import array
+from heapq import heappush, heappop, heapify
+
+import numpy as np
+
+from traversability import compute_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import FIXED, GridSearchResult, neighbor_table, octile_heuristic, reconstruct
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Heuristic inflation of the first iteration
+EPSILON = 3.0
+
+# Decrease of the inflation after every iteration
+EPSILON_STEP = 0.5
+
+# Expansions between two checks of the deadline
+CHECK_EVERY = 256
+
+#------------------------------------------------------------------------------------------------------------------
+#   ARA* search
+#------------------------------------------------------------------------------------------------------------------
+
+def ara_star(img, start, goal, max_delta=ROUTE_MAX_DELTA, scale=SCALE, moves=None, deadline=None, epsilon=EPSILON,
+             epsilon_step=EPSILON_STEP, heuristic=None, reachability=None, on_solution=None):
+    """
+        Anytime search of the cheapest route between two cells. Returns a GridSearchResult with the best route
+        found before the deadline; its stats hold the bound achieved ('bound', 1 = optimal), the last
+        epsilon, whether the deadline stopped the search and the list of solutions found
+        (epsilon, cost, bound, seconds, expanded cells).
+
+        img: 2-D array of heights (invalid pixels < 0).
+        start: (row, col) of the start.
+        goal: (row, col) of the goal.
+        max_delta: Maximum height difference between neighbouring pixels.
+        scale: Meters per pixel.
+        moves: Precomputed traversability mask of img for max_delta (computed if not given).
+        deadline: Time budget in seconds (None = run until the optimal route is found).
+        epsilon: Heuristic inflation of the first iteration (>= 1).
+        epsilon_step: Decrease of the inflation after every iteration.
+        heuristic: Admissible function h(i) of the flat cell index (octile distance if not given).
+        reachability: Optional reachability.Reachability for img and max_delta; unreachable goals are
+                      rejected before searching.
+        on_solution: Optional function called with (path, cost, bound) every time a route is found.
+    """
+    t0 = time.perf_counter()
+    stop_at = t0 + deadline if deadline is not None else math.inf
+    n_rows, n_cols = img.shape
+    n = n_rows*n_cols
+    if moves is None:
+        moves = compute_moves(img, max_delta)
+
+    start_i = start[0]*n_cols + start[1]
+    goal_i = goal[0]*n_cols + goal[1]
+    if img[start[0], start[1]] < 0 or img[goal[0], goal[1]] < 0:
+        return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0)
+    if reachability is not None and not reachability.reachable(start, goal):
+        return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0, rejected=True)
+
+    mask = np.ascontiguousarray(moves, dtype=np.uint8).tobytes()
+    table = neighbor_table(n_cols, scale)
+    h = heuristic if heuristic is not None else octile_heuristic(goal, n_cols, scale)
+
+    g = array('d', [math.inf])*n
+    parent = array('q', [-1])*n
+    # closed[i] = number of the iteration in which cell i was expanded (0 = never)
+    closed = array('i', [0])*n
+    in_open = bytearray(n)
+    incons = set()
+
+    shift = n.bit_length()
+    low = (1 << shift) - 1
+
+    g[start_i] = 0.0
+    in_open[start_i] = 1
+    open_cells = [start_i]
+
+    iteration = 0
+    expanded = 0
+    generated = 1
+    solutions = []
+    best = None
+    timed_out = False
+    eps = max(1.0, epsilon)
+
+    while True:
+        iteration += 1
+        # Open list of this iteration: the open cells and the inconsistent ones, with keys for the new epsilon
+        for i in incons:
+            in_open[i] = 1
+        cells = {i for i in open_cells if in_open[i]} | incons
+        incons = set()
+        heap = [(int((g[i] + eps*h(i))*FIXED) << shift) | i for i in cells]
+        heapify(heap)
+
+        # Improve the path: expand while some open key is lower than the goal's (quantised like the keys)
+        goal_key = int(g[goal_i]*FIXED) if g[goal_i] < math.inf else math.inf
+        while heap:
+            top = heap[0]
+            i = top & low
+            if not in_open[i]:
+                heappop(heap)
+                continue
+            if goal_key <= (top >> shift):
+                break
+            heappop(heap)
+            in_open[i] = 0
+            closed[i] = iteration
+            expanded += 1
+
+            if not expanded % CHECK_EVERY and time.perf_counter() > stop_at:
+                timed_out = True
+                break
+
+            gi = g[i]
+            for off, cost in table[mask[i]]:
+                j = i + off
+                ng = gi + cost
+                if ng < g[j]:
+                    g[j] = ng
+                    parent[j] = i
+                    if j == goal_i:
+                        goal_key = int(ng*FIXED)
+                    if closed[j] == iteration:
+                        incons.add(j)
+                    else:
+                        in_open[j] = 1
+                        heappush(heap, (int((ng + eps*h(j))*FIXED) << shift) | j)
+                        generated += 1
+
+        if timed_out or math.isinf(g[goal_i]):
+            break
+
+        # Bound achieved by this iteration
+        cost = g[goal_i]
+        lower = min([g[i] + h(i) for i in {k & low for k in heap} if in_open[i]] +
+                    [g[i] + h(i) for i in incons] + [cost])
+        bound = min(eps, cost / lower) if lower > 0 else 1.0
+        path = reconstruct(parent, start_i, goal_i, n_cols)
+        best = (path, cost, bound, eps)
+        solutions.append((eps, cost, bound, time.perf_counter() - t0, expanded))
+        if on_solution is not None:
+            on_solution(path, cost, bound)
+
+        if eps <= 1.0 or bound <= 1.0 or time.perf_counter() > stop_at:
+            timed_out = eps > 1.0 and bound > 1.0
+            break
+
+        open_cells = [k & low for k in heap]
+        eps = max(1.0, eps - epsilon_step)
+
+    elapsed = time.perf_counter() - t0
+    if best is None:
+        return GridSearchResult(None, math.inf, expanded, generated, elapsed, bound=math.inf, epsilon=eps,
+                                timed_out=timed_out, solutions=solutions)
+    path, cost, bound, eps = best
+    return GridSearchResult(path, cost, expanded, generated, elapsed, bound=bound, epsilon=eps, timed_out=timed_out,
+                            solutions=solutions)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,212 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Steepest-descent basin map for the greedy rover
+#
+#   greedy_agent() in agenteLOCAL.ipynb moves, at every step, to the lowest valid neighbour that is strictly
+#   lower than the current pixel (the first one in scan order on ties) and stops when there is none. Here the
+#   greedy successor of every pixel is computed at once for the whole map, and the successor chains are
+#   resolved by pointer jumping (log2 of the longest descent iterations) to the local minimum where each
+#   descent ends. Afterwards any start position is answered with an array lookup.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import os
+
+import numpy as np
+
+from traversability import MAX_DELTA, DIRECTIONS, SCAN_ORDER, compute_moves, load_moves
+
+#------------------------------------------------------------------------------------------------------------------
+#   Successors
+#------------------------------------------------------------------------------------------------------------------
+
+def greedy_successors(img, max_delta=MAX_DELTA, moves=None):
+    """
+        Returns a flat int64 array with the flat index of the pixel the greedy rover moves to from every pixel
+        (the pixel itself if the rover stops there).
+
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        moves: Precomputed traversability mask of img (computed if not given).
+    """
+    img = np.asarray(img, dtype='float64')
+    if moves is None:
+        moves = compute_moves(img, max_delta)
+    n_rows, n_cols = img.shape
+
+    padded = np.full((n_rows + 2, n_cols + 2), np.inf)
+    padded[1:-1, 1:-1] = img
+
+    best_h = np.full(img.shape, np.inf)
+    best_k = np.full(img.shape, -1, dtype=np.int8)
+    for k in SCAN_ORDER:
+        dr, dc = DIRECTIONS[k]
+        h = padded[1 + dr:1 + dr + n_rows, 1 + dc:1 + dc + n_cols]
+        # Strict comparison: on ties the first neighbour in scan order is kept, as min() does
+        better = ((moves >> k) & 1).astype(bool) & (h < best_h)
+        best_h[better] = h[better]
+        best_k[better] = k
+
+    index = np.arange(n_rows*n_cols, dtype=np.int64).reshape(img.shape)
+    successor = index.copy()
+    move = (best_k >= 0) & (best_h < img)
+
+    dr = np.array([d[0] for d in DIRECTIONS], dtype=np.int64)
+    dc = np.array([d[1] for d in DIRECTIONS], dtype=np.int64)
+    k = best_k[move]
+    successor[move] += dr[k]*n_cols + dc[k]
+
+    return successor.ravel()
+
+
+def resolve_chains(successor):
+    """
+        Follows every successor chain to its end by pointer jumping. Returns (terminal, steps): the flat index
+        of the pixel where the chain of every pixel ends and the number of moves needed to get there.
+
+        successor: Flat array of successors (fixed points are the ends of the chains).
+    """
+    index = np.arange(successor.size, dtype=successor.dtype)
+    jump = successor.copy()
+    steps = (successor != index).astype(np.int64)
+
+    while True:
+        jump2 = jump[jump]
+        if np.array_equal(jump2, jump):
+            break
+        steps += steps[jump]
+        jump = jump2
+
+    return jump, steps
+
+
+def basins_file(map_file, max_delta=MAX_DELTA):
+    """
+        Returns the path of the cached basin map of a height map file (next to the map).
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+    """
+    stem = map_file[:-len('.npy')] if map_file.endswith('.npy') else map_file
+    return '%s.basins-%g.npz' % (stem, max_delta)
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class BasinMap(object):
+    """
+        Class that stores, for every pixel of a height map, where the greedy rover ends when it starts there.
+    """
+
+    def __init__(self, img, successor, terminal, steps, max_delta=MAX_DELTA):
+        """
+            This constructor stores the precomputed arrays (use BasinMap.compute to build them).
+
+            img: 2-D array of heights.
+            successor: Flat array with the greedy successor of every pixel.
+            terminal: Flat array with the local minimum where the descent of every pixel ends.
+            steps: Flat array with the number of moves of every descent.
+            max_delta: Maximum height difference used to build the map.
+        """
+        self.img = img
+        self.shape = img.shape
+        self.max_delta = max_delta
+        self.successor = successor
+        self.terminal = terminal
+        self.steps = steps
+
+        # Basin labels: consecutive integers per local minimum, -1 for invalid pixels
+        valid = (np.asarray(img) >= 0).ravel()
+        minima, labels = np.unique(terminal, return_inverse=True)
+        self.minima = minima
+        self.labels = np.where(valid, labels, -1).reshape(self.shape)
+        self.depth = np.where(valid, np.asarray(img).ravel()[terminal], -1).reshape(self.shape)
+
+    @classmethod
+    def compute(cls, img, max_delta=MAX_DELTA, moves=None):
+        """
+            Builds the basin map of a height map.
+
+            img: 2-D array of heights (invalid pixels < 0).
+            max_delta: Maximum height difference between neighbouring pixels.
+            moves: Precomputed traversability mask of img (computed if not given).
+        """
+        successor = greedy_successors(img, max_delta, moves)
+        terminal, steps = resolve_chains(successor)
+        return cls(img, successor, terminal, steps, max_delta)
+
+    @classmethod
+    def from_file(cls, map_file, max_delta=MAX_DELTA, img=None):
+        """
+            Loads the basin map of a height map file. It is computed and saved next to the map if it does not
+            exist or is older than the map.
+
+            map_file: Path of the .npy height map.
+            max_delta: Maximum height difference between neighbouring pixels.
+            img: The height map, if it is already loaded.
+        """
+        if img is None:
+            img = np.load(map_file)
+        path = basins_file(map_file, max_delta)
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(map_file):
+            basins = cls.compute(img, max_delta, load_moves(map_file, max_delta, img))
+            tmp = path + '.tmp.npz'
+            basins.save(tmp)
+            os.replace(tmp, path)
+            return basins
+        return cls.load(path, img)
+
+    def save(self, path):
+        """ Saves the successor, terminal and step arrays to a .npz file. """
+        np.savez(path, successor=self.successor, terminal=self.terminal, steps=self.steps,
+                 max_delta=self.max_delta)
+
+    @classmethod
+    def load(cls, path, img):
+        """
+            Loads a basin map saved with save().
+
+            path: Path of the .npz file.
+            img: The height map the basin map was computed from.
+        """
+        with np.load(path) as data:
+            return cls(img, data['successor'], data['terminal'], data['steps'], float(data['max_delta']))
+
+    def query(self, row, col):
+        """
+            Returns ((r, c), h, steps): the pixel where the greedy rover stops when it starts at (row, col), its
+            height and the number of moves.
+        """
+        i = row*self.shape[1] + col
+        t = int(self.terminal[i])
+        r, c = divmod(t, self.shape[1])
+        return (r, c), self.img[r, c], int(self.steps[i])
+
+    def query_many(self, rows, cols):
+        """
+            Vectorised query. Returns (end_rows, end_cols, end_heights, steps) arrays.
+
+            rows, cols: Arrays with the start positions.
+        """
+        i = np.asarray(rows)*self.shape[1] + np.asarray(cols)
+        t = self.terminal[i]
+        r, c = np.divmod(t, self.shape[1])
+        return r, c, np.asarray(self.img)[r, c], self.steps[i]
+
+    def path(self, row, col):
+        """
+            Returns the list of (r, c) visited by the greedy rover from (row, col), as greedy_agent() does.
+        """
+        n_cols = self.shape[1]
+        i = row*n_cols + col
+        path = [(row, col)]
+        while self.successor[i] != i:
+            i = int(self.successor[i])
+            path.append(divmod(i, n_cols))
+        return path
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
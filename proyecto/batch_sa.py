@@ -0,0 +1,181 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Lockstep batched simulated annealing for the Mars rover
+#
+#   Runs many independent walkers of simulated_annealing_agent() (agenteLOCAL.ipynb) at once. Positions,
+#   heights, temperatures and step counters are NumPy arrays; at every iteration each active walker picks a
+#   random valid neighbour through the precomputed traversability mask and applies the Metropolis rule:
+#   improvements are always accepted, worse moves with probability exp((h - h_new)/T). Every walker follows
+#   the same schedule as the scalar agent: T starts at T0, is multiplied by alpha every iters_per_T steps and
+#   the walk ends when T <= Tmin, after max_steps steps or when the walker has no valid neighbour.
+#
+#   The random numbers come from one numpy Generator per batch, so individual walks are not the same as the
+#   ones of the scalar agent with random.Random(seed), but they follow the same distribution.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import numpy as np
+
+from traversability import MAX_DELTA, MOVE_COUNT, DR_TABLE, DC_TABLE, compute_moves
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class BatchResult(object):
+    """
+        Class that holds the outcome of a batch of walkers. All arrays have one entry per walker.
+    """
+
+    def __init__(self, start_rows, start_cols, rows, cols, start_h, final_h, steps, moves, valid, history=None):
+        """
+            This constructor stores the result arrays.
+
+            start_rows, start_cols: Start positions.
+            rows, cols: Final positions.
+            start_h, final_h: Start and final heights (-1 for invalid starts).
+            steps: Number of iterations run by every walker.
+            moves: Number of accepted moves.
+            valid: False for walkers whose start is outside the mask (they do not move).
+            history: Optional (iterations + 1, walkers) array with the flat position after every iteration.
+        """
+        self.start_rows = start_rows
+        self.start_cols = start_cols
+        self.rows = rows
+        self.cols = cols
+        self.start_h = start_h
+        self.final_h = final_h
+        self.steps = steps
+        self.moves = moves
+        self.valid = valid
+        self.history = history
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def descent(self):
+        """ Height lost by every walker (0 for invalid starts). """
+        return np.where(self.valid, self.start_h - self.final_h, 0.0)
+
+    def path(self, i, n_cols):
+        """
+            Returns the list of (r, c) visited by walker i, as simulated_annealing_agent() returns it (empty for
+            invalid starts). Requires the batch to be run with keep_paths=True.
+
+            i: Walker number.
+            n_cols: Number of columns of the map.
+        """
+        if self.history is None:
+            raise ValueError('the batch was run without keep_paths')
+        if not self.valid[i]:
+            return []
+
+        cells = self.history[:, i]
+        # Rejected moves repeat the previous position; accepted moves always change it
+        keep = np.ones(len(cells), dtype=bool)
+        keep[1:] = cells[1:] != cells[:-1]
+        return [divmod(int(k), n_cols) for k in cells[keep]]
+
+#------------------------------------------------------------------------------------------------------------------
+#   Batched simulated annealing
+#------------------------------------------------------------------------------------------------------------------
+
+def simulated_annealing_batch(start_rows, start_cols, img, max_delta=MAX_DELTA, T0=20.0, Tmin=4.0, alpha=0.96,
+                              iters_per_T=25, max_steps=5000, seed=2025, moves=None, keep_paths=False):
+    """
+        Runs one simulated annealing walker per start position, all of them in lockstep. The schedule
+        parameters may be scalars or arrays with one value per walker. Returns a BatchResult.
+
+        start_rows, start_cols: Arrays with the start positions (pixels).
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        T0, Tmin, alpha, iters_per_T, max_steps: Annealing schedule, as in simulated_annealing_agent().
+        seed: Seed of the random generator of the batch.
+        moves: Precomputed traversability mask of img for max_delta (computed if not given).
+        keep_paths: True to record the position of every walker after every iteration.
+    """
+    img = np.asarray(img)
+    if moves is None:
+        moves = compute_moves(img, max_delta)
+    moves = np.asarray(moves)
+    n_cols = img.shape[1]
+    rng = np.random.default_rng(seed)
+
+    start_rows = np.asarray(start_rows, dtype=np.int64)
+    start_cols = np.asarray(start_cols, dtype=np.int64)
+    n = len(start_rows)
+
+    T0, Tmin, alpha = [np.broadcast_to(np.asarray(v, dtype='float64'), (n,)) for v in (T0, Tmin, alpha)]
+    iters_per_T, max_steps = [np.broadcast_to(np.asarray(v, dtype=np.int64), (n,)) for v in (iters_per_T, max_steps)]
+
+    r = start_rows.copy()
+    c = start_cols.copy()
+    h = img[r, c].astype('float64')
+    start_h = h.copy()
+    T = T0.copy()
+    steps = np.zeros(n, dtype=np.int64)
+    tcount = np.zeros(n, dtype=np.int64)
+    accepted = np.zeros(n, dtype=np.int64)
+
+    valid = h >= 0
+    active = valid & (T > Tmin) & (steps < max_steps)
+
+    history = [r*n_cols + c] if keep_paths else None
+
+    while active.any():
+        idx = np.flatnonzero(active)
+        ar, ac, ah, aT = r[idx], c[idx], h[idx], T[idx]
+
+        # Walkers without valid neighbours stop, as the scalar agent does
+        mask = moves[ar, ac]
+        count = MOVE_COUNT[mask]
+        stuck = count == 0
+        if stuck.any():
+            active[idx[stuck]] = False
+            keep = ~stuck
+            idx, ar, ac, ah, aT, mask, count = idx[keep], ar[keep], ac[keep], ah[keep], aT[keep], mask[keep], count[keep]
+            if len(idx) == 0:
+                break
+
+        # Random valid neighbour
+        choice = np.minimum((rng.random(len(idx)) * count).astype(np.int64), count.astype(np.int64) - 1)
+        nr = ar + DR_TABLE[mask, choice]
+        nc = ac + DC_TABLE[mask, choice]
+        nh = img[nr, nc]
+
+        # Metropolis acceptance for minimisation
+        dE = ah - nh
+        u = rng.random(len(idx))
+        with np.errstate(over='ignore'):
+            accept = (dE > 0) | (u <= np.exp(np.minimum(dE, 0.0) / aT))
+
+        sel = idx[accept]
+        r[sel] = nr[accept]
+        c[sel] = nc[accept]
+        h[sel] = nh[accept]
+        accepted[sel] += 1
+
+        # Geometric cooling by levels
+        steps[idx] += 1
+        tcount[idx] += 1
+        cool = idx[tcount[idx] >= iters_per_T[idx]]
+        T[cool] *= alpha[cool]
+        tcount[cool] = 0
+
+        active[idx] = (T[idx] > Tmin[idx]) & (steps[idx] < max_steps[idx])
+
+        if keep_paths:
+            history.append(r*n_cols + c)
+
+    if keep_paths:
+        history = np.array(history, dtype=np.int64)
+
+    final_h = np.where(valid, h, -1.0)
+    return BatchResult(start_rows, start_cols, r, c, np.where(valid, start_h, -1.0), final_h, steps, accepted,
+                       valid, history)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
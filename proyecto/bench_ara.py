@@ -0,0 +1,62 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: anytime ARA* with a time budget vs optimal grid A*
+#
+#   Usage: python bench_ara.py [map_file] [--pairs N] [--distance D] [--deadline S] [--epsilon E]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+
+import numpy as np
+
+from traversability import load_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import astar
+from reachability import Reachability
+from ara_star import ara_star, EPSILON, EPSILON_STEP
+from bench_routes import random_pairs
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares anytime ARA* under a deadline with optimal grid A*.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--pairs', type=int, default=10)
+    parser.add_argument('--distance', type=int, default=500, help='maximum start-goal distance in pixels')
+    parser.add_argument('--deadline', type=float, default=0.05, help='time budget of ARA* in seconds')
+    parser.add_argument('--epsilon', type=float, default=EPSILON)
+    parser.add_argument('--epsilon-step', type=float, default=EPSILON_STEP)
+    parser.add_argument('--max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+    moves = load_moves(args.map_file, args.max_delta, img)
+    reachability = Reachability.from_file(args.map_file, args.max_delta, img)
+    rng = np.random.default_rng(args.seed)
+    pairs = [p for p in random_pairs(img, 4*args.pairs, args.distance, rng) if reachability.reachable(*p)]
+
+    print('%-26s %10s %9s   %10s %9s %8s %8s %9s' % ('start -> goal', 'A* cost', 'time (s)', 'ARA* cost',
+                                                   'first (s)', 'bound', 'real', 'iters'))
+    for start, goal in pairs[:args.pairs]:
+        opt = astar(img, start, goal, args.max_delta, args.scale, moves)
+        res = ara_star(img, start, goal, args.max_delta, args.scale, moves, deadline=args.deadline,
+                       epsilon=args.epsilon, epsilon_step=args.epsilon_step)
+        solutions = res.stats['solutions']
+        first = '%9.4f' % solutions[0][3] if solutions else '%9s' % '-'
+        print('%-26s %10.2f %9.4f   %10.2f %s %8.3f %8.3f %9d%s' % (
+            '%s -> %s' % (start, goal), opt.cost, opt.elapsed, res.cost, first, res.stats['bound'],
+            res.cost / opt.cost if opt.cost > 0 else 1.0, len(solutions),
+            '   (deadline)' if res.stats['timed_out'] else ''))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
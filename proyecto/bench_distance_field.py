@@ -0,0 +1,73 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: one goal-rooted distance field vs one grid A* per start
+#
+#   Usage: python bench_distance_field.py [map_file] [--starts N] [--goal ROW COL] [--output STEM]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import time
+
+import numpy as np
+
+from traversability import load_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import astar
+from reachability import Reachability
+from distance_field import DistanceField
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares a goal distance field with per-start grid A*.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--starts', type=int, default=20)
+    parser.add_argument('--goal', type=int, nargs=2, default=None, help='goal (row col); random if not given')
+    parser.add_argument('--max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--output', default=None, help='stem of the memmapped output arrays')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+    moves = load_moves(args.map_file, args.max_delta, img)
+    reachability = Reachability.from_file(args.map_file, args.max_delta, img)
+    rng = np.random.default_rng(args.seed)
+
+    # Goal and starts in the largest region, so every start has a route
+    region = np.argwhere(np.asarray(reachability.labels) == 0)
+    goal = tuple(args.goal) if args.goal else tuple(int(v) for v in region[rng.integers(len(region))])
+    starts = [tuple(int(v) for v in region[i]) for i in rng.integers(len(region), size=args.starts)]
+
+    field = DistanceField.compute(img, goal, args.max_delta, args.scale, moves, path=args.output)
+    print('Goal %s: %d pixels settled in %.2f s (%.2f s with the output arrays)' %
+          (goal, field.stats['settled'], field.stats['search_time'], field.stats['elapsed']))
+
+    t0 = time.perf_counter()
+    routes = [field.route(s) for s in starts]
+    follow_time = time.perf_counter() - t0
+
+    astar_time = 0.0
+    mismatches = 0
+    for start, (path, cost) in zip(starts, routes):
+        res = astar(img, start, goal, args.max_delta, args.scale, moves)
+        astar_time += res.elapsed
+        if abs(res.cost - cost) > 1e-3:
+            mismatches += 1
+            print('COST MISMATCH %s: field %.2f, A* %.2f' % (start, cost, res.cost))
+
+    field_time = field.stats['elapsed'] + follow_time
+    print('%d starts: distance field %.3f s (%.4f s following successors), per-start A* %.3f s (%.1fx), '
+          '%d cost mismatches' % (len(starts), field_time, follow_time, astar_time,
+                                  astar_time / max(field_time, 1e-9), mismatches))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
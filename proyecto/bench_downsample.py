@@ -0,0 +1,94 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: in-memory vs streaming downsampling
+#
+#   Every variant runs in a fresh process so that its peak resident memory can be measured on its own.
+#
+#   Usage: python bench_downsample.py [input_file] [--sub-rate N] [--workers N]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import filecmp
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+#------------------------------------------------------------------------------------------------------------------
+#   Variants
+#------------------------------------------------------------------------------------------------------------------
+
+def run_variant(variant, input_file, output_file, sub_rate, workers):
+    """
+        Runs one variant in the current process and returns a dictionary with its wall time and peak RSS (MB)
+        of this process and of its worker processes.
+    """
+    import numpy as np
+    from pds import read_label, load_heights
+    from downsample import downsample_file, reduce_block
+
+    label = read_label(input_file)
+    if sub_rate is None:
+        sub_rate = round(10/label.scale)
+
+    start = time.perf_counter()
+    if variant == 'in-memory':
+        np.save(output_file, reduce_block(load_heights(input_file, label), sub_rate))
+    else:
+        downsample_file(input_file, output_file, sub_rate, label, workers=workers)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is given in KB on Linux and in bytes on macOS
+    unit = 2**20 if sys.platform == 'darwin' else 2**10
+    return {'variant': variant, 'sub_rate': sub_rate, 'time_s': elapsed,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+            'worker_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit}
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares in-memory and streaming downsampling.')
+    parser.add_argument('input_file', nargs='?', default='mars_map.img')
+    parser.add_argument('--sub-rate', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--variant', choices=['in-memory', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run a single variant and report it as JSON
+    if args.variant is not None:
+        print(json.dumps(run_variant(args.variant, args.input_file, args.output, args.sub_rate, args.workers)))
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = {}
+        print('%-10s %8s %10s %14s %18s' % ('variant', 'sub_rate', 'time (s)', 'peak RSS (MB)', 'worker RSS (MB)'))
+        for variant in ('in-memory', 'streaming'):
+            outputs[variant] = os.path.join(tmp, variant + '.npy')
+            cmd = [sys.executable, os.path.join(here, 'bench_downsample.py'), args.input_file,
+                   '--variant', variant, '--output', outputs[variant]]
+            if args.sub_rate is not None:
+                cmd += ['--sub-rate', str(args.sub_rate)]
+            if args.workers is not None:
+                cmd += ['--workers', str(args.workers)]
+            stats = json.loads(subprocess.check_output(cmd).decode().splitlines()[-1])
+            print('%-10s %8d %10.3f %14.1f %18.1f' % (variant, stats['sub_rate'], stats['time_s'],
+                                                     stats['peak_rss_mb'], stats['worker_peak_rss_mb']))
+
+        same = filecmp.cmp(outputs['in-memory'], outputs['streaming'], shallow=False)
+        print('Identical output:', same)
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
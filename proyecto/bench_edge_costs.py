@@ -0,0 +1,127 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: move costs computed per expansion vs read from the precomputed edge-cost tensor
+#
+#   Usage: python bench_edge_costs.py [map_file] [--pairs N] [--distance D] [--height-weight W]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import math
+import time
+from heapq import heappush, heappop
+
+import numpy as np
+
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import astar
+from edge_costs import EdgeCosts
+from bench_routes import random_pairs
+
+#------------------------------------------------------------------------------------------------------------------
+#   Reference search
+#------------------------------------------------------------------------------------------------------------------
+
+def astar_on_the_fly(img, start, goal, max_delta, scale, height_weight):
+    """
+        A* that computes the validity and cost of every move from the two heights when it expands a cell, as
+        MarsRouteProblem does. Returns (cost, expanded, seconds).
+    """
+    t0 = time.perf_counter()
+    n_rows, n_cols = img.shape
+    diag = scale*math.sqrt(2)
+    gr, gc = goal
+
+    def h(r, c):
+        dr = abs(r - gr)
+        dc = abs(c - gc)
+        return scale*max(dr, dc) + (diag - scale)*min(dr, dc)
+
+    g = {start: 0.0}
+    closed = set()
+    heap = [(h(*start), start)]
+    expanded = 0
+    while heap:
+        _, cell = heappop(heap)
+        if cell in closed:
+            continue
+        closed.add(cell)
+        expanded += 1
+        if cell == goal:
+            return g[cell], expanded, time.perf_counter() - t0
+
+        row, col = cell
+        h0 = img[row, col]
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr == 0 and dc == 0:
+                    continue
+                r, c = row + dr, col + dc
+                if 0 <= r < n_rows and 0 <= c < n_cols:
+                    hn = img[r, c]
+                    dh = abs(hn - h0)
+                    if hn >= 0 and dh <= max_delta:
+                        ng = g[cell] + (diag if dr and dc else scale) + height_weight*dh
+                        if ng < g.get((r, c), math.inf):
+                            g[(r, c)] = ng
+                            heappush(heap, (ng + h(r, c), (r, c)))
+    return math.inf, expanded, time.perf_counter() - t0
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares per-expansion cost computation with edge-cost tensors.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--pairs', type=int, default=10)
+    parser.add_argument('--distance', type=int, default=150, help='maximum start-goal distance in pixels')
+    parser.add_argument('--max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--height-weight', type=float, default=5.0, help='extra cost per meter climbed or descended')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+
+    t0 = time.perf_counter()
+    edges = EdgeCosts(img, args.max_delta, args.scale, args.height_weight)
+    print('Edge-cost tensor %s (%.1f MB) computed in %.3f s' % (edges.costs.shape, edges.costs.nbytes / 2**20,
+                                                                time.perf_counter() - t0))
+    for max_delta, weight in ((args.max_delta*2, args.height_weight), (args.max_delta, 0.0),
+                              (args.max_delta, args.height_weight)):
+        t0 = time.perf_counter()
+        edges.recompute(max_delta=max_delta, height_weight=weight)
+        print('  recomputed with max_delta=%g, height_weight=%g in %.3f s' % (max_delta, weight,
+                                                                            time.perf_counter() - t0))
+
+    rng = np.random.default_rng(args.seed)
+    pairs = random_pairs(img, args.pairs, args.distance, rng)
+
+    print('%-26s %10s %10s %12s   %10s %12s' % ('start -> goal', 'cost', 'expanded', 'us/expansion',
+                                               'tensor', 'us/expansion'))
+    totals = np.zeros(4)
+    for start, goal in pairs:
+        cost, expanded, elapsed = astar_on_the_fly(img, start, goal, args.max_delta, args.scale,
+                                                   args.height_weight)
+        res = astar(img, start, goal, edge_costs=edges)
+        totals += (expanded, elapsed, res.expanded, res.elapsed)
+        line = '%-26s %10.2f %10d %12.2f   %10.2f %12.2f' % ('%s -> %s' % (start, goal), cost, expanded,
+                                                            1e6*elapsed / max(expanded, 1), res.cost,
+                                                            1e6*res.elapsed / max(res.expanded, 1))
+        # The tensor stores float32 costs
+        if not (math.isinf(cost) and math.isinf(res.cost)) and abs(cost - res.cost) > 1e-4*max(cost, 1.0):
+            line += '   COST MISMATCH'
+        print(line)
+
+    print('Time per expansion: on the fly %.2f us, tensor %.2f us (%.1fx)' % (
+        1e6*totals[1] / max(totals[0], 1), 1e6*totals[3] / max(totals[2], 1),
+        (totals[1] / max(totals[0], 1)) / max(totals[3] / max(totals[2], 1), 1e-12)))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,74 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: hierarchical (HPA*) vs flat grid A* for route planning
+#
+#   Usage: python bench_hpa.py [map_file] [--pairs N] [--distance D] [--cluster-size C] [--seed S]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import time
+
+import numpy as np
+
+from traversability import load_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import astar
+from reachability import Reachability
+from hpa import HPAPlanner, CLUSTER_SIZE
+from bench_routes import random_pairs
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares HPA* and flat grid A* on random route queries.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--pairs', type=int, default=20)
+    parser.add_argument('--distance', type=int, default=300, help='maximum start-goal distance in pixels')
+    parser.add_argument('--max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--cluster-size', type=int, default=CLUSTER_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+    moves = load_moves(args.map_file, args.max_delta, img)
+    reachability = Reachability.from_file(args.map_file, args.max_delta, img)
+
+    t0 = time.perf_counter()
+    planner = HPAPlanner(img, args.max_delta, args.scale, args.cluster_size, moves)
+    print('Abstract graph: %d nodes, %d edges, built in %.2f s' %
+          (len(planner.edges), sum(len(e) for e in planner.edges.values()), time.perf_counter() - t0))
+
+    rng = np.random.default_rng(args.seed)
+    pairs = [p for p in random_pairs(img, 4*args.pairs, args.distance, rng) if reachability.reachable(*p)]
+    pairs = pairs[:args.pairs]
+
+    print('%-24s %10s %10s %10s   %10s %10s %10s %8s' % ('start -> goal', 'A* cost', 'expanded', 'time (s)',
+                                                         'HPA* cost', 'expanded', 'time (s)', 'ratio'))
+    total_flat = total_hpa = 0.0
+    ratios = []
+    for start, goal in pairs:
+        flat = astar(img, start, goal, args.max_delta, args.scale, moves)
+        res = planner.plan(start, goal)
+        total_flat += flat.elapsed
+        total_hpa += res.elapsed
+        ratio = res.cost / flat.cost if flat.cost > 0 else 1.0
+        ratios.append(ratio)
+        print('%-24s %10.2f %10d %10.4f   %10.2f %10d %10.4f %8.4f' % ('%s -> %s' % (start, goal), flat.cost,
+              flat.expanded, flat.elapsed, res.cost, res.expanded, res.elapsed, ratio))
+
+    if ratios:
+        print('Total time: grid A* %.3f s, HPA* %.3f s (%.1fx)' %
+              (total_flat, total_hpa, total_flat / max(total_hpa, 1e-9)))
+        print('Path cost ratio HPA*/A*: mean %.4f, max %.4f' % (np.mean(ratios), np.max(ratios)))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
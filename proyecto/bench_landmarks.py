@@ -0,0 +1,77 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: grid A* with the octile heuristic vs the landmark (ALT) heuristic
+#
+#   Usage: python bench_landmarks.py [map_file] [--pairs N] [--distance D] [--landmarks K] [--active A]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import time
+
+import numpy as np
+
+from traversability import load_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import astar
+from reachability import Reachability
+from landmarks import Landmarks, N_LANDMARKS, ACTIVE_LANDMARKS
+from bench_routes import random_pairs
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the octile and ALT heuristics of grid A*.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--pairs', type=int, default=20)
+    parser.add_argument('--distance', type=int, default=300, help='maximum start-goal distance in pixels')
+    parser.add_argument('--max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--landmarks', type=int, default=N_LANDMARKS)
+    parser.add_argument('--active', type=int, default=ACTIVE_LANDMARKS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+    moves = load_moves(args.map_file, args.max_delta, img)
+    reachability = Reachability.from_file(args.map_file, args.max_delta, img)
+
+    t0 = time.perf_counter()
+    landmarks = Landmarks.from_file(args.map_file, args.max_delta, args.landmarks, img)
+    print('Landmarks %s loaded in %.2f s' % (landmarks.cells, time.perf_counter() - t0))
+    covered = int(np.count_nonzero(np.isfinite(landmarks.distances).any(axis=0)))
+    valid = int(np.count_nonzero(img >= 0))
+    print('Coverage: %d of %d valid pixels (%.1f%%) reached by at least one landmark' % (covered, valid,
+                                                                                       100.0*covered / valid))
+
+    rng = np.random.default_rng(args.seed)
+    pairs = [p for p in random_pairs(img, 4*args.pairs, args.distance, rng) if reachability.reachable(*p)]
+    pairs = pairs[:args.pairs]
+
+    print('%-26s %10s %10s %10s   %10s %10s %10s' % ('start -> goal', 'cost', 'expanded', 'time (s)',
+                                                     'ALT cost', 'expanded', 'time (s)'))
+    totals = np.zeros(4)
+    for start, goal in pairs:
+        base = astar(img, start, goal, args.max_delta, args.scale, moves)
+        h = landmarks.heuristic(goal, start, args.scale, args.active)
+        alt = astar(img, start, goal, args.max_delta, args.scale, moves, heuristic=h)
+        totals += (base.expanded, base.elapsed, alt.expanded, alt.elapsed)
+        line = '%-26s %10.2f %10d %10.4f   %10.2f %10d %10.4f' % ('%s -> %s' % (start, goal), base.cost,
+                                                                 base.expanded, base.elapsed, alt.cost,
+                                                                 alt.expanded, alt.elapsed)
+        if abs(base.cost - alt.cost) > 1e-3:
+            line += '   COST MISMATCH'
+        print(line)
+
+    print('Expanded: octile %d, ALT %d (%.1fx fewer)' % (totals[0], totals[2], totals[0] / max(totals[2], 1)))
+    print('Time: octile %.3f s, ALT %.3f s (%.1fx)' % (totals[1], totals[3], totals[1] / max(totals[3], 1e-9)))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,108 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: simpleai A* vs grid-native A* for route planning
+#
+#   Usage: python bench_routes.py [map_file] [--pairs N] [--max-delta D] [--seed S] [--no-simpleai]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import math
+import time
+
+import numpy as np
+from simpleai.search import astar as simpleai_astar
+from simpleai.search.viewers import BaseViewer
+
+from traversability import load_moves
+from route_problem import MarsRouteProblem, SCALE, ROUTE_MAX_DELTA
+from grid_astar import astar
+from reachability import Reachability, load_components
+
+#------------------------------------------------------------------------------------------------------------------
+#   Helpers
+#------------------------------------------------------------------------------------------------------------------
+
+def random_pairs(img, n_pairs, max_distance, rng):
+    """
+        Returns n_pairs of ((r, c), (r, c)) valid cells at most max_distance pixels apart.
+    """
+    valid = np.argwhere(img >= 0)
+    pairs = []
+    while len(pairs) < n_pairs:
+        a = tuple(int(v) for v in valid[rng.integers(len(valid))])
+        r = a[0] + int(rng.integers(-max_distance, max_distance + 1))
+        c = a[1] + int(rng.integers(-max_distance, max_distance + 1))
+        if 0 <= r < img.shape[0] and 0 <= c < img.shape[1] and img[r, c] >= 0:
+            pairs.append((a, (r, c)))
+    return pairs
+
+
+def run_simpleai(img, start, goal, max_delta, scale):
+    """ Runs simpleai's graph A* and returns (cost, expanded, seconds). """
+    viewer = BaseViewer()
+    t0 = time.perf_counter()
+    node = simpleai_astar(MarsRouteProblem(img, start, goal, max_delta, scale), graph_search=True, viewer=viewer)
+    elapsed = time.perf_counter() - t0
+    cost = node.cost if node is not None else math.inf
+    return cost, viewer.stats['visited_nodes'], elapsed
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares simpleai A* and grid A* on random route queries.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--pairs', type=int, default=10)
+    parser.add_argument('--distance', type=int, default=60, help='maximum start-goal distance in pixels')
+    parser.add_argument('--max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-simpleai', action='store_true', help='run only the grid A*')
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+    moves = load_moves(args.map_file, args.max_delta, img)
+    reachability = Reachability(load_components(args.map_file, args.max_delta, img), args.max_delta)
+    pairs = random_pairs(img, args.pairs, args.distance, np.random.default_rng(args.seed))
+
+    print('%-24s %10s %10s %10s %12s   %10s %10s %10s' % ('start -> goal', 'cost', 'expanded', 'time (s)',
+                                                          'nodes/s', 'simpleai', 'expanded', 'time (s)'))
+    total_grid = total_simple = 0.0
+    found = not_found = rejected = 0
+    for start, goal in pairs:
+        res = astar(img, start, goal, args.max_delta, args.scale, moves, reachability=reachability)
+        total_grid += res.elapsed
+        line = '%-24s %10.2f %10d %10.4f %12.0f' % ('%s -> %s' % (start, goal), res.cost, res.expanded,
+                                                     res.elapsed, res.nodes_per_second)
+        if res.stats.get('rejected'):
+            rejected += 1
+            line += '   unreachable (rejected by the reachability index)'
+            print(line)
+            continue
+        if res.found:
+            found += 1
+        else:
+            not_found += 1
+        if not args.no_simpleai:
+            cost, expanded, elapsed = run_simpleai(img, start, goal, args.max_delta, args.scale)
+            total_simple += elapsed
+            line += '   %10.2f %10d %10.4f' % (cost, expanded, elapsed)
+            if not (math.isinf(cost) and math.isinf(res.cost)) and abs(cost - res.cost) > 1e-3:
+                line += '   COST MISMATCH'
+        print(line)
+
+    print('Pairs: %d found, %d not found, %d rejected' % (found, not_found, rejected))
+    print('Total time: grid A* %.3f s' % total_grid, end='')
+    if not args.no_simpleai:
+        print(', simpleai A* %.3f s (%.1fx)' % (total_simple, total_simple / max(total_grid, 1e-9)), end='')
+    print()
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
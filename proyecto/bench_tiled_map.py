@@ -0,0 +1,110 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: agents and planners on a lazily tiled full-resolution map
+#
+#   Runs greedy_agent, simulated_annealing_agent and astar_window on a TiledMap (opened from a .npy map or
+#   straight from the PDS .img) and reports the tile cache activity and the peak memory of the process.
+#   With --compare, the same queries are run on the whole map loaded in memory and the results are checked.
+#
+#   Usage: python bench_tiled_map.py map_file [--starts N] [--tile T] [--max-tiles K] [--compare]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import resource
+import time
+
+import numpy as np
+
+from pds import load_heights
+from traversability import MAX_DELTA
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from rover_agents import greedy_agent, simulated_annealing_agent
+from tiled_map import TiledMap, astar_window, TILE_SHAPE, MAX_TILES
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def valid_starts(tiled, n, rng):
+    """ Returns n random valid (row, col) pixels, reading only the tiles they fall in. """
+    starts = []
+    while len(starts) < n:
+        r = int(rng.integers(tiled.shape[0]))
+        c = int(rng.integers(tiled.shape[1]))
+        if tiled[r, c] >= 0:
+            starts.append((r, c))
+    return starts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the agents and planners on a tiled map.')
+    parser.add_argument('map_file', help='.npy height map or PDS .img file')
+    parser.add_argument('--starts', type=int, default=10)
+    parser.add_argument('--distance', type=int, default=200, help='maximum start-goal distance of the routes')
+    parser.add_argument('--tile', type=int, default=TILE_SHAPE[0])
+    parser.add_argument('--max-tiles', type=int, default=MAX_TILES)
+    parser.add_argument('--descent-max-delta', type=float, default=MAX_DELTA)
+    parser.add_argument('--route-max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--scale', type=float, default=SCALE)
+    parser.add_argument('--compare', action='store_true', help='check the results against the map in memory')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.map_file.lower().endswith('.img'):
+        tiled = TiledMap.from_pds(args.map_file, tile_shape=(args.tile, args.tile), max_tiles=args.max_tiles)
+    else:
+        tiled = TiledMap.from_npy(args.map_file, tile_shape=(args.tile, args.tile), max_tiles=args.max_tiles)
+    print('Map %s, tiles of %dx%d, at most %d in memory (%.1f MB)' % (
+        tiled.shape, args.tile, args.tile, args.max_tiles,
+        args.max_tiles*args.tile*args.tile*tiled.dtype.itemsize / 2**20))
+
+    rng = np.random.default_rng(args.seed)
+    starts = valid_starts(tiled, args.starts, rng)
+    goals = []
+    for r, c in starts:
+        while True:
+            gr = min(max(r + int(rng.integers(-args.distance, args.distance + 1)), 0), tiled.shape[0] - 1)
+            gc = min(max(c + int(rng.integers(-args.distance, args.distance + 1)), 0), tiled.shape[1] - 1)
+            if tiled[gr, gc] >= 0:
+                goals.append((gr, gc))
+                break
+
+    results = {}
+    t0 = time.perf_counter()
+    results['greedy'] = [greedy_agent(r, c, tiled, args.descent_max_delta) for r, c in starts]
+    t1 = time.perf_counter()
+    results['sa'] = [simulated_annealing_agent(r, c, tiled, args.descent_max_delta) for r, c in starts]
+    t2 = time.perf_counter()
+    routes = [astar_window(tiled, s, g, args.route_max_delta, args.scale) for s, g in zip(starts, goals)]
+    t3 = time.perf_counter()
+    results['route'] = [res.cost for res in routes]
+
+    print('greedy %.3f s, simulated annealing %.3f s, windowed A* %.3f s (%d routes found)' % (
+        t1 - t0, t2 - t1, t3 - t2, sum(res.found for res in routes)))
+    print('Tile cache: %d hits, %d misses, %d tiles resident (%.1f MB)' % (
+        tiled.hits, tiled.misses, len(tiled.tiles), tiled.resident_bytes / 2**20))
+    print('Peak memory of the process: %.1f MB' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+    if args.compare:
+        from grid_astar import astar
+
+        if args.map_file.lower().endswith('.img'):
+            img = load_heights(args.map_file)
+        else:
+            img = np.load(args.map_file)
+        same = [results['greedy'] == [greedy_agent(r, c, img, args.descent_max_delta) for r, c in starts],
+                results['sa'] == [simulated_annealing_agent(r, c, img, args.descent_max_delta) for r, c in starts]]
+        full = [astar(img, s, g, args.route_max_delta, args.scale).cost for s, g in zip(starts, goals)]
+        same.append(all(abs(a - b) < 1e-6 or a == b for a, b in zip(results['route'], full)))
+        print('Same results as in memory: greedy %s, simulated annealing %s, routes %s' % tuple(same))
+        print('Peak memory with the whole map loaded: %.1f MB' % (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
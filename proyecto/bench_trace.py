@@ -0,0 +1,76 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Benchmark: cost of the trace modes of the rover agents
+#
+#   Runs greedy_agent and simulated_annealing_agent from random starts without a trace and with the off,
+#   sampled and full modes, checks that the paths do not change, and optionally saves the full trace.
+#
+#   Usage: python bench_trace.py [map_file] [--starts N] [--max-delta D] [--output DIR]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import os
+import time
+
+import numpy as np
+
+from traversability import MAX_DELTA, Traversability
+from agent_trace import AgentTrace, TRACE_MODES, TRACE_FULL
+from rover_agents import greedy_agent, simulated_annealing_agent
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def run(agent, starts, img, max_delta, traversability, trace):
+    """ Runs an agent from every start. Returns (paths, seconds). """
+    t0 = time.perf_counter()
+    paths = [agent(r, c, img, max_delta, traversability=traversability, trace=trace) for r, c in starts]
+    return paths, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the overhead of the agent trace modes.')
+    parser.add_argument('map_file', nargs='?', default='mars_map.npy')
+    parser.add_argument('--starts', type=int, default=20)
+    parser.add_argument('--max-delta', type=float, default=MAX_DELTA)
+    parser.add_argument('--sample-every', type=int, default=64)
+    parser.add_argument('--output', default=None, help='directory for the columns of the full trace')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    img = np.load(args.map_file)
+    traversability = Traversability(img, args.max_delta)
+    valid = np.argwhere(img >= 0)
+    rng = np.random.default_rng(args.seed)
+    starts = [tuple(int(v) for v in valid[i]) for i in rng.integers(len(valid), size=args.starts)]
+
+    for agent in (greedy_agent, simulated_annealing_agent):
+        reference, base = run(agent, starts, img, args.max_delta, traversability, None)
+        print('%s: no trace %.3f s' % (agent.__name__, base))
+        for mode in TRACE_MODES:
+            trace = AgentTrace(mode, sample_every=args.sample_every)
+            paths, elapsed = run(agent, starts, img, args.max_delta, traversability, trace)
+            line = '  %-8s %.3f s (%.2fx) %9d events, %9d recorded' % (mode, elapsed, elapsed / max(base, 1e-9),
+                                                                     trace.seen, len(trace))
+            if paths != reference:
+                line += '   PATHS CHANGED'
+            print(line)
+
+            if mode == TRACE_FULL:
+                # Cost of the notebook-style text output, written to the null device
+                with open(os.devnull, 'w') as null:
+                    t0 = time.perf_counter()
+                    trace.dump(null)
+                print('  printing the full trace as text: %.3f s' % (time.perf_counter() - t0))
+                if args.output:
+                    trace.save(os.path.join(args.output, agent.__name__))
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
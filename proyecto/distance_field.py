@@ -0,0 +1,240 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Goal-rooted distance field for routes with many starts and a single goal
+#
+#   One Dijkstra search grows from the goal over the traversability graph and stores, for every pixel it
+#   settles, the cost of the optimal route to the goal (cost-to-go) and the direction of the first move of
+#   that route (successor). Afterwards the optimal route of any start is read by following successors, with
+#   no search at all.
+#
+#   The rule of a move (valid destination, |dh| <= max_delta) is symmetric between valid pixels, so the
+#   pixels that can move into a settled pixel are its own valid neighbours and the precomputed mask is used
+#   for the reverse search as well. The search keeps 8 bytes (cost) and 1 byte (successor) per pixel plus the
+#   open list; the results are saved as a float32 and a uint8 .npy file that are read back as memmaps. The
+#   search can also stop once a given set of starts is settled or beyond a maximum cost.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+import time
+from array import array
+from heapq import heappush, heappop
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from traversability import DIRECTIONS, MOVES, compute_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import FIXED, SQRT2
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Successor code of the goal and of the pixels that were not reached
+NO_SUCCESSOR = 255
+
+# Rows copied at a time from the search arrays to the output arrays
+COPY_ROWS = 256
+
+#------------------------------------------------------------------------------------------------------------------
+#   Helpers
+#------------------------------------------------------------------------------------------------------------------
+
+def reverse_table(n_cols, scale=SCALE):
+    """
+        Returns a tuple with, for every traversability mask, the tuple of (offset, cost, k) of the neighbours
+        that can move into the pixel, where k is the direction of the move from the neighbour to the pixel.
+
+        n_cols: Number of columns of the map.
+        scale: Meters per pixel.
+    """
+    table = []
+    for moves in MOVES:
+        table.append(tuple((dr*n_cols + dc, scale*SQRT2 if dr and dc else scale, DIRECTIONS.index((-dr, -dc)))
+                           for dr, dc in moves))
+    return tuple(table)
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class DistanceField(object):
+    """
+        Class that holds the cost-to-go and successor arrays of a goal and follows them to build routes.
+    """
+
+    def __init__(self, goal, cost, successor, max_delta=ROUTE_MAX_DELTA, scale=SCALE, **stats):
+        """
+            This constructor stores the arrays.
+
+            goal: (row, col) of the goal.
+            cost: float32 array with the cost-to-go of every pixel in meters (inf if it was not reached).
+            successor: uint8 array with the direction (index of DIRECTIONS) of the first move of every pixel
+                       (NO_SUCCESSOR for the goal and the pixels that were not reached).
+            max_delta: Maximum height difference between neighbouring pixels.
+            scale: Meters per pixel.
+            stats: Statistics of the search.
+        """
+        self.goal = (int(goal[0]), int(goal[1]))
+        self.cost = cost
+        self.successor = successor
+        self.max_delta = max_delta
+        self.scale = scale
+        self.shape = cost.shape
+        self.stats = dict(stats)
+
+    @classmethod
+    def compute(cls, img, goal, max_delta=ROUTE_MAX_DELTA, scale=SCALE, moves=None, starts=None, limit=None,
+                path=None):
+        """
+            Runs the reverse Dijkstra search from the goal.
+
+            img: 2-D array of heights (invalid pixels < 0).
+            goal: (row, col) of the goal.
+            max_delta: Maximum height difference between neighbouring pixels.
+            scale: Meters per pixel.
+            moves: Precomputed traversability mask of img for max_delta (computed if not given).
+            starts: Optional list of (row, col); the search stops once all of them are settled.
+            limit: Optional maximum cost-to-go in meters; farther pixels are left unreached.
+            path: Optional stem of the output files (<path>.cost.npy and <path>.succ.npy), which are written
+                  as memmaps instead of in-memory arrays.
+        """
+        t0 = time.perf_counter()
+        n_rows, n_cols = img.shape
+        n = n_rows*n_cols
+        if moves is None:
+            moves = compute_moves(img, max_delta)
+        mask = np.ascontiguousarray(moves, dtype=np.uint8).tobytes()
+        table = reverse_table(n_cols, scale)
+
+        g = array('d', [math.inf])*n
+        succ = bytearray([NO_SUCCESSOR])*n
+        closed = bytearray(n)
+        shift = n.bit_length()
+        low = (1 << shift) - 1
+
+        pending = None
+        if starts is not None:
+            pending = {r*n_cols + c for r, c in starts if img[r, c] >= 0}
+        if limit is None:
+            limit = math.inf
+
+        goal_i = goal[0]*n_cols + goal[1]
+        heap = []
+        if img[goal[0], goal[1]] >= 0:
+            g[goal_i] = 0.0
+            heap.append(goal_i)
+        settled = 0
+
+        while heap:
+            key = heappop(heap)
+            j = key & low
+            if closed[j]:
+                continue
+            gj = g[j]
+            if gj > limit:
+                heappush(heap, key)
+                break
+            closed[j] = 1
+            settled += 1
+
+            if pending is not None:
+                pending.discard(j)
+                if not pending:
+                    break
+
+            for off, cost, k in table[mask[j]]:
+                i = j + off
+                if closed[i]:
+                    continue
+                ng = gj + cost
+                if ng < g[i]:
+                    g[i] = ng
+                    succ[i] = k
+                    heappush(heap, (int(ng*FIXED) << shift) | i)
+
+        search_time = time.perf_counter() - t0
+
+        # Pixels left in the open list are not settled, so their values are not final
+        if heap:
+            for key in heap:
+                i = key & low
+                if not closed[i]:
+                    g[i] = math.inf
+                    succ[i] = NO_SUCCESSOR
+
+        if path is None:
+            cost_out = np.empty((n_rows, n_cols), dtype=np.float32)
+            succ_out = np.empty((n_rows, n_cols), dtype=np.uint8)
+        else:
+            cost_out = open_memmap(path + '.cost.npy', mode='w+', dtype=np.float32, shape=(n_rows, n_cols))
+            succ_out = open_memmap(path + '.succ.npy', mode='w+', dtype=np.uint8, shape=(n_rows, n_cols))
+
+        g_view = np.frombuffer(g, dtype=np.float64).reshape(n_rows, n_cols)
+        succ_view = np.frombuffer(succ, dtype=np.uint8).reshape(n_rows, n_cols)
+        for r0 in range(0, n_rows, COPY_ROWS):
+            r1 = min(r0 + COPY_ROWS, n_rows)
+            cost_out[r0:r1] = g_view[r0:r1]
+            succ_out[r0:r1] = succ_view[r0:r1]
+        del g_view, succ_view
+
+        if path is not None:
+            cost_out.flush()
+            succ_out.flush()
+
+        return cls(goal, cost_out, succ_out, max_delta, scale, settled=settled, search_time=search_time,
+                   elapsed=time.perf_counter() - t0)
+
+    @classmethod
+    def load(cls, path, goal, max_delta=ROUTE_MAX_DELTA, scale=SCALE):
+        """
+            Opens the arrays saved by compute(path=...) as read-only memmaps.
+
+            path: Stem of the output files.
+            goal: (row, col) of the goal.
+            max_delta: Maximum height difference used to compute them.
+            scale: Meters per pixel used to compute them.
+        """
+        return cls(goal, np.load(path + '.cost.npy', mmap_mode='r'), np.load(path + '.succ.npy', mmap_mode='r'),
+                   max_delta, scale)
+
+    def reachable(self, start):
+        """ Returns True if the goal can be reached from a (row, col) start. """
+        return bool(np.isfinite(self.cost[start[0], start[1]]))
+
+    def cost_to_go(self, rows, cols):
+        """
+            Returns the cost-to-go in meters of many starts at once (inf for the ones that cannot reach the goal).
+
+            rows, cols: Arrays of row and column indices.
+        """
+        return np.asarray(self.cost[np.asarray(rows), np.asarray(cols)], dtype=np.float64)
+
+    def route(self, start):
+        """
+            Returns (path, cost): the list of (r, c) from the start to the goal and its cost in meters, or
+            (None, inf) if the goal cannot be reached.
+
+            start: (row, col) of the start.
+        """
+        r, c = int(start[0]), int(start[1])
+        if not self.reachable((r, c)):
+            return None, math.inf
+
+        successor = self.successor
+        diagonal = self.scale*SQRT2
+        path = [(r, c)]
+        cost = 0.0
+        while (r, c) != self.goal:
+            dr, dc = DIRECTIONS[successor[r, c]]
+            r += dr
+            c += dc
+            cost += diagonal if dr and dc else self.scale
+            path.append((r, c))
+        return path, cost
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
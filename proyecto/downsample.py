@@ -0,0 +1,123 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Streaming downsampling of PDS height maps
+#
+#   The map is reduced by bands of rows: every band is read from the memory-mapped .img file, converted to
+#   heights and averaged with downscale_local_mean in a worker process, which writes its output rows directly
+#   into a preallocated .npy file. Only one band per worker is held in memory at any time.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from skimage.transform import downscale_local_mean
+
+from pds import read_label, open_image, convert_block
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Approximate size in bytes of the float64 band processed by a worker
+BAND_BYTES = 64 * 2**20
+
+#------------------------------------------------------------------------------------------------------------------
+#   Band reduction
+#------------------------------------------------------------------------------------------------------------------
+
+def reduce_block(heights, sub_rate):
+    """
+        Averages blocks of sub_rate x sub_rate pixels of a height array and marks the blocks with a negative
+        mean as invalid (-1). The rows of heights must start at a multiple of sub_rate.
+
+        heights: float64 array of heights (as returned by pds.load_heights).
+        sub_rate: Subsampling rate.
+    """
+    reduced = downscale_local_mean(heights, (sub_rate, sub_rate))
+    reduced[reduced < 0] = -1
+    return reduced
+
+
+def _reduce_band(task):
+    """
+        Worker function. Reduces the rows [r0, r1) of the source image and stores the result in the
+        output .npy file.
+
+        task: Tuple (input_file, label, output_file, sub_rate, r0, r1).
+    """
+    input_file, label, output_file, sub_rate, r0, r1 = task
+
+    image = open_image(input_file, label)
+    reduced = reduce_block(convert_block(image[r0:r1], label.minV), sub_rate)
+    del image
+
+    output = np.load(output_file, mmap_mode='r+')
+    output[r0 // sub_rate:r0 // sub_rate + reduced.shape[0]] = reduced
+    output.flush()
+    del output
+
+    return r1 - r0
+
+
+def band_rows(n_columns, sub_rate, band_bytes=BAND_BYTES):
+    """
+        Returns the number of source rows per band: a multiple of sub_rate whose float64 conversion takes
+        about band_bytes bytes.
+
+        n_columns: Number of columns of the source image.
+        sub_rate: Subsampling rate.
+        band_bytes: Target size of a band in bytes.
+    """
+    out_rows = max(1, band_bytes // (8 * sub_rate * n_columns))
+    return out_rows * sub_rate
+
+#------------------------------------------------------------------------------------------------------------------
+#   Pipeline
+#------------------------------------------------------------------------------------------------------------------
+
+def downsample_file(input_file, output_file, sub_rate, label=None, workers=None, band_bytes=BAND_BYTES):
+    """
+        Downsamples a PDS height map into a .npy file without loading the whole map. The result is identical
+        to applying reduce_block to pds.load_heights(input_file). Returns the output as a read-only memmap.
+
+        input_file: Path of the .img file.
+        output_file: Path of the .npy file to be written.
+        sub_rate: Subsampling rate.
+        label: PDSLabel of the input file (parsed if not given).
+        workers: Number of worker processes (None = number of CPUs, 1 = run in this process).
+        band_bytes: Approximate size of the band processed at a time.
+    """
+    if label is None:
+        label = read_label(input_file)
+
+    n_rows, n_columns = label.shape
+    out_shape = (-(-n_rows // sub_rate), -(-n_columns // sub_rate))
+
+    # Preallocate the output file; the workers fill it in place
+    output = np.lib.format.open_memmap(output_file, mode='w+', dtype='float64', shape=out_shape)
+    del output
+
+    step = band_rows(n_columns, sub_rate, band_bytes)
+    tasks = [(input_file, label, output_file, sub_rate, r0, min(r0 + step, n_rows))
+             for r0 in range(0, n_rows, step)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+
+    if workers <= 1:
+        for task in tasks:
+            _reduce_band(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(_reduce_band, tasks):
+                pass
+
+    return np.load(output_file, mmap_mode='r')
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
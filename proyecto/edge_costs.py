@@ -0,0 +1,127 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Precomputed edge-cost tensors for slope-aware route costs
+#
+#   For each of the 8 directions of traversability.DIRECTIONS, a float32 array holds the cost of the move
+#   from every pixel to its neighbour in that direction:
+#
+#       cost = distance + height_weight*|dh|      (distance = scale or scale*sqrt(2))
+#
+#   and inf when the move is not allowed (neighbour outside the map or invalid, or |dh| > max_delta). The
+#   tensor has shape (8, rows, cols), so every direction is a contiguous plane that is recomputed with a few
+#   vectorised operations when max_delta or the weights change, and a planner reads the cost of a move with
+#   a single flat index (k*rows*cols + i) instead of reading both heights and computing it.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+
+import numpy as np
+
+from traversability import DIRECTIONS, MOVES
+from route_problem import SCALE, ROUTE_MAX_DELTA
+
+#------------------------------------------------------------------------------------------------------------------
+#   Precomputation
+#------------------------------------------------------------------------------------------------------------------
+
+def compute_edge_costs(img, max_delta=ROUTE_MAX_DELTA, scale=SCALE, height_weight=0.0, out=None):
+    """
+        Returns the float32 array (8, rows, cols) of move costs (inf for forbidden moves).
+
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        scale: Meters per pixel.
+        height_weight: Extra cost per meter of height difference.
+        out: Optional float32 array of the same shape for the result (reused when recomputing).
+    """
+    img = np.asarray(img)
+    n_rows, n_cols = img.shape
+    if out is None:
+        out = np.empty((8, n_rows, n_cols), dtype=np.float32)
+    out.fill(np.inf)
+
+    for k, (dr, dc) in enumerate(DIRECTIONS):
+        src = (slice(max(0, -dr), n_rows - max(0, dr)), slice(max(0, -dc), n_cols - max(0, dc)))
+        dst = (slice(max(0, dr), n_rows - max(0, -dr)), slice(max(0, dc), n_cols - max(0, -dc)))
+        h = img[dst]
+        dh = np.abs(h - img[src])
+        distance = scale*math.sqrt(2) if dr and dc else scale
+        cost = distance + height_weight*dh if height_weight else np.full(dh.shape, distance)
+        plane = out[k]
+        plane[src] = np.where((h >= 0) & (dh <= max_delta), cost, np.inf)
+
+    return out
+
+
+def moves_from_costs(costs):
+    """
+        Returns the uint8 traversability mask (as traversability.compute_moves) of an edge-cost tensor.
+
+        costs: Array (8, rows, cols) of move costs.
+    """
+    moves = np.zeros(costs.shape[1:], dtype=np.uint8)
+    for k in range(8):
+        moves |= np.isfinite(costs[k]).astype(np.uint8) << k
+    return moves
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class EdgeCosts(object):
+    """
+        Class that holds the edge-cost tensor of a height map and its traversability mask.
+    """
+
+    def __init__(self, img, max_delta=ROUTE_MAX_DELTA, scale=SCALE, height_weight=0.0):
+        """
+            This constructor computes the tensor.
+
+            img: 2-D array of heights (invalid pixels < 0).
+            max_delta: Maximum height difference between neighbouring pixels.
+            scale: Meters per pixel.
+            height_weight: Extra cost per meter of height difference.
+        """
+        self.img = img
+        self.costs = None
+        self.recompute(max_delta, scale, height_weight)
+
+    def recompute(self, max_delta=None, scale=None, height_weight=None):
+        """ Recomputes the tensor in place with new parameters (the ones not given are kept). """
+        if max_delta is not None:
+            self.max_delta = max_delta
+        if scale is not None:
+            self.scale = scale
+        if height_weight is not None:
+            self.height_weight = height_weight
+        self.costs = compute_edge_costs(self.img, self.max_delta, self.scale, self.height_weight, self.costs)
+        self.moves = moves_from_costs(self.costs)
+        self._flat = memoryview(self.costs.reshape(-1))
+
+    @property
+    def shape(self):
+        """ Shape (rows, cols) of the map. """
+        return self.costs.shape[1:]
+
+    def cost(self, cell, direction):
+        """ Returns the cost of the move (dr, dc) from a (row, col) cell. """
+        return float(self.costs[DIRECTIONS.index(direction), cell[0], cell[1]])
+
+    def table(self):
+        """
+            Returns a tuple with, for every traversability mask, the tuple of (offset, plane) of its moves, where
+            offset is the change of the flat cell index and plane = k*rows*cols is the start of the cost plane.
+        """
+        n_rows, n_cols = self.shape
+        n = n_rows*n_cols
+        return tuple(tuple((dr*n_cols + dc, DIRECTIONS.index((dr, dc))*n) for dr, dc in moves) for moves in MOVES)
+
+    def flat(self):
+        """ Returns the flat float32 memoryview of the tensor (index plane + i). """
+        return self._flat
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,231 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Grid-native A* for route planning on the Mars map
+#
+#   Same problem as route_problem.MarsRouteProblem, but the search works on flat integer cell indices:
+#   g-scores, parents and the closed set live in flat arrays, the valid moves of a cell come from the
+#   precomputed traversability mask and the open list is a binary heap of packed integer keys
+#   (quantised f-score in the high bits, cell index in the low bits). No Python object is created per node.
+#
+#   The costs and the heuristic are those of MarsRouteProblem, so the optimal route cost is the same as the
+#   one found by simpleai's astar (different routes of equal cost may be returned).
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+import time
+from array import array
+from heapq import heappush, heappop
+
+import numpy as np
+
+from traversability import MOVES, compute_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Resolution of the f-scores in the heap keys (1/FIXED meters)
+FIXED = 2**16
+
+SQRT2 = math.sqrt(2)
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class GridSearchResult(object):
+    """
+        Class that holds the outcome of a grid search.
+    """
+
+    def __init__(self, path, cost, expanded, generated, elapsed, **extra):
+        """
+            This constructor stores the result.
+
+            path: List of (r, c) from the start to the goal, or None if the goal is unreachable.
+            cost: Cost of the path (inf if there is none).
+            expanded: Number of expanded cells.
+            generated: Number of keys pushed to the open list.
+            elapsed: Search time in seconds.
+            extra: Other statistics of the search.
+        """
+        self.path = path
+        self.cost = cost
+        self.expanded = expanded
+        self.generated = generated
+        self.elapsed = elapsed
+        self.stats = dict(extra)
+
+    @property
+    def found(self):
+        """ True if a path was found. """
+        return self.path is not None
+
+    @property
+    def nodes_per_second(self):
+        """ Expanded cells per second. """
+        return self.expanded / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def __repr__(self):
+        return ('GridSearchResult(cost=%.2f, length=%s, expanded=%d, %.0f nodes/s)' %
+                (self.cost, len(self.path) if self.path else None, self.expanded, self.nodes_per_second))
+
+#------------------------------------------------------------------------------------------------------------------
+#   Helpers
+#------------------------------------------------------------------------------------------------------------------
+
+def neighbor_table(n_cols, scale=SCALE):
+    """
+        Returns a tuple with, for every traversability mask, the tuple of (offset, cost) of its moves, where
+        offset is the change of the flat cell index.
+
+        n_cols: Number of columns of the map.
+        scale: Meters per pixel.
+    """
+    table = []
+    for moves in MOVES:
+        table.append(tuple((dr*n_cols + dc, scale*SQRT2 if dr and dc else scale) for dr, dc in moves))
+    return tuple(table)
+
+
+def octile_heuristic(goal, n_cols, scale=SCALE):
+    """
+        Returns h(i): the shortest 8-connected distance from cell i to the goal ignoring obstacles. It is
+        admissible, consistent and never smaller than the straight-line distance.
+
+        goal: (row, col) of the goal.
+        n_cols: Number of columns of the map.
+        scale: Meters per pixel.
+    """
+    gr, gc = goal
+    diag = scale*(SQRT2 - 1)
+
+    def h(i):
+        r, c = divmod(i, n_cols)
+        dr = r - gr if r > gr else gr - r
+        dc = c - gc if c > gc else gc - c
+        return scale*dr + diag*dc if dr > dc else scale*dc + diag*dr
+
+    return h
+
+
+def reconstruct(parent, start_i, goal_i, n_cols):
+    """ Returns the list of (r, c) from start_i to goal_i following the parent array. """
+    path = []
+    i = goal_i
+    while i != start_i:
+        path.append(divmod(i, n_cols))
+        i = parent[i]
+    path.append(divmod(start_i, n_cols))
+    path.reverse()
+    return path
+
+#------------------------------------------------------------------------------------------------------------------
+#   A* search
+#------------------------------------------------------------------------------------------------------------------
+
+def astar(img, start, goal, max_delta=ROUTE_MAX_DELTA, scale=SCALE, moves=None, heuristic=None, weight=1.0,
+          max_expansions=None, reachability=None, edge_costs=None):
+    """
+        Finds the cheapest route between two cells. Returns a GridSearchResult.
+
+        img: 2-D array of heights (invalid pixels < 0).
+        start: (row, col) of the start.
+        goal: (row, col) of the goal.
+        max_delta: Maximum height difference between neighbouring pixels.
+        scale: Meters per pixel.
+        moves: Precomputed traversability mask of img for max_delta (computed if not given).
+        heuristic: Function h(i) of the flat cell index (octile distance if not given).
+        weight: Heuristic inflation (1 = optimal A*, > 1 = weighted A*).
+        max_expansions: Optional limit of expanded cells.
+        reachability: Optional reachability.Reachability for img and max_delta; unreachable goals are
+                      rejected before searching.
+        edge_costs: Optional edge_costs.EdgeCosts of img; the moves and their costs are read from its tensor
+                    (max_delta, scale and moves are then ignored, and the octile heuristic stays admissible).
+    """
+    t0 = time.perf_counter()
+    n_rows, n_cols = img.shape
+    n = n_rows*n_cols
+    if edge_costs is not None:
+        moves = edge_costs.moves
+        scale = edge_costs.scale
+    elif moves is None:
+        moves = compute_moves(img, max_delta)
+
+    start_i = start[0]*n_cols + start[1]
+    goal_i = goal[0]*n_cols + goal[1]
+    if img[start[0], start[1]] < 0 or img[goal[0], goal[1]] < 0:
+        return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0)
+    if reachability is not None and not reachability.reachable(start, goal):
+        return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0, rejected=True)
+
+    mask = np.ascontiguousarray(moves, dtype=np.uint8).tobytes()
+    if edge_costs is not None:
+        table = edge_costs.table()
+        costs = edge_costs.flat()
+    else:
+        table = neighbor_table(n_cols, scale)
+        costs = None
+    h = heuristic if heuristic is not None else octile_heuristic(goal, n_cols, scale)
+
+    g = array('d', [math.inf])*n
+    parent = array('q', [-1])*n
+    closed = bytearray(n)
+
+    shift = n.bit_length()
+    low = (1 << shift) - 1
+
+    g[start_i] = 0.0
+    heap = [(int(weight*h(start_i)*FIXED) << shift) | start_i]
+    expanded = 0
+    generated = 1
+    found = False
+
+    while heap:
+        i = heappop(heap) & low
+        if closed[i]:
+            continue
+        closed[i] = 1
+        expanded += 1
+
+        if i == goal_i:
+            found = True
+            break
+        if max_expansions is not None and expanded >= max_expansions:
+            break
+
+        gi = g[i]
+        if costs is None:
+            for off, cost in table[mask[i]]:
+                j = i + off
+                if closed[j]:
+                    continue
+                ng = gi + cost
+                if ng < g[j]:
+                    g[j] = ng
+                    parent[j] = i
+                    heappush(heap, (int((ng + weight*h(j))*FIXED) << shift) | j)
+                    generated += 1
+        else:
+            for off, plane in table[mask[i]]:
+                j = i + off
+                if closed[j]:
+                    continue
+                ng = gi + costs[plane + i]
+                if ng < g[j]:
+                    g[j] = ng
+                    parent[j] = i
+                    heappush(heap, (int((ng + weight*h(j))*FIXED) << shift) | j)
+                    generated += 1
+
+    elapsed = time.perf_counter() - t0
+    if not found:
+        return GridSearchResult(None, math.inf, expanded, generated, elapsed)
+    return GridSearchResult(reconstruct(parent, start_i, goal_i, n_cols), g[goal_i], expanded, generated, elapsed)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -1,19 +1,26 @@
 #------------------------------------------------------------------------------------------------------------------
 #   Height map pre-processing
+#
+#   Usage: python height_map_preprocessing-1.py [input_file] [output_file] [--sub-rate N] [--no-plot] [--stats]
 #------------------------------------------------------------------------------------------------------------------
+import time
+_start_time = time.perf_counter()
 
 #------------------------------------------------------------------------------------------------------------------
 #   Imports
 #------------------------------------------------------------------------------------------------------------------
-import copy
+import argparse
+import os
+import sys
+
 import numpy as np
-from skimage.transform import downscale_local_mean
 
-import matplotlib.cm as cm
-import matplotlib.pyplot as plt
-from matplotlib.colors import LightSource
+from pds import read_label
+from downsample import downsample_file
+from map_cache import MapCache, cache_key
+from pyramid import Pyramid, build_pyramid_from_pds
 
-import plotly.graph_objects as px
+# The visualisation libraries (matplotlib, plotly) are imported only when the plots are shown
 
 #------------------------------------------------------------------------------------------------------------------
 #   File names
@@ -21,115 +28,186 @@ import plotly.graph_objects as px
 input_file = "mars_map.img"
 output_file = "mars_map.npy"
 
-#------------------------------------------------------------------------------------------------------------------
-#   Load map data
-#------------------------------------------------------------------------------------------------------------------
+# Multi-resolution pyramid of the full-resolution map (None disables it)
+pyramid_file = "mars_map.pyr"
 
-data_file = open(input_file, "rb")
-
-endHeader = False;
-while not endHeader:
-    line = data_file.readline().rstrip().lower()
-
-    sep_line = line.split(b'=')
-       
-    if len(sep_line) == 2:
-        itemName = sep_line[0].rstrip().lstrip()
-        itemValue = sep_line[1].rstrip().lstrip()
-
-        if itemName == b'valid_maximum':
-            maxV = float(itemValue)
-        elif itemName == b'valid_minimum':
-            minV = float(itemValue)
-        elif itemName == b'lines':
-            n_rows = int(itemValue)
-        elif itemName == b'line_samples':
-            n_columns = int(itemValue)
-        elif itemName == b'map_scale':
-            scale_str = itemValue.split()
-            if len(scale_str) > 1:
-                scale = float(scale_str[0])
-
-    elif line == b'end':
-        endHeader = True
-        char = 0
-        while char == 0 or char == 32:
-            char = data_file.read(1)[0]      
-        pos = data_file.seek(-1, 1)
-
-image_size = n_rows*n_columns
-data = data_file.read(4*image_size)
-
-image_data = np.frombuffer(data, dtype=np.dtype('f'))
-image_data = image_data.reshape((n_rows, n_columns))
-image_data = np.array(image_data)
-image_data = image_data.astype('float64')
-
-image_data = image_data - minV;
-image_data[image_data < -10000] = -1;
+# Directory of previously preprocessed maps (None disables the cache)
+cache_dir = ".mars_map_cache"
 
 #------------------------------------------------------------------------------------------------------------------
-#   Subsampling
+#   Preprocessing
 #------------------------------------------------------------------------------------------------------------------
-sub_rate = round(10/scale) 
 
-image_data = downscale_local_mean(image_data, (sub_rate, sub_rate))
-image_data[image_data<0] = -1
+def preprocess(input_file, output_file, label, sub_rate, cache_dir=None, workers=None):
+    """
+        Writes the subsampled height map of input_file to output_file and returns it as a read-only memmap.
+        If cache_dir is given, a previous result for the same file and sub_rate is reused.
+    """
+    if cache_dir is None:
+        return downsample_file(input_file, output_file, sub_rate, label, workers=workers)
 
-print('Sub-sampling:', sub_rate)
+    cache = MapCache(cache_dir)
+    key = cache_key(input_file, label, sub_rate)
+    if cache.get(key) is None:
+        # The map is reduced by bands of rows in a process pool and written directly into the cache
+        data = downsample_file(input_file, cache.data_path(key) + '.tmp', sub_rate, label, workers=workers)
+        cache.put(key, {'input_file': os.path.abspath(input_file), 'sub_rate': sub_rate,
+                        'scale': label.scale*sub_rate, 'shape': list(data.shape),
+                        'minV': label.minV, 'maxV': label.maxV})
+        del data
+    else:
+        print('Using cached map', key[:12])
 
-new_scale = scale*sub_rate
-print('New scale:', new_scale, 'meters/pixel')
+    cache.copy_to(key, output_file)
+    return np.load(output_file, mmap_mode='r')
 
-#------------------------------------------------------------------------------------------------------------------
-#   Save map
-#------------------------------------------------------------------------------------------------------------------
-np.save(output_file, image_data)
+
+def update_pyramid(input_file, pyramid_file, label):
+    """
+        Writes the multi-resolution pyramid of input_file at its native resolution, unless pyramid_file
+        already holds the pyramid of the same input.
+    """
+    key = cache_key(input_file, label, 1)
+    if os.path.exists(pyramid_file):
+        try:
+            pyramid = Pyramid(pyramid_file)
+        except ValueError:
+            pyramid = None
+        if pyramid is not None and pyramid.key == key:
+            return pyramid
+
+    return build_pyramid_from_pds(input_file, pyramid_file, label, key=key)
 
 #------------------------------------------------------------------------------------------------------------------
-#   Show 3D surface
+#   Visualisation
 #------------------------------------------------------------------------------------------------------------------
 
-x = new_scale*np.arange(image_data.shape[1])
-y = new_scale*np.arange(image_data.shape[0])
-X, Y = np.meshgrid(x, y)
+def show_surface(image_data, new_scale, max_vertices):
+    """
+        Shows the subsampled map as a 3D surface decimated to at most max_vertices vertices.
+    """
+    from render import surface_figure
 
-fig = px.Figure(data = px.Surface(x=X, y=Y, z=np.flipud(image_data), colorscale='hot', cmin = 0, 
-                           lighting = dict(ambient = 0.0, diffuse = 0.8, fresnel = 0.02, roughness = 0.4, specular = 0.2), 
-                           lightposition=dict(x=0, y=n_rows/2, z=2*maxV)),
-                
-                layout = px.Layout(scene_aspectmode='manual', 
-                                   scene_aspectratio=dict(x=1, y=n_rows/n_columns, z=max((maxV-minV)/x.max(), 0.2)), 
-                                   scene_zaxis_range = [0,maxV-minV])
-                )
+    fig, stride, error = surface_figure(image_data, new_scale, max_vertices)
+    print('Surface: %d pixels per vertex, max. error %.2f m' % (stride**2, error))
+    fig.show()
 
-fig.show()
+
+def show_image(image_data, scale, n_rows, n_columns):
+    """
+        Shows the subsampled map as a shaded relief image.
+    """
+    import copy
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LightSource
+
+    cmap = copy.copy(plt.cm.get_cmap('autumn'))
+    cmap.set_under(color='black')   
+
+    ls = LightSource(315, 45)
+    rgb = ls.shade(image_data, cmap=cmap, vmin = 0, vmax = image_data.max(), vert_exag=2, blend_mode='hsv')
+
+    fig, ax = plt.subplots()
+
+    im = ax.imshow(rgb, cmap=cmap, vmin = 0, vmax = image_data.max(), 
+                    extent =[0, scale*n_columns, 0, scale*n_rows], 
+                    interpolation ='nearest', origin ='upper')
+
+    cbar = fig.colorbar(im, ax=ax)
+    cbar.ax.set_ylabel('Altura (m)')
+
+    plt.title('Superficie de Marte')
+    plt.xlabel('x (m)')
+    plt.ylabel('y (m)')
+
+    plt.show()
+
+
+def print_stats(import_time):
+    """
+        Prints the import time, the total time and the peak resident memory of this process.
+    """
+    import resource
+
+    # ru_maxrss is given in KB on Linux and in bytes on macOS
+    unit = 2**20 if sys.platform == 'darwin' else 2**10
+    print('Import time: %.3f s' % import_time)
+    print('Total time: %.3f s' % (time.perf_counter() - _start_time))
+    print('Peak RSS: %.1f MB (workers: %.1f MB)' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+                                                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit))
 
 #------------------------------------------------------------------------------------------------------------------
-#   Show surface image
-#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Preprocesses a PDS height map of Mars into a .npy file.')
+    parser.add_argument('input_file', nargs='?', default=input_file, help='PDS .img file (default: %(default)s)')
+    parser.add_argument('output_file', nargs='?', default=output_file, help='output .npy file (default: %(default)s)')
+    parser.add_argument('--sub-rate', type=int, default=None,
+                        help='subsampling rate (default: the one that gives about 10 meters/pixel)')
+    parser.add_argument('--pyramid', default=pyramid_file, help='pyramid file (default: %(default)s)')
+    parser.add_argument('--no-pyramid', dest='pyramid', action='store_const', const=None,
+                        help='do not write the pyramid file')
+    parser.add_argument('--cache-dir', default=cache_dir, help='cache directory (default: %(default)s)')
+    parser.add_argument('--no-cache', dest='cache_dir', action='store_const', const=None,
+                        help='do not use the cache')
+    parser.add_argument('--workers', type=int, default=None, help='subsampling processes (default: all CPUs)')
+    parser.add_argument('--max-vertices', type=int, default=250000,
+                        help='vertex budget of the 3D surface (default: %(default)s)')
+    parser.add_argument('--no-plot', action='store_true', help='do not import the plotting libraries nor show the map')
+    parser.add_argument('--stats', action='store_true', help='print the run time and the peak memory')
+    return parser.parse_args(argv)
+
 
-cmap = copy.copy(plt.cm.get_cmap('autumn'))
-cmap.set_under(color='black')   
+def main(argv=None):
+    import_time = time.perf_counter() - _start_time
+    args = parse_args(argv)
 
-ls = LightSource(315, 45)
-rgb = ls.shade(image_data, cmap=cmap, vmin = 0, vmax = image_data.max(), vert_exag=2, blend_mode='hsv')
+    #--------------------------------------------------------------------------------------------------------------
+    #   Load map data
+    #--------------------------------------------------------------------------------------------------------------
 
-fig, ax = plt.subplots()
+    label = read_label(args.input_file)
 
-im = ax.imshow(rgb, cmap=cmap, vmin = 0, vmax = image_data.max(), 
-                extent =[0, scale*n_columns, 0, scale*n_rows], 
-                interpolation ='nearest', origin ='upper')
+    n_rows, n_columns = label.shape
+    scale = label.scale
+    minV = label.minV
+    maxV = label.maxV
 
-cbar = fig.colorbar(im, ax=ax)
-cbar.ax.set_ylabel('Altura (m)')
+    #--------------------------------------------------------------------------------------------------------------
+    #   Subsampling and save map
+    #--------------------------------------------------------------------------------------------------------------
+    sub_rate = args.sub_rate if args.sub_rate is not None else round(10/scale)
 
-plt.title('Superficie de Marte')
-plt.xlabel('x (m)')
-plt.ylabel('y (m)')
+    image_data = preprocess(args.input_file, args.output_file, label, sub_rate, args.cache_dir, args.workers)
 
-plt.show()
+    print('Sub-sampling:', sub_rate)
+
+    new_scale = scale*sub_rate
+    print('New scale:', new_scale, 'meters/pixel')
+
+    #--------------------------------------------------------------------------------------------------------------
+    #   Multi-resolution pyramid
+    #--------------------------------------------------------------------------------------------------------------
+    if args.pyramid is not None:
+        pyramid = update_pyramid(args.input_file, args.pyramid, label)
+        print('Pyramid levels:', ', '.join('%dx%d' % level.shape for level in pyramid.levels()))
+
+    if args.stats:
+        print_stats(import_time)
+
+    #--------------------------------------------------------------------------------------------------------------
+    #   Show 3D surface and surface image
+    #--------------------------------------------------------------------------------------------------------------
+    if not args.no_plot:
+        show_surface(image_data, new_scale, args.max_vertices)
+        show_image(image_data, scale, n_rows, n_columns)
+
+# The guard is required because the subsampling workers import this module when they are spawned
+if __name__ == '__main__':
+    main()
 
 #------------------------------------------------------------------------------------------------------------------
 #   End of file
-#------------------------------------------------------------------------------------------------------------------
\ No newline at end of file
+#------------------------------------------------------------------------------------------------------------------
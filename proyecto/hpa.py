@@ -0,0 +1,378 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Hierarchical pathfinding (HPA*) for route planning on the Mars map
+#
+#   The map is split into square clusters. Along every border between two neighbouring clusters, each maximal
+#   run of pixels where the rover can cross (orthogonally, under the max_delta rule) and move along the border
+#   on both sides becomes an entrance with one transition (two, at the ends of the run, if it is wider than
+#   max_entrance). The transition pixels are the nodes of an abstract graph; they are joined by inter-cluster
+#   edges (one step) and by intra-cluster edges whose cost is the shortest distance inside the cluster,
+#   precomputed once.
+#
+#   A query connects the start and the goal to the nodes of their clusters, searches the abstract graph with
+#   A* and refines only the chosen corridor, one cluster at a time. Routes respect the same max_delta rule and
+#   -1 invalid pixels as grid_astar, but may be slightly longer than the optimal ones. Areas joined only by
+#   diagonal steps across a cluster border are not connected in the abstract graph; when a reachability map
+#   is given, goals that are reachable but not found through the abstract graph are searched with flat A*.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+import time
+from heapq import heappush, heappop
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from traversability import DIRECTIONS, compute_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import GridSearchResult, SQRT2, astar
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Side of the clusters, in pixels
+CLUSTER_SIZE = 32
+
+# Entrances wider than this get a transition at each end instead of one in the middle
+MAX_ENTRANCE = 6
+
+#------------------------------------------------------------------------------------------------------------------
+#   Window graphs
+#------------------------------------------------------------------------------------------------------------------
+
+def window_graph(moves, r0, r1, c0, c1, scale=SCALE):
+    """
+        Returns the CSR graph of the moves that stay inside the window [r0, r1) x [c0, c1). Nodes are the local
+        flat indices (r - r0)*(c1 - c0) + (c - c0).
+
+        moves: Traversability mask of the map.
+        r0, r1, c0, c1: Bounds of the window.
+        scale: Meters per pixel.
+    """
+    h, w = r1 - r0, c1 - c0
+    window = np.asarray(moves[r0:r1, c0:c1])
+    local = np.arange(h*w, dtype=np.int64).reshape(h, w)
+
+    src = []
+    dst = []
+    cost = []
+    for k, (dr, dc) in enumerate(DIRECTIONS):
+        rs = slice(max(0, -dr), h - max(0, dr))
+        cs = slice(max(0, -dc), w - max(0, dc))
+        ok = ((window[rs, cs] >> k) & 1).astype(bool)
+        a = local[rs, cs][ok]
+        src.append(a)
+        dst.append(a + dr*w + dc)
+        cost.append(np.full(len(a), scale*SQRT2 if dr and dc else scale))
+
+    src = np.concatenate(src)
+    dst = np.concatenate(dst)
+    cost = np.concatenate(cost)
+    return coo_matrix((cost, (src, dst)), shape=(h*w, h*w)).tocsr()
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class HPAPlanner(object):
+    """
+        Class that precomputes the abstract graph of a height map and answers route queries over it.
+    """
+
+    def __init__(self, img, max_delta=ROUTE_MAX_DELTA, scale=SCALE, cluster_size=CLUSTER_SIZE, moves=None,
+                 max_entrance=MAX_ENTRANCE):
+        """
+            This constructor builds the abstract graph.
+
+            img: 2-D array of heights (invalid pixels < 0).
+            max_delta: Maximum height difference between neighbouring pixels.
+            scale: Meters per pixel.
+            cluster_size: Side of the clusters, in pixels.
+            moves: Precomputed traversability mask of img for max_delta (computed if not given).
+            max_entrance: Entrances wider than this get two transitions.
+        """
+        t0 = time.perf_counter()
+        self.img = img
+        self.max_delta = max_delta
+        self.scale = scale
+        self.cluster_size = cluster_size
+        self.max_entrance = max_entrance
+        self.moves = np.asarray(compute_moves(img, max_delta) if moves is None else moves)
+        self.shape = img.shape
+        n_rows, n_cols = self.shape
+        self.n_clusters = (-(-n_rows // cluster_size), -(-n_cols // cluster_size))
+
+        # Abstract graph: node = flat pixel index, edges[node] = {neighbour: cost}
+        self.edges = {}
+        # cluster_nodes[(i, j)] = list of the nodes inside cluster (i, j)
+        self.cluster_nodes = {}
+
+        self._build_entrances()
+        self._build_intra_edges()
+        self.build_time = time.perf_counter() - t0
+
+    #--------------------------------------------------------------------------------------------------------------
+    #   Precomputation
+    #--------------------------------------------------------------------------------------------------------------
+
+    def cluster_of(self, cell):
+        """ Returns the (i, j) cluster of a (row, col) cell. """
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    def cluster_bounds(self, cluster):
+        """ Returns the (r0, r1, c0, c1) bounds of a cluster. """
+        i, j = cluster
+        size = self.cluster_size
+        return (i*size, min((i + 1)*size, self.shape[0]), j*size, min((j + 1)*size, self.shape[1]))
+
+    def _add_node(self, cell):
+        n_cols = self.shape[1]
+        node = cell[0]*n_cols + cell[1]
+        if node not in self.edges:
+            self.edges[node] = {}
+            self.cluster_nodes.setdefault(self.cluster_of(cell), []).append(node)
+        return node
+
+    def _add_transitions(self, runs, cell_a, cell_b):
+        """ Adds the transitions of the runs of crossable positions along a border. """
+        for start, end in runs:
+            if end - start > self.max_entrance:
+                positions = (start, end - 1)
+            else:
+                positions = ((start + end - 1) // 2,)
+            for p in positions:
+                a = self._add_node(cell_a(p))
+                b = self._add_node(cell_b(p))
+                self.edges[a][b] = self.scale
+                self.edges[b][a] = self.scale
+
+    @staticmethod
+    def _runs(flags, links):
+        """
+            Returns the list of (start, end) of the runs of True values of a 1-D boolean array, split between
+            the positions p and p + 1 where links[p] is False.
+
+            flags: Positions where the border can be crossed.
+            links: Positions from which the next one can be reached along the border on both sides.
+        """
+        padded = np.concatenate(([False], flags, [False])).astype(np.int8)
+        change = np.flatnonzero(np.diff(padded))
+        cuts = np.flatnonzero(~links) + 1
+        runs = []
+        for start, end in zip(change[0::2], change[1::2]):
+            for cut in cuts[(cuts > start) & (cuts < end)]:
+                runs.append((start, cut))
+                start = cut
+            runs.append((start, end))
+        return runs
+
+    def _build_entrances(self):
+        n_rows, n_cols = self.shape
+        size = self.cluster_size
+        east = DIRECTIONS.index((0, 1))
+        south = DIRECTIONS.index((1, 0))
+
+        # Vertical borders: column c on the left side, c + 1 on the right side. A run is split where the rover
+        # cannot move south along the border on both sides, so every transition of a run reaches the same pixels
+        for c in range(size - 1, n_cols - 1, size):
+            for r0 in range(0, n_rows, size):
+                r1 = min(r0 + size, n_rows)
+                flags = ((self.moves[r0:r1, c] >> east) & 1).astype(bool)
+                links = ((self.moves[r0:r1 - 1, c] & self.moves[r0:r1 - 1, c + 1]) >> south) & 1
+                self._add_transitions(self._runs(flags, links.astype(bool)), lambda p, r0=r0, c=c: (r0 + p, c),
+                                      lambda p, r0=r0, c=c: (r0 + p, c + 1))
+
+        # Horizontal borders: row r on the upper side, r + 1 on the lower side, split where the rover cannot move
+        # east along the border on both sides
+        for r in range(size - 1, n_rows - 1, size):
+            for c0 in range(0, n_cols, size):
+                c1 = min(c0 + size, n_cols)
+                flags = ((self.moves[r, c0:c1] >> south) & 1).astype(bool)
+                links = ((self.moves[r, c0:c1 - 1] & self.moves[r + 1, c0:c1 - 1]) >> east) & 1
+                self._add_transitions(self._runs(flags, links.astype(bool)), lambda p, r=r, c0=c0: (r, c0 + p),
+                                      lambda p, r=r, c0=c0: (r + 1, c0 + p))
+
+    def _local_index(self, node, bounds):
+        r0, r1, c0, c1 = bounds
+        r, c = divmod(node, self.shape[1])
+        return (r - r0)*(c1 - c0) + (c - c0)
+
+    def _build_intra_edges(self):
+        for cluster, nodes in self.cluster_nodes.items():
+            if len(nodes) < 2:
+                continue
+            bounds = self.cluster_bounds(cluster)
+            graph = window_graph(self.moves, *bounds, scale=self.scale)
+            local = [self._local_index(n, bounds) for n in nodes]
+            dist = dijkstra(graph, indices=local)
+            for a, node in enumerate(nodes):
+                for b, other in enumerate(nodes):
+                    d = dist[a, local[b]]
+                    if a != b and np.isfinite(d):
+                        # Inter-cluster edges are never inside a cluster, so they are not overwritten
+                        self.edges[node][other] = float(d)
+
+    #--------------------------------------------------------------------------------------------------------------
+    #   Queries
+    #--------------------------------------------------------------------------------------------------------------
+
+    def _connect(self, cell):
+        """ Returns {node: cost} from a cell to the abstract nodes of its cluster. """
+        cluster = self.cluster_of(cell)
+        nodes = self.cluster_nodes.get(cluster, [])
+        if not nodes:
+            return {}
+        bounds = self.cluster_bounds(cluster)
+        graph = window_graph(self.moves, *bounds, scale=self.scale)
+        dist = dijkstra(graph, indices=self._local_index(cell[0]*self.shape[1] + cell[1], bounds))
+        out = {}
+        for node in nodes:
+            d = dist[self._local_index(node, bounds)]
+            if np.isfinite(d):
+                out[node] = float(d)
+        return out
+
+    def _refine(self, a, b):
+        """ Returns the flat pixels after a up to b: one step between clusters, the shortest route inside one. """
+        n_cols = self.shape[1]
+        cell_a = divmod(a, n_cols)
+        cell_b = divmod(b, n_cols)
+        if self.cluster_of(cell_a) != self.cluster_of(cell_b):
+            return [b]
+
+        bounds = self.cluster_bounds(self.cluster_of(cell_a))
+        r0, r1, c0, c1 = bounds
+        w = c1 - c0
+        graph = window_graph(self.moves, *bounds, scale=self.scale)
+        la = self._local_index(a, bounds)
+        _, pred = dijkstra(graph, indices=la, return_predecessors=True)
+
+        path = []
+        k = self._local_index(b, bounds)
+        while k != la:
+            lr, lc = divmod(k, w)
+            path.append((r0 + lr)*n_cols + c0 + lc)
+            k = pred[k]
+        path.reverse()
+        return path
+
+    def plan(self, start, goal, reachability=None):
+        """
+            Finds a route from start to goal. Returns a GridSearchResult whose expanded count is the number of
+            abstract nodes expanded.
+
+            start: (row, col) of the start.
+            goal: (row, col) of the goal.
+            reachability: Optional reachability.Reachability for img and max_delta; unreachable goals are
+                          rejected before searching, and reachable goals that the abstract graph misses are
+                          searched with flat A*.
+        """
+        t0 = time.perf_counter()
+        img = self.img
+        n_cols = self.shape[1]
+        start = (int(start[0]), int(start[1]))
+        goal = (int(goal[0]), int(goal[1]))
+        if img[start[0], start[1]] < 0 or img[goal[0], goal[1]] < 0:
+            return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0)
+        if reachability is not None and not reachability.reachable(start, goal):
+            return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0, rejected=True)
+
+        s = start[0]*n_cols + start[1]
+        g = goal[0]*n_cols + goal[1]
+
+        # Temporary edges of the start and the goal
+        from_start = self._connect(start)
+        to_goal = self._connect(goal)
+
+        # Start and goal in the same cluster: direct route inside it (may be improved through the abstract graph)
+        best_cost = math.inf
+        if self.cluster_of(start) == self.cluster_of(goal):
+            bounds = self.cluster_bounds(self.cluster_of(start))
+            graph = window_graph(self.moves, *bounds, scale=self.scale)
+            d = dijkstra(graph, indices=self._local_index(s, bounds))[self._local_index(g, bounds)]
+            best_cost = float(d)
+        direct = best_cost
+
+        gr, gc = goal
+        diag = self.scale*(SQRT2 - 1)
+
+        def h(node):
+            r, c = divmod(node, n_cols)
+            dr = abs(r - gr)
+            dc = abs(c - gc)
+            return self.scale*max(dr, dc) + diag*min(dr, dc)
+
+        # Abstract A*: the start is a virtual source with edges from_start, the goal is reached through to_goal
+        gscore = {}
+        parent = {}
+        heap = []
+        for node, cost in from_start.items():
+            if cost < gscore.get(node, math.inf):
+                gscore[node] = cost
+                parent[node] = s
+                heappush(heap, (cost + h(node), node))
+
+        closed = set()
+        expanded = 0
+        best_last = None
+        while heap:
+            f, node = heappop(heap)
+            if node in closed:
+                continue
+            if f >= best_cost:
+                break
+            closed.add(node)
+            expanded += 1
+
+            if node in to_goal and gscore[node] + to_goal[node] < best_cost:
+                best_cost = gscore[node] + to_goal[node]
+                best_last = node
+
+            gn = gscore[node]
+            for other, cost in self.edges[node].items():
+                if other in closed:
+                    continue
+                ng = gn + cost
+                if ng < gscore.get(other, math.inf):
+                    gscore[other] = ng
+                    parent[other] = node
+                    heappush(heap, (ng + h(other), other))
+
+        search_time = time.perf_counter() - t0
+        if math.isinf(best_cost):
+            if reachability is not None:
+                # Only connected through steps the abstract graph does not have (e.g. diagonal border crossings)
+                res = astar(img, start, goal, self.max_delta, self.scale, self.moves)
+                return GridSearchResult(res.path, res.cost, expanded + res.expanded, len(gscore) + res.generated,
+                                        time.perf_counter() - t0, search_time=search_time, fallback=True)
+            return GridSearchResult(None, math.inf, expanded, len(gscore), time.perf_counter() - t0,
+                                    search_time=search_time)
+
+        # Refinement of the corridor
+        if best_last is None or direct <= best_cost:
+            waypoints = [s, g]
+        else:
+            waypoints = [g, best_last]
+            while waypoints[-1] != s:
+                waypoints.append(parent[waypoints[-1]])
+            waypoints.reverse()
+
+        cells = [s]
+        for a, b in zip(waypoints[:-1], waypoints[1:]):
+            cells.extend(self._refine(a, b))
+
+        path = [divmod(i, n_cols) for i in cells]
+        cost = 0.0
+        for (r1, c1), (r2, c2) in zip(path[:-1], path[1:]):
+            cost += self.scale*SQRT2 if r1 != r2 and c1 != c2 else self.scale
+
+        return GridSearchResult(path, cost, expanded, len(gscore), time.perf_counter() - t0,
+                                search_time=search_time, abstract_nodes=len(waypoints))
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,221 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Landmark (ALT) heuristics for repeated route queries on the Mars map
+#
+#   K landmark pixels are chosen far apart from each other (farthest-point selection, starting in the largest
+#   reachability region so that they are not trapped in a small one) and the shortest
+#   distance from each of them to every pixel is computed once with Dijkstra over the traversability graph.
+#   Since the graph is symmetric, the triangle inequality gives, for every landmark L,
+#
+#       d(v, goal) >= |d(L, goal) - d(L, v)|
+#
+#   which is a much tighter lower bound than the straight-line distance around craters and cliffs. The
+#   distances are stored in pixel units (1 per straight step, sqrt(2) per diagonal step) as a float32 array
+#   of shape (K, rows, cols) next to the map, and are read back as a memmap.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from scipy.sparse.csgraph import dijkstra
+
+from traversability import compute_moves, load_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import octile_heuristic
+from hpa import window_graph
+from reachability import label_components, load_components
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Default number of landmarks
+N_LANDMARKS = 16
+
+# Default number of landmarks used by a query (the ones with the best bound at the start)
+ACTIVE_LANDMARKS = 4
+
+# Relative float32 rounding error allowed for the stored distances
+FLOAT32_TOLERANCE = 2.0**-22
+
+#------------------------------------------------------------------------------------------------------------------
+#   Precomputation
+#------------------------------------------------------------------------------------------------------------------
+
+def compute_landmarks(img, max_delta=ROUTE_MAX_DELTA, n_landmarks=N_LANDMARKS, moves=None, out=None, seed=0,
+                      labels=None):
+    """
+        Chooses the landmarks and returns the float32 array (n_landmarks, rows, cols) of distances in pixel
+        units from each of them (inf for pixels they cannot reach).
+
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        n_landmarks: Number of landmarks.
+        moves: Precomputed traversability mask of img for max_delta (computed if not given).
+        out: Optional float32 array of the same shape for the result (for example a memmap).
+        seed: Seed of the random pixel of the largest region the selection starts from.
+        labels: Precomputed region labels of img for max_delta (see reachability.label_components).
+    """
+    img = np.asarray(img)
+    n_rows, n_cols = img.shape
+    if moves is None:
+        moves = compute_moves(img, max_delta)
+    if labels is None:
+        labels = label_components(img, max_delta, moves)
+    if out is None:
+        out = np.empty((n_landmarks, n_rows, n_cols), dtype=np.float32)
+
+    graph = window_graph(moves, 0, n_rows, 0, n_cols, scale=1.0)
+
+    # The selection starts from the pixel farthest from a random one of the largest region (label 0), then
+    # adds every time the pixel whose distance to the closest landmark is largest
+    largest = np.flatnonzero(np.asarray(labels).ravel() == 0)
+    first = int(largest[np.random.default_rng(seed).integers(len(largest))])
+    dist = dijkstra(graph, indices=first)
+    closest = np.full(n_rows*n_cols, np.inf)
+    candidate = np.where(np.isfinite(dist), dist, -1.0)
+
+    for k in range(n_landmarks):
+        landmark = int(np.argmax(candidate))
+        dist = dijkstra(graph, indices=landmark)
+        out[k] = dist.reshape(n_rows, n_cols)
+        closest = np.minimum(closest, dist)
+        candidate = np.where(np.isfinite(closest), closest, -1.0)
+
+    return out
+
+
+def landmarks_file(map_file, max_delta=ROUTE_MAX_DELTA, n_landmarks=N_LANDMARKS):
+    """
+        Returns the path of the cached landmark distances of a height map file (next to the map).
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+        n_landmarks: Number of landmarks.
+    """
+    stem = map_file[:-len('.npy')] if map_file.endswith('.npy') else map_file
+    return '%s.landmarks-%g-%d.npy' % (stem, max_delta, n_landmarks)
+
+
+def load_landmarks(map_file, max_delta=ROUTE_MAX_DELTA, n_landmarks=N_LANDMARKS, img=None):
+    """
+        Returns the landmark distances of a height map file as a read-only memmap. They are computed and saved
+        next to the map if they do not exist or are older than the map.
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+        n_landmarks: Number of landmarks.
+        img: The height map, if it is already loaded.
+    """
+    path = landmarks_file(map_file, max_delta, n_landmarks)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(map_file):
+        if img is None:
+            img = np.load(map_file)
+        tmp = path + '.tmp.npy'
+        out = open_memmap(tmp, mode='w+', dtype=np.float32, shape=(n_landmarks,) + img.shape)
+        compute_landmarks(img, max_delta, n_landmarks, load_moves(map_file, max_delta, img), out,
+                          labels=load_components(map_file, max_delta, img))
+        out.flush()
+        del out
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode='r')
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class Landmarks(object):
+    """
+        Class that builds ALT heuristics for grid_astar.astar from precomputed landmark distances.
+    """
+
+    def __init__(self, distances, max_delta=ROUTE_MAX_DELTA):
+        """
+            This constructor stores the distances.
+
+            distances: Array (K, rows, cols) of distances in pixel units (see compute_landmarks).
+            max_delta: Maximum height difference used to compute the distances.
+        """
+        self.distances = distances
+        self.max_delta = max_delta
+        self.shape = distances.shape[1:]
+        # Flat views of every landmark; indexing a memoryview is much faster than indexing a numpy array
+        self._flat = [memoryview(np.ascontiguousarray(d).reshape(-1)) for d in distances]
+        self._tolerance = [FLOAT32_TOLERANCE*float(np.max(d, where=np.isfinite(d), initial=0.0))
+                           for d in distances]
+
+    @classmethod
+    def compute(cls, img, max_delta=ROUTE_MAX_DELTA, n_landmarks=N_LANDMARKS, moves=None):
+        """ Chooses the landmarks of a height map and computes their distances in memory. """
+        return cls(compute_landmarks(img, max_delta, n_landmarks, moves), max_delta)
+
+    @classmethod
+    def from_file(cls, map_file, max_delta=ROUTE_MAX_DELTA, n_landmarks=N_LANDMARKS, img=None):
+        """ Loads (or computes and saves) the landmark distances of a height map file. """
+        return cls(load_landmarks(map_file, max_delta, n_landmarks, img), max_delta)
+
+    @property
+    def cells(self):
+        """ List of (row, col) of the landmarks (the only pixel at distance 0 of each one). """
+        return [tuple(int(v) for v in np.unravel_index(int(np.argmin(d)), self.shape)) for d in self.distances]
+
+    def lower_bound(self, a, b):
+        """ Returns the landmark lower bound, in pixel units, of the distance between two (row, col) cells. """
+        n_cols = self.shape[1]
+        i = a[0]*n_cols + a[1]
+        j = b[0]*n_cols + b[1]
+        best = 0.0
+        for flat, tol in zip(self._flat, self._tolerance):
+            da = flat[i]
+            db = flat[j]
+            if da != float('inf') and db != float('inf'):
+                best = max(best, abs(da - db) - tol)
+        return best
+
+    def heuristic(self, goal, start=None, scale=SCALE, active=ACTIVE_LANDMARKS):
+        """
+            Returns h(i) for grid_astar.astar: the largest of the octile distance and the landmark bounds. It is
+            admissible, so astar still returns optimal routes.
+
+            goal: (row, col) of the goal.
+            start: (row, col) of the start; if given, only the active landmarks with the best bounds at the
+                   start are used, which makes h cheaper to evaluate.
+            scale: Meters per pixel.
+            active: Number of landmarks used when the start is given.
+        """
+        n_cols = self.shape[1]
+        goal_i = goal[0]*n_cols + goal[1]
+        octile = octile_heuristic(goal, n_cols, scale)
+
+        terms = []
+        for flat, tol in zip(self._flat, self._tolerance):
+            dg = flat[goal_i]
+            if dg != float('inf'):
+                terms.append((flat, dg, tol))
+        if start is not None and len(terms) > active:
+            start_i = start[0]*n_cols + start[1]
+            terms.sort(key=lambda t: -abs(t[0][start_i] - t[1]) if t[0][start_i] != float('inf') else 0.0)
+            terms = terms[:active]
+
+        inf = float('inf')
+
+        def h(i):
+            best = 0.0
+            for flat, dg, tol in terms:
+                d = flat[i]
+                if d != inf:
+                    bound = (d - dg if d > dg else dg - d) - tol
+                    if bound > best:
+                        best = bound
+            best *= scale
+            o = octile(i)
+            return o if o > best else best
+
+        return h
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
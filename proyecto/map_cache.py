@@ -0,0 +1,162 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Content-addressed cache of preprocessed height maps
+#
+#   Every entry is a <key>.npy file plus a <key>.json metadata sidecar. The key is a hash of the PDS label
+#   fields, the size and modification time of the .img file and the subsampling rate, so an entry is only
+#   reused when the same input is preprocessed with the same parameters. The cache directory is kept below a
+#   size limit by evicting the least recently used entries.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import shutil
+import time
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Bump when the preprocessing output changes for the same inputs
+CACHE_VERSION = 1
+
+# Default size limit of the cache directory
+MAX_BYTES = 2 * 2**30
+
+#------------------------------------------------------------------------------------------------------------------
+#   Keys
+#------------------------------------------------------------------------------------------------------------------
+
+def cache_key(input_file, label, sub_rate, **extra):
+    """
+        Returns the hexadecimal key that identifies the preprocessing of a file.
+
+        input_file: Path of the .img file.
+        label: PDSLabel of the file.
+        sub_rate: Subsampling rate.
+        extra: Other parameters that change the output.
+    """
+    stat = os.stat(input_file)
+    fields = {
+        'version': CACHE_VERSION,
+        'lines': label.n_rows,
+        'line_samples': label.n_columns,
+        'map_scale': label.scale,
+        'valid_minimum': label.minV,
+        'valid_maximum': label.maxV,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sub_rate': sub_rate,
+    }
+    fields.update(extra)
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class MapCache(object):
+    """
+        Class that manages a directory of cached height maps.
+    """
+
+    def __init__(self, cache_dir, max_bytes=MAX_BYTES):
+        """
+            This constructor creates the cache directory if needed.
+
+            cache_dir: Directory where the entries are stored.
+            max_bytes: Size limit of the directory. The least recently used entries are removed above it.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def data_path(self, key):
+        """ Path of the .npy file of an entry. """
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def meta_path(self, key):
+        """ Path of the metadata sidecar of an entry. """
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, key):
+        """
+            Returns the metadata of an entry, or None if it is not cached. The entry is marked as recently used.
+
+            key: Key of the entry.
+        """
+        try:
+            with open(self.meta_path(key)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.data_path(key)):
+            return None
+
+        now = time.time()
+        os.utime(self.meta_path(key), (now, now))
+        return meta
+
+    def put(self, key, meta):
+        """
+            Registers an entry whose data was already written to data_path(key) + '.tmp'. The data is moved in
+            place before the sidecar is written, so a partially written entry is never visible.
+
+            key: Key of the entry.
+            meta: Dictionary with the metadata of the entry.
+        """
+        os.replace(self.data_path(key) + '.tmp', self.data_path(key))
+        tmp = self.meta_path(key) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.meta_path(key))
+        self.evict(keep=key)
+
+    def copy_to(self, key, output_file):
+        """
+            Copies the data of an entry to output_file.
+
+            key: Key of the entry.
+            output_file: Destination path.
+        """
+        shutil.copyfile(self.data_path(key), output_file)
+
+    def evict(self, keep=None):
+        """
+            Removes the least recently used entries until the directory is below max_bytes.
+
+            keep: Key of an entry that must not be removed.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            try:
+                size = os.path.getsize(self.data_path(key)) + os.path.getsize(self.meta_path(key))
+                used = os.path.getmtime(self.meta_path(key))
+            except OSError:
+                continue
+            entries.append((used, key, size))
+            total += size
+
+        entries.sort()
+        for used, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in (self.meta_path(key), self.data_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,191 @@
+#------------------------------------------------------------------------------------------------------------------
+#   PDS height map reader
+#
+#   Parses the label of a PDS (.img) file and exposes the image section as a memory-mapped array,
+#   so the raster is never read into a Python bytes object or copied before it is needed.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import numpy as np
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Pixels below this value (after removing the valid minimum) have no data
+INVALID_THRESHOLD = -10000
+
+# Height assigned to pixels without data
+INVALID_HEIGHT = -1
+
+# Default number of rows converted at a time
+BLOCK_ROWS = 512
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class PDSLabel(object):
+    """
+        Class that stores the fields of a PDS label that are needed to interpret the height map.
+    """
+
+    def __init__(self, n_rows, n_columns, scale, minV, maxV, offset):
+        """
+            This constructor stores the label fields.
+
+            n_rows: Number of image lines.
+            n_columns: Number of samples per line.
+            scale: Map scale in meters/pixel (None if the label does not define it).
+            minV: Valid minimum height.
+            maxV: Valid maximum height.
+            offset: Byte position where the image section starts.
+        """
+        self.n_rows = n_rows
+        self.n_columns = n_columns
+        self.scale = scale
+        self.minV = minV
+        self.maxV = maxV
+        self.offset = offset
+
+    @property
+    def shape(self):
+        """ Shape (rows, columns) of the image. """
+        return (self.n_rows, self.n_columns)
+
+    def __repr__(self):
+        return ('PDSLabel(n_rows=%d, n_columns=%d, scale=%r, minV=%r, maxV=%r, offset=%d)' %
+                (self.n_rows, self.n_columns, self.scale, self.minV, self.maxV, self.offset))
+
+#------------------------------------------------------------------------------------------------------------------
+#   Label parsing
+#------------------------------------------------------------------------------------------------------------------
+
+def read_label(input_file):
+    """
+        Parses the label of a PDS file and returns a PDSLabel. The image section is assumed to start
+        at the first byte after the END line that is neither a null nor a blank character.
+
+        input_file: Path of the .img file.
+    """
+    scale = None
+    minV = maxV = None
+    n_rows = n_columns = None
+
+    with open(input_file, "rb") as data_file:
+        while True:
+            line = data_file.readline()
+            if not line:
+                raise ValueError('%s: END of the PDS label not found' % input_file)
+            line = line.rstrip().lower()
+
+            sep_line = line.split(b'=')
+
+            if len(sep_line) == 2:
+                itemName = sep_line[0].strip()
+                itemValue = sep_line[1].strip()
+
+                if itemName == b'valid_maximum':
+                    maxV = float(itemValue)
+                elif itemName == b'valid_minimum':
+                    minV = float(itemValue)
+                elif itemName == b'lines':
+                    n_rows = int(itemValue)
+                elif itemName == b'line_samples':
+                    n_columns = int(itemValue)
+                elif itemName == b'map_scale':
+                    scale_str = itemValue.split()
+                    if len(scale_str) > 1:
+                        scale = float(scale_str[0])
+
+            elif line == b'end':
+                # Skip the padding between the label and the image
+                char = b'\x00'
+                while char in (b'\x00', b' '):
+                    char = data_file.read(1)
+                    if not char:
+                        raise ValueError('%s: image section is empty' % input_file)
+                offset = data_file.tell() - 1
+                break
+
+    if n_rows is None or n_columns is None or minV is None or maxV is None:
+        raise ValueError('%s: label lacks LINES, LINE_SAMPLES, VALID_MINIMUM or VALID_MAXIMUM' % input_file)
+
+    return PDSLabel(n_rows, n_columns, scale, minV, maxV, offset)
+
+#------------------------------------------------------------------------------------------------------------------
+#   Image access
+#------------------------------------------------------------------------------------------------------------------
+
+def open_image(input_file, label=None):
+    """
+        Returns a read-only np.memmap of shape (rows, columns) over the raw float32 samples of the image.
+        No data is read until the array is indexed.
+
+        input_file: Path of the .img file.
+        label: PDSLabel of the file (parsed if not given).
+    """
+    if label is None:
+        label = read_label(input_file)
+
+    return np.memmap(input_file, dtype=np.dtype('f'), mode='r', offset=label.offset, shape=label.shape)
+
+
+def convert_block(raw_block, minV, out=None):
+    """
+        Converts a block of raw samples to heights relative to the valid minimum, marking the pixels
+        without data with INVALID_HEIGHT.
+
+        raw_block: Array of raw float32 samples.
+        minV: Valid minimum height of the map.
+        out: Optional float64 array where the result is written.
+    """
+    if out is None:
+        out = np.empty(raw_block.shape, dtype='float64')
+    np.subtract(raw_block, minV, out=out, dtype='float64')
+    out[out < INVALID_THRESHOLD] = INVALID_HEIGHT
+    return out
+
+
+def iter_blocks(image, block_rows=BLOCK_ROWS):
+    """
+        Yields (first_row, last_row, block) tuples that cover the image in bands of block_rows rows.
+
+        image: Array (usually a memmap) with the image samples.
+        block_rows: Number of rows per band.
+    """
+    n_rows = image.shape[0]
+    for r0 in range(0, n_rows, block_rows):
+        r1 = min(r0 + block_rows, n_rows)
+        yield r0, r1, image[r0:r1]
+
+
+def load_heights(input_file, label=None, out=None, block_rows=BLOCK_ROWS):
+    """
+        Loads the height map as float64, relative to the valid minimum and with the pixels without data
+        set to INVALID_HEIGHT. The conversion is done band by band over the memory-mapped image, so
+        the peak memory is the output array plus one band.
+
+        input_file: Path of the .img file.
+        label: PDSLabel of the file (parsed if not given).
+        out: Optional float64 array (or memmap) of the image shape where the result is written.
+        block_rows: Number of rows converted at a time.
+    """
+    if label is None:
+        label = read_label(input_file)
+
+    image = open_image(input_file, label)
+    if out is None:
+        out = np.empty(label.shape, dtype='float64')
+
+    for r0, r1, block in iter_blocks(image, block_rows):
+        convert_block(block, label.minV, out[r0:r1])
+
+    del image
+    return out
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
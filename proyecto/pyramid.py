@@ -0,0 +1,307 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Multi-resolution terrain pyramid
+#
+#   A pyramid file stores a height map at full resolution plus 2x, 4x, 8x ... reductions. Every reduced cell
+#   keeps the mean, minimum and maximum height of the full-resolution pixels it covers. A coarse cell is valid
+#   only if all of its pixels are valid; invalid cells hold -1 in the three arrays, as in mars_map.npy.
+#
+#   File layout:
+#       bytes 0-7     MAGIC
+#       bytes 8-15    length of the JSON index (little-endian uint64)
+#       JSON index    {"version", "scale", "dtype", "key", "levels": [{"factor", "scale", "shape", "mean", "min", "max"}]}
+#                     where "mean", "min" and "max" are byte offsets of C-ordered arrays and "key" identifies
+#                     the source (see map_cache.cache_key)
+#       arrays        every array starts at a multiple of ALIGN so it can be memory-mapped on its own
+#
+#   Level 0 has a single array; its "mean", "min" and "max" offsets are the same.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import json
+import struct
+
+import numpy as np
+
+from pds import read_label, open_image, convert_block, iter_blocks
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+MAGIC = b'MARSPYR\x00'
+VERSION = 1
+ALIGN = 4096
+
+# Heights are stored as float32, the precision of the PDS samples
+DTYPE = np.dtype('<f4')
+
+# Levels are added while both sides of the previous one are larger than this
+MIN_SIZE = 16
+
+# Approximate number of cells processed at a time while building a level
+BAND_CELLS = 2**21
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class Level(object):
+    """
+        Class that represents one level of a pyramid. The arrays are read-only memmaps.
+    """
+
+    def __init__(self, index, factor, scale, mean, min, max):
+        """
+            This constructor stores the level arrays.
+
+            index: Level number (0 = full resolution).
+            factor: Number of full-resolution pixels per cell side (2**index).
+            scale: Meters per cell.
+            mean, min, max: Arrays with the mean, minimum and maximum height of every cell.
+        """
+        self.index = index
+        self.factor = factor
+        self.scale = scale
+        self.mean = mean
+        self.min = min
+        self.max = max
+
+    @property
+    def shape(self):
+        """ Shape (rows, columns) of the level. """
+        return self.mean.shape
+
+    def __repr__(self):
+        return 'Level(index=%d, factor=%d, scale=%r, shape=%r)' % (self.index, self.factor, self.scale, self.shape)
+
+
+class Pyramid(object):
+    """
+        Class that gives access to the levels of a pyramid file. Only the levels that are used are paged in.
+    """
+
+    def __init__(self, path):
+        """
+            This constructor reads the index of a pyramid file.
+
+            path: Path of the pyramid file.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, length = struct.unpack('<8sQ', f.read(16))
+            if magic != MAGIC:
+                raise ValueError('%s is not a pyramid file' % path)
+            self.index = json.loads(f.read(length).decode())
+        if self.index['version'] != VERSION:
+            raise ValueError('%s: unsupported pyramid version %r' % (path, self.index['version']))
+
+        self.scale = self.index['scale']
+        self.key = self.index.get('key')
+        self.dtype = np.dtype(self.index['dtype'])
+        self._levels = {}
+
+    def __len__(self):
+        return len(self.index['levels'])
+
+    def level(self, k):
+        """
+            Returns level k (0 = full resolution).
+
+            k: Level number.
+        """
+        if k not in self._levels:
+            info = self.index['levels'][k]
+            shape = tuple(info['shape'])
+            arrays = [np.memmap(self.path, dtype=self.dtype, mode='r', offset=info[name], shape=shape)
+                      for name in ('mean', 'min', 'max')]
+            self._levels[k] = Level(k, info['factor'], info['scale'], *arrays)
+        return self._levels[k]
+
+    def levels(self):
+        """ Returns the list of levels, from full resolution to the coarsest one. """
+        return [self.level(k) for k in range(len(self))]
+
+    def level_for_cells(self, max_cells):
+        """
+            Returns the finest level with at most max_cells cells (the coarsest level if none is small enough).
+
+            max_cells: Maximum number of cells.
+        """
+        for k, info in enumerate(self.index['levels']):
+            if info['shape'][0]*info['shape'][1] <= max_cells:
+                return self.level(k)
+        return self.level(len(self) - 1)
+
+    def level_for_scale(self, scale):
+        """
+            Returns the coarsest level whose cells are not larger than scale meters.
+
+            scale: Maximum meters per cell.
+        """
+        best = self.level(0)
+        for k, info in enumerate(self.index['levels']):
+            if info['scale'] <= scale:
+                best = self.level(k)
+        return best
+
+#------------------------------------------------------------------------------------------------------------------
+#   Building
+#------------------------------------------------------------------------------------------------------------------
+
+def level_shapes(shape, min_size=MIN_SIZE):
+    """
+        Returns the shapes of the levels of a pyramid for a full-resolution map of the given shape. Levels are
+        added while both sides of the previous one are larger than min_size.
+
+        shape: Shape (rows, columns) of the full-resolution map.
+        min_size: Minimum size of the side of the coarsest level.
+    """
+    shapes = [tuple(shape)]
+    while min(shapes[-1]) > min_size and max(shapes[-1]) > 1:
+        r, c = shapes[-1]
+        shapes.append(((r + 1) // 2, (c + 1) // 2))
+    return shapes
+
+
+def _extent(n_cells, factor, n_pixels):
+    """ Number of full-resolution pixels covered by each of n_cells cells along one axis. """
+    start = np.arange(n_cells) * factor
+    return (np.minimum(start + factor, n_pixels) - start).astype('float64')
+
+
+def _reduce(mean, lo, hi, weights):
+    """
+        Reduces 2x2 blocks of a band of cells. Returns the mean, minimum and maximum of the coarse cells.
+
+        mean, lo, hi: Arrays of the band at the finer level.
+        weights: Number of full-resolution pixels covered by every cell of the band.
+    """
+    h, w = mean.shape
+    H, W = h + h % 2, w + w % 2
+
+    def pad(a, fill):
+        out = np.full((H, W), fill, dtype='float64')
+        out[:h, :w] = a
+        return out.reshape(H // 2, 2, W // 2, 2)
+
+    present = pad(np.ones((h, w)), 0) > 0
+    valid = pad(mean >= 0, False) > 0
+    wgt = pad(weights, 0)
+
+    ok = (valid == present).all(axis=(1, 3))
+    sum_w = wgt.sum(axis=(1, 3))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out_mean = (pad(mean, 0) * wgt).sum(axis=(1, 3)) / sum_w
+    out_min = pad(np.where(mean >= 0, lo, np.inf), np.inf).min(axis=(1, 3))
+    out_max = pad(np.where(mean >= 0, hi, -np.inf), -np.inf).max(axis=(1, 3))
+
+    out_mean[~ok] = -1
+    out_min[~ok] = -1
+    out_max[~ok] = -1
+    return out_mean, out_min, out_max
+
+
+def build_pyramid(source, output_file, scale, convert=None, min_size=MIN_SIZE, band_cells=BAND_CELLS, key=None):
+    """
+        Builds a pyramid file from a full-resolution height map. The map is processed by bands of rows, so the
+        source can be a memmap larger than the available memory. Returns the opened Pyramid.
+
+        source: 2-D array with the full-resolution map (invalid pixels < 0).
+        output_file: Path of the pyramid file.
+        scale: Meters per pixel of the source.
+        convert: Optional function applied to every band of source rows to obtain heights
+                 (for example pds.convert_block when source holds raw PDS samples).
+        min_size: Minimum size of the side of the coarsest level.
+        band_cells: Approximate number of cells processed at a time.
+        key: Optional string stored in the index to identify the source.
+    """
+    shapes = level_shapes(source.shape, min_size)
+    n_rows, n_columns = shapes[0]
+
+    # Lay out the arrays after the index; the index size is estimated with placeholder offsets first
+    levels = []
+    for k, s in enumerate(shapes):
+        levels.append({'factor': 2**k, 'scale': scale * 2**k, 'shape': list(s), 'mean': 0, 'min': 0, 'max': 0})
+    index = {'version': VERSION, 'scale': scale, 'dtype': DTYPE.str, 'key': key, 'levels': levels}
+
+    reserve = 16 + len(json.dumps(index).encode()) + 64*len(levels)
+    offset = -(-reserve // ALIGN) * ALIGN
+    for k, info in enumerate(levels):
+        nbytes = info['shape'][0]*info['shape'][1]*DTYPE.itemsize
+        names = ('mean',) if k == 0 else ('mean', 'min', 'max')
+        for name in names:
+            info[name] = offset
+            offset += -(-nbytes // ALIGN) * ALIGN
+        if k == 0:
+            info['min'] = info['max'] = info['mean']
+
+    header = json.dumps(index).encode()
+    with open(output_file, 'wb') as f:
+        f.write(struct.pack('<8sQ', MAGIC, len(header)))
+        f.write(header)
+        f.truncate(offset)
+
+    def arrays(k):
+        info = levels[k]
+        return [np.memmap(output_file, dtype=DTYPE, mode='r+', offset=info[name], shape=tuple(info['shape']))
+                for name in ('mean', 'min', 'max')]
+
+    # Level 0: copy (and convert) the source by bands
+    mean0 = arrays(0)[0]
+    block_rows = max(1, band_cells // n_columns)
+    for r0, r1, block in iter_blocks(source, block_rows):
+        block = np.asarray(block) if convert is None else convert(block)
+        mean0[r0:r1] = np.where(block >= 0, block, -1)
+    mean0.flush()
+    del mean0
+
+    # Coarser levels: reduce the previous level by bands of an even number of rows
+    for k in range(1, len(levels)):
+        prev_mean, prev_min, prev_max = arrays(k - 1)
+        mean, lo, hi = arrays(k)
+
+        factor = 2**(k - 1)
+        rows_w = _extent(prev_mean.shape[0], factor, n_rows)
+        cols_w = _extent(prev_mean.shape[1], factor, n_columns)
+
+        block_rows = max(2, (band_cells // prev_mean.shape[1]) // 2 * 2)
+        for r0 in range(0, prev_mean.shape[0], block_rows):
+            r1 = min(r0 + block_rows, prev_mean.shape[0])
+            weights = np.outer(rows_w[r0:r1], cols_w)
+            m, a, b = _reduce(np.asarray(prev_mean[r0:r1], dtype='float64'), prev_min[r0:r1],
+                              prev_max[r0:r1], weights)
+            mean[r0 // 2:r0 // 2 + m.shape[0]] = m
+            lo[r0 // 2:r0 // 2 + m.shape[0]] = a
+            hi[r0 // 2:r0 // 2 + m.shape[0]] = b
+
+        for a in (mean, lo, hi):
+            a.flush()
+        del prev_mean, prev_min, prev_max, mean, lo, hi
+
+    return Pyramid(output_file)
+
+
+def build_pyramid_from_pds(input_file, output_file, label=None, min_size=MIN_SIZE, band_cells=BAND_CELLS, key=None):
+    """
+        Builds a pyramid file at the native resolution of a PDS height map, reading it through a memmap.
+
+        input_file: Path of the .img file.
+        output_file: Path of the pyramid file.
+        label: PDSLabel of the file (parsed if not given).
+        min_size: Minimum size of the side of the coarsest level.
+        band_cells: Approximate number of cells processed at a time.
+        key: Optional string stored in the index to identify the source.
+    """
+    if label is None:
+        label = read_label(input_file)
+
+    image = open_image(input_file, label)
+    return build_pyramid(image, output_file, label.scale, lambda block: convert_block(block, label.minV),
+                         min_size, band_cells, key)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
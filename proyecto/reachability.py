@@ -0,0 +1,163 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Reachability index of the Mars height map
+#
+#   Two valid pixels are connected when the rover can move between them under the max_delta rule. Since the
+#   rule is symmetric between valid pixels, the map splits into connected regions; a goal is reachable from a
+#   start only if both are in the same region. The regions are labelled once (connected components over the
+#   traversability mask) and saved next to the map, so impossible queries are rejected with two lookups
+#   instead of exhausting the frontier of a search.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import os
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from traversability import MAX_DELTA, DIRECTIONS, compute_moves, load_moves
+
+#------------------------------------------------------------------------------------------------------------------
+#   Labelling
+#------------------------------------------------------------------------------------------------------------------
+
+def label_components(img, max_delta=MAX_DELTA, moves=None):
+    """
+        Returns an int32 array with the region of every pixel (0, 1, ...) and -1 for invalid pixels. Regions
+        are numbered from the largest one.
+
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        moves: Precomputed traversability mask of img for max_delta (computed if not given).
+    """
+    img = np.asarray(img)
+    if moves is None:
+        moves = compute_moves(img, max_delta)
+    n_rows, n_cols = img.shape
+    n = n_rows*n_cols
+    valid = (img >= 0).ravel()
+    flat_moves = np.asarray(moves).ravel()
+
+    # Every edge appears in both directions; the directions E, SE, S and SW are enough to cover all of them
+    index = np.arange(n, dtype=np.int64)
+    src = []
+    dst = []
+    for dr, dc in ((0, 1), (1, 1), (1, 0), (1, -1)):
+        k = DIRECTIONS.index((dr, dc))
+        ok = ((flat_moves >> k) & 1).astype(bool) & valid
+        src.append(index[ok])
+        dst.append(index[ok] + dr*n_cols + dc)
+    src = np.concatenate(src)
+    dst = np.concatenate(dst)
+
+    graph = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n)).tocsr()
+    _, labels = connected_components(graph, directed=False)
+
+    # Renumber by decreasing size, invalid pixels excluded
+    labels = np.where(valid, labels, -1)
+    sizes = np.bincount(labels[valid])
+    order = np.argsort(-sizes, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    labels[valid] = rank[labels[valid]]
+    return labels.reshape(img.shape).astype(np.int32)
+
+
+def components_file(map_file, max_delta=MAX_DELTA):
+    """
+        Returns the path of the cached region labels of a height map file (next to the map).
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+    """
+    stem = map_file[:-len('.npy')] if map_file.endswith('.npy') else map_file
+    return '%s.components-%g.npy' % (stem, max_delta)
+
+
+def load_components(map_file, max_delta=MAX_DELTA, img=None):
+    """
+        Returns the region labels of a height map file as a read-only memmap. They are computed and saved next
+        to the map if they do not exist or are older than the map.
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+        img: The height map, if it is already loaded.
+    """
+    path = components_file(map_file, max_delta)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(map_file):
+        if img is None:
+            img = np.load(map_file)
+        tmp = path + '.tmp.npy'
+        np.save(tmp, label_components(img, max_delta, load_moves(map_file, max_delta, img)))
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode='r')
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class Reachability(object):
+    """
+        Class that answers whether the rover can go from one pixel to another under a max_delta rule.
+    """
+
+    def __init__(self, labels, max_delta=MAX_DELTA):
+        """
+            This constructor stores the region labels.
+
+            labels: Array of region labels (see label_components).
+            max_delta: Maximum height difference used to compute the labels.
+        """
+        self.labels = labels
+        self.max_delta = max_delta
+        self.sizes = np.bincount(np.asarray(labels)[np.asarray(labels) >= 0].ravel())
+
+    @classmethod
+    def compute(cls, img, max_delta=MAX_DELTA, moves=None):
+        """ Labels the regions of a height map. """
+        return cls(label_components(img, max_delta, moves), max_delta)
+
+    @classmethod
+    def from_file(cls, map_file, max_delta=MAX_DELTA, img=None):
+        """ Loads (or computes and saves) the region labels of a height map file. """
+        return cls(load_components(map_file, max_delta, img), max_delta)
+
+    def region(self, cell):
+        """ Returns the region of a (row, col) cell (-1 if it is invalid or outside the map). """
+        r, c = cell
+        n_rows, n_cols = self.labels.shape
+        if not (0 <= r < n_rows and 0 <= c < n_cols):
+            return -1
+        return int(self.labels[r, c])
+
+    def region_size(self, cell):
+        """ Returns the number of pixels reachable from a cell, itself included (0 if it is invalid). """
+        label = self.region(cell)
+        return int(self.sizes[label]) if label >= 0 else 0
+
+    def reachable(self, start, goal):
+        """ Returns True if the goal can be reached from the start. """
+        label = self.region(start)
+        return label >= 0 and label == self.region(goal)
+
+    def can_move(self, start):
+        """ Returns True if the start is valid and has at least one valid neighbour. """
+        return self.region_size(start) > 1
+
+    def reachable_many(self, starts, goals):
+        """
+            Vectorised version of reachable().
+
+            starts, goals: Arrays of shape (n, 2) with (row, col) cells inside the map.
+        """
+        starts = np.asarray(starts)
+        goals = np.asarray(goals)
+        a = self.labels[starts[:, 0], starts[:, 1]]
+        b = self.labels[goals[:, 0], goals[:, 1]]
+        return (a >= 0) & (a == b)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
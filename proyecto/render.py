@@ -0,0 +1,192 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Level-of-detail 3D rendering of height maps
+#
+#   The map is decimated to a vertex budget before it is handed to plotly: every vertex is the mean of a block
+#   of stride x stride pixels, placed at the center of the block, and the axes are passed as 1-D arrays. The
+#   decimation reports its worst vertical error (largest distance between a block mean and the heights inside
+#   the block), so the budget can be traded against fidelity.
+#
+#   Coordinates follow the convention of the rover agents: pixel (r, c) of a map with n_rows rows is drawn at
+#   x = c*scale, y = (n_rows - 1 - r)*scale, so routes given as lists of (r, c) line up with the surface.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+
+import numpy as np
+from skimage.measure import block_reduce
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Default number of surface vertices
+MAX_VERTICES = 250000
+
+# Height of the route lines above the surface, in meters
+ROUTE_LIFT = 2.0
+
+#------------------------------------------------------------------------------------------------------------------
+#   Decimation
+#------------------------------------------------------------------------------------------------------------------
+
+def choose_stride(shape, max_vertices=MAX_VERTICES):
+    """
+        Returns the smallest block size that keeps the decimated map within max_vertices vertices.
+
+        shape: Shape (rows, columns) of the map.
+        max_vertices: Vertex budget.
+    """
+    n_rows, n_cols = shape
+    stride = max(1, int(math.ceil(math.sqrt(n_rows*n_cols / max_vertices))))
+    while math.ceil(n_rows/stride)*math.ceil(n_cols/stride) > max_vertices:
+        stride += 1
+    return stride
+
+
+def choose_stride_for_error(heights, max_error, max_vertices=None):
+    """
+        Returns the largest block size whose decimation error is at most max_error meters (and, if given,
+        that fits in max_vertices). Block sizes are tried by powers of two.
+
+        heights: 2-D array of heights (invalid pixels < 0).
+        max_error: Maximum vertical error in meters.
+        max_vertices: Optional vertex budget that must also be met.
+    """
+    best = 1
+    stride = 2
+    while stride <= min(heights.shape):
+        if decimate(heights, stride)[3] > max_error:
+            break
+        best = stride
+        stride *= 2
+
+    if max_vertices is not None:
+        best = max(best, choose_stride(heights.shape, max_vertices))
+    return best
+
+
+def block_centers(n, stride):
+    """ Returns the center (in pixels) of each block of size stride along an axis of n pixels. """
+    start = np.arange(0, n, stride)
+    end = np.minimum(start + stride, n)
+    return (start + end - 1) / 2.0
+
+
+def decimate(heights, stride):
+    """
+        Decimates a height map by averaging blocks of stride x stride pixels. As in the pyramid levels, a block
+        is valid only if all of its pixels are valid; invalid blocks hold -1. Returns (z, rows, cols, error):
+        the decimated heights, the center of every block in pixels of the original map and the worst vertical
+        error over the valid blocks.
+
+        heights: 2-D array of heights (invalid pixels < 0).
+        stride: Block size.
+    """
+    heights = np.asarray(heights, dtype='float64')
+    rows = block_centers(heights.shape[0], stride)
+    cols = block_centers(heights.shape[1], stride)
+    if stride == 1:
+        return heights, rows, cols, 0.0
+
+    # Padding cells must not count in the mean, minimum or maximum of the edge blocks
+    valid = heights >= 0
+    block = (stride, stride)
+    total = block_reduce(np.where(valid, heights, 0.0), block, np.sum, cval=0)
+    count = block_reduce(np.ones(heights.shape), block, np.sum, cval=0)
+    n_valid = block_reduce(valid.astype('float64'), block, np.sum, cval=0)
+    lo = block_reduce(np.where(valid, heights, np.inf), block, np.min, cval=np.inf)
+    hi = block_reduce(np.where(valid, heights, -np.inf), block, np.max, cval=-np.inf)
+
+    ok = n_valid == count
+    z = np.where(ok, total / count, -1.0)
+    error = float(np.max(np.maximum(hi - z, z - lo)[ok])) if ok.any() else 0.0
+    return z, rows, cols, error
+
+
+def decimate_level(level, native_shape):
+    """
+        Returns (z, rows, cols, error) for a pyramid level, as decimate does, without reading the full map.
+
+        level: pyramid.Level built from the map that is being rendered.
+        native_shape: Shape of level 0 of the pyramid.
+    """
+    z = np.asarray(level.mean, dtype='float64')
+    rows = block_centers(native_shape[0], level.factor)
+    cols = block_centers(native_shape[1], level.factor)
+
+    valid = z >= 0
+    lo = np.asarray(level.min, dtype='float64')
+    hi = np.asarray(level.max, dtype='float64')
+    error = float(np.max(np.maximum(hi - z, z - lo)[valid])) if valid.any() else 0.0
+    return z, rows, cols, error
+
+#------------------------------------------------------------------------------------------------------------------
+#   Rendering
+#------------------------------------------------------------------------------------------------------------------
+
+def surface_figure(heights=None, scale=1.0, max_vertices=MAX_VERTICES, routes=None, pyramid=None, stride=None,
+                   title=None):
+    """
+        Builds a plotly figure with the decimated surface of a height map and, optionally, rover routes drawn
+        over it. Returns (figure, stride, error).
+
+        heights: 2-D array of heights on which the routes are given (may be None if pyramid is given).
+        scale: Meters per pixel of heights.
+        max_vertices: Vertex budget of the surface.
+        routes: Optional dictionary {label: [(r, c), ...]} (or list of paths) in pixels of heights.
+        pyramid: Optional pyramid.Pyramid built from heights; its levels are used instead of decimating.
+        stride: Block size to use instead of the one derived from max_vertices.
+        title: Optional title of the figure.
+    """
+    import plotly.graph_objects as px
+
+    if pyramid is not None:
+        native_shape = pyramid.level(0).shape
+        level = pyramid.level_for_cells(max_vertices)
+        if stride is not None:
+            level = pyramid.level(min(len(pyramid) - 1, int(math.log2(stride))))
+        z, rows, cols, error = decimate_level(level, native_shape)
+        stride = level.factor
+        if heights is None:
+            heights = pyramid.level(0).mean
+    else:
+        native_shape = heights.shape
+        if stride is None:
+            stride = choose_stride(native_shape, max_vertices)
+        z, rows, cols, error = decimate(heights, stride)
+
+    n_rows = native_shape[0]
+    x = scale*cols
+    # Rows grow downwards; the surface is flipped so that y grows upwards
+    y = scale*(n_rows - 1 - rows[::-1])
+    z = np.flipud(z)
+
+    zmax = float(z.max())
+    data = [px.Surface(x=x, y=y, z=z, colorscale='hot', cmin=0,
+                       lighting=dict(ambient=0.0, diffuse=0.8, fresnel=0.02, roughness=0.4, specular=0.2),
+                       lightposition=dict(x=0, y=scale*n_rows/2, z=2*zmax))]
+
+    if routes is not None:
+        if not isinstance(routes, dict):
+            routes = {'Ruta %d' % (i + 1): path for i, path in enumerate(routes)}
+        for name, path in routes.items():
+            if not path:
+                continue
+            r, c = np.asarray(path).T
+            data.append(px.Scatter3d(x=scale*c, y=scale*(n_rows - 1 - r),
+                                     z=np.asarray(heights[r, c], dtype='float64') + ROUTE_LIFT,
+                                     mode='lines+markers', marker=dict(size=2), line=dict(width=4), name=name))
+
+    width = float(x.max()) if len(x) > 1 else 1.0
+    layout = px.Layout(title=title, scene_aspectmode='manual',
+                       scene_aspectratio=dict(x=1, y=n_rows/native_shape[1], z=max(zmax/width, 0.2)),
+                       scene_zaxis_range=[0, zmax])
+
+    return px.Figure(data=data, layout=layout), stride, error
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,129 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Route planning on the Mars map as a simpleai search problem
+#
+#   The rover moves in the 8-neighbourhood; a move is allowed when the destination is valid (h >= 0) and the
+#   height difference is at most max_delta. The cost of a move is the distance between pixel centres (scale or
+#   scale*sqrt(2)) and the heuristic is the straight-line distance to the goal.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+
+from simpleai.search import SearchProblem
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Meters per pixel of mars_map.npy
+SCALE = 10.0174
+
+# Maximum height difference between neighbouring pixels for route planning, in meters
+ROUTE_MAX_DELTA = 0.5
+
+#------------------------------------------------------------------------------------------------------------------
+#   Coordinates
+#------------------------------------------------------------------------------------------------------------------
+
+def meters_to_pixels(x_m, y_m, scale, img_shape):
+    """
+        Converts coordinates in meters to (row, col) indices of the height map (the vertical axis is inverted).
+
+        x_m: x coordinate in meters.
+        y_m: y coordinate in meters.
+        scale: Meters per pixel.
+        img_shape: Shape (rows, cols) of the map.
+    """
+    n_rows, n_cols = img_shape
+    col = int(round(x_m / scale))
+    row_from_bottom = int(round(y_m / scale))
+    row = (n_rows - 1) - row_from_bottom
+    return row, col
+
+#------------------------------------------------------------------------------------------------------------------
+#   Problem definition
+#------------------------------------------------------------------------------------------------------------------
+
+class MarsRouteProblem(SearchProblem):
+    """
+        Class that describes the route planning problem. States are (row, col) tuples.
+    """
+
+    def __init__(self, img, start, goal, max_delta=ROUTE_MAX_DELTA, scale=SCALE):
+        """
+            This constructor initializes the problem.
+
+            img: 2-D array of heights (invalid pixels < 0).
+            start: (row, col) of the start.
+            goal: (row, col) of the goal.
+            max_delta: Maximum height difference between neighbouring pixels.
+            scale: Meters per pixel.
+        """
+        self.img = img
+        self.goal_state = tuple(goal)
+        self.max_delta = max_delta
+        self.scale = scale
+        SearchProblem.__init__(self, tuple(start))
+
+    def actions(self, state):
+        """
+            Returns the list of (dr, dc) moves allowed from the state.
+
+            state: (row, col) of the rover.
+        """
+        img = self.img
+        n_rows, n_cols = img.shape
+        row, col = state
+        h0 = img[row, col]
+        actions = []
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr == 0 and dc == 0:
+                    continue
+                r, c = row + dr, col + dc
+                if 0 <= r < n_rows and 0 <= c < n_cols:
+                    h = img[r, c]
+                    if h >= 0 and abs(h - h0) <= self.max_delta:
+                        actions.append((dr, dc))
+        return actions
+
+    def result(self, state, action):
+        """
+            Returns the position after the move.
+
+            state: (row, col) of the rover.
+            action: (dr, dc) move.
+        """
+        return (state[0] + action[0], state[1] + action[1])
+
+    def is_goal(self, state):
+        """
+            Returns True if the state is the goal.
+
+            state: (row, col) of the rover.
+        """
+        return state == self.goal_state
+
+    def cost(self, state, action, state2):
+        """
+            Returns the distance travelled by the move.
+
+            state: Position before the move.
+            action: (dr, dc) move.
+            state2: Position after the move.
+        """
+        return self.scale*math.sqrt(2) if action[0] and action[1] else self.scale
+
+    def heuristic(self, state):
+        """
+            Returns the straight-line distance to the goal.
+
+            state: (row, col) of the rover.
+        """
+        return self.scale*math.hypot(state[0] - self.goal_state[0], state[1] - self.goal_state[1])
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,525 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Local route and descent query service
+#
+#   A long-lived asyncio HTTP server (over TCP or a Unix socket) that loads the height maps and their derived
+#   indices once and answers queries given in meters (meters_to_pixels convention):
+#
+#       GET /route?x0=..&y0=..&x1=..&y1=..[&algorithm=astar|hpa|field][&path=0]
+#       GET /descent?x=..&y=..[&algorithm=greedy|sa][&seed=..][&path=0]
+#       GET /stats
+#
+#   The searches run in a pool of worker processes, each of which loads the maps (and the cached masks,
+#   regions and basins, which are memory-mapped or small) when it starts. Results are kept in an LRU cache
+#   keyed on the kind of query, the algorithm, the pixels and the parameters; identical queries that arrive
+#   while one is being computed wait for the same result (they are reported as coalesced, not as cache hits).
+#   /stats reports the latency percentiles, the cache hit rate and the errors of every kind of query.
+#
+#   Usage: python route_service.py [--route-map FILE] [--descent-map FILE] [--port P | --unix PATH]
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from traversability import MAX_DELTA, load_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA, meters_to_pixels
+from grid_astar import astar
+from reachability import Reachability, load_components
+from basins import BasinMap
+from batch_sa import simulated_annealing_batch
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Meters per pixel of the crater map used for the descent (agenteLOCAL.ipynb)
+DESCENT_SCALE = 10.045
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Number of results kept in the LRU cache
+CACHE_SIZE = 1024
+
+# Number of goal distance fields kept by every worker
+FIELD_CACHE_SIZE = 2
+
+# Number of recent latencies used for the percentiles
+LATENCY_WINDOW = 10000
+
+ROUTE_ALGORITHMS = ('astar', 'hpa', 'field')
+DESCENT_ALGORITHMS = ('greedy', 'sa')
+
+#------------------------------------------------------------------------------------------------------------------
+#   Worker side
+#------------------------------------------------------------------------------------------------------------------
+
+class MapState(object):
+    """
+        Class that holds the maps and indices of a worker and runs the queries in pixels.
+    """
+
+    def __init__(self, route_map, descent_map, route_max_delta=ROUTE_MAX_DELTA, descent_max_delta=MAX_DELTA,
+                 route_scale=SCALE, preload_hpa=False):
+        """
+            This constructor loads the maps and their cached indices (computed and saved if they are missing).
+
+            route_map: Path of the .npy height map for routes.
+            descent_map: Path of the .npy height map for descents.
+            route_max_delta: Maximum height difference for routes.
+            descent_max_delta: Maximum height difference for descents.
+            route_scale: Meters per pixel of the route map (cost of the moves).
+            preload_hpa: True to build the HPA* abstract graph now instead of on the first 'hpa' query.
+        """
+        self.route_img = np.load(route_map)
+        self.route_moves = load_moves(route_map, route_max_delta, self.route_img)
+        self.reachability = Reachability(load_components(route_map, route_max_delta, self.route_img),
+                                         route_max_delta)
+        self.route_max_delta = route_max_delta
+        self.route_scale = route_scale
+
+        self.descent_img = self.route_img if descent_map == route_map else np.load(descent_map)
+        self.descent_moves = load_moves(descent_map, descent_max_delta, self.descent_img)
+        self.descent_reachability = Reachability(load_components(descent_map, descent_max_delta, self.descent_img),
+                                                 descent_max_delta)
+        self.basins = BasinMap.from_file(descent_map, descent_max_delta, self.descent_img)
+        self.descent_max_delta = descent_max_delta
+
+        self._hpa = None
+        self._fields = OrderedDict()
+        if preload_hpa:
+            self._planner()
+
+    def _planner(self):
+        if self._hpa is None:
+            from hpa import HPAPlanner
+            self._hpa = HPAPlanner(self.route_img, self.route_max_delta, self.route_scale, moves=self.route_moves)
+        return self._hpa
+
+    def _field(self, goal):
+        from distance_field import DistanceField
+
+        field = self._fields.pop(goal, None)
+        if field is None:
+            field = DistanceField.compute(self.route_img, goal, self.route_max_delta, self.route_scale,
+                                          self.route_moves)
+            if len(self._fields) >= FIELD_CACHE_SIZE:
+                self._fields.popitem(last=False)
+        self._fields[goal] = field
+        return field
+
+    def route(self, start, goal, algorithm):
+        """ Returns the route between two (row, col) pixels as a dictionary. """
+        t0 = time.perf_counter()
+        stats = {}
+        if not self.reachability.reachable(start, goal):
+            path, cost = None, math.inf
+            stats['rejected'] = True
+        elif algorithm == 'astar':
+            res = astar(self.route_img, start, goal, self.route_max_delta, self.route_scale, self.route_moves)
+            path, cost = res.path, res.cost
+            stats['expanded'] = res.expanded
+        elif algorithm == 'hpa':
+            res = self._planner().plan(start, goal, self.reachability)
+            path, cost = res.path, res.cost
+            stats['expanded'] = res.expanded
+        else:
+            path, cost = self._field(goal).route(start)
+
+        stats['compute_time'] = time.perf_counter() - t0
+        return {'found': path is not None, 'cost': cost if path is not None else None,
+                'length': len(path) - 1 if path is not None else None,
+                'path': [[int(r), int(c)] for r, c in path] if path is not None else None, 'stats': stats}
+
+    def descent(self, start, algorithm, seed):
+        """ Returns the descent from a (row, col) pixel as a dictionary. """
+        t0 = time.perf_counter()
+        r, c = start
+        if not self.descent_reachability.can_move(start):
+            # Isolated pixel: neither agent can leave it
+            path = [(r, c)]
+        elif algorithm == 'greedy':
+            path = self.basins.path(r, c)
+        else:
+            res = simulated_annealing_batch([r], [c], self.descent_img, self.descent_max_delta, seed=seed,
+                                            moves=self.descent_moves, keep_paths=True)
+            path = res.path(0, self.descent_img.shape[1])
+
+        end = path[-1]
+        return {'end': [int(end[0]), int(end[1])], 'start_height': float(self.descent_img[r, c]),
+                'end_height': float(self.descent_img[end[0], end[1]]), 'steps': len(path) - 1,
+                'path': [[int(pr), int(pc)] for pr, pc in path],
+                'stats': {'compute_time': time.perf_counter() - t0}}
+
+
+# State of the current worker process
+_state = None
+
+
+def _init_worker(config):
+    global _state
+    _state = MapState(**config)
+
+
+def _run(kind, args):
+    return getattr(_state, kind)(*args)
+
+
+def _ready():
+    return _state is not None
+
+#------------------------------------------------------------------------------------------------------------------
+#   Cache and statistics
+#------------------------------------------------------------------------------------------------------------------
+
+class LRUCache(object):
+    """
+        Class that keeps the most recently used results.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        """
+            This constructor creates an empty cache.
+
+            size: Maximum number of results.
+        """
+        self.size = size
+        self.data = OrderedDict()
+
+    def get(self, key):
+        """ Returns the result of a key (None if it is not cached) and marks it as recently used. """
+        value = self.data.get(key)
+        if value is not None:
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """ Stores a result and evicts the least recently used one if the cache is full. """
+        if self.size <= 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.size:
+            self.data.popitem(last=False)
+
+
+class QueryStats(object):
+    """
+        Class that accumulates the latencies, cache hits, coalesced waits and errors of one kind of query.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        """
+            This constructor creates empty statistics.
+
+            window: Number of recent latencies used for the percentiles.
+        """
+        self.count = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+
+    def add(self, latency, hit, coalesced=False):
+        """ Records one answered query. """
+        self.count += 1
+        self.hits += bool(hit)
+        self.coalesced += bool(coalesced)
+        self.latencies.append(latency)
+
+    def summary(self):
+        """ Returns a dictionary with the counts, the hit rate and the latency percentiles in milliseconds. """
+        out = {'count': self.count, 'errors': self.errors, 'cache_hits': self.hits, 'coalesced': self.coalesced,
+               'hit_rate': self.hits / self.count if self.count else 0.0}
+        if self.latencies:
+            ms = 1000.0*np.array(self.latencies)
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            out.update(mean_ms=float(ms.mean()), p50_ms=float(p50), p90_ms=float(p90), p99_ms=float(p99),
+                       max_ms=float(ms.max()))
+        return out
+
+#------------------------------------------------------------------------------------------------------------------
+#   Service
+#------------------------------------------------------------------------------------------------------------------
+
+class QueryError(Exception):
+    """
+        Exception raised for queries that cannot be answered (bad parameters, invalid pixels).
+    """
+
+
+class RouteService(object):
+    """
+        Class that parses the queries, looks them up in the cache and sends the rest to the worker pool.
+    """
+
+    def __init__(self, route_map, descent_map=None, workers=None, cache_size=CACHE_SIZE,
+                 route_max_delta=ROUTE_MAX_DELTA, descent_max_delta=MAX_DELTA, route_scale=SCALE,
+                 descent_scale=None, preload_hpa=False):
+        """
+            This constructor prepares the cached indices of the maps and starts the worker pool.
+
+            route_map: Path of the .npy height map for routes.
+            descent_map: Path of the .npy height map for descents (the route map if not given).
+            workers: Number of worker processes (0 to run the queries in a thread of this process).
+            cache_size: Number of results kept in the LRU cache.
+            route_max_delta, descent_max_delta: Maximum height differences.
+            route_scale, descent_scale: Meters per pixel of the maps. If descent_scale is not given it is
+                                        DESCENT_SCALE for a separate descent map and route_scale when the
+                                        descents use the route map.
+            preload_hpa: True to build the HPA* abstract graph in every worker when it starts.
+        """
+        if descent_scale is None:
+            descent_scale = DESCENT_SCALE if descent_map else route_scale
+        descent_map = descent_map or route_map
+        self.config = dict(route_map=route_map, descent_map=descent_map, route_max_delta=route_max_delta,
+                           descent_max_delta=descent_max_delta, route_scale=route_scale, preload_hpa=preload_hpa)
+        self.route_scale = route_scale
+        self.descent_scale = descent_scale
+        self.route_img = np.load(route_map, mmap_mode='r')
+        self.descent_img = np.load(descent_map, mmap_mode='r')
+
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        if workers <= 0:
+            # The state is loaded here, which also writes the cached indices
+            _init_worker(self.config)
+            self.pool = ThreadPoolExecutor(1)
+        else:
+            # Build the cached indices once, so the workers only read them, and start the workers now, before
+            # the event loop runs, so that no process is forked from inside it
+            MapState(**dict(self.config, preload_hpa=False))
+            self.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.config,))
+            for future in [self.pool.submit(_ready) for _ in range(workers)]:
+                future.result()
+        self.workers = workers
+
+        self.cache = LRUCache(cache_size)
+        self.pending = {}
+        self.stats = {'route': QueryStats(), 'descent': QueryStats()}
+        self.started = time.time()
+
+    def close(self):
+        """ Stops the worker pool. """
+        self.pool.shutdown()
+
+    @staticmethod
+    def _pixel(params, x_name, y_name, scale, img):
+        try:
+            x = float(params[x_name][0])
+            y = float(params[y_name][0])
+        except (KeyError, ValueError):
+            raise QueryError('%s and %s (meters) are required' % (x_name, y_name))
+        r, c = meters_to_pixels(x, y, scale, img.shape)
+        if not (0 <= r < img.shape[0] and 0 <= c < img.shape[1]):
+            raise QueryError('(%g, %g) is outside the map' % (x, y))
+        if img[r, c] < 0:
+            raise QueryError('(%g, %g) is an invalid pixel' % (x, y))
+        return (r, c)
+
+    def parse(self, kind, params):
+        """
+            Returns (key, args) of a query: the cache key and the arguments of MapState.route/descent.
+
+            kind: 'route' or 'descent'.
+            params: Dictionary of query parameters (lists of strings, as parse_qs returns them).
+        """
+        algorithm = params.get('algorithm', [None])[0]
+        if kind == 'route':
+            algorithm = algorithm or 'astar'
+            if algorithm not in ROUTE_ALGORITHMS:
+                raise QueryError('unknown route algorithm %r' % algorithm)
+            start = self._pixel(params, 'x0', 'y0', self.route_scale, self.route_img)
+            goal = self._pixel(params, 'x1', 'y1', self.route_scale, self.route_img)
+            return ('route', algorithm, start, goal), (start, goal, algorithm)
+
+        algorithm = algorithm or 'greedy'
+        if algorithm not in DESCENT_ALGORITHMS:
+            raise QueryError('unknown descent algorithm %r' % algorithm)
+        start = self._pixel(params, 'x', 'y', self.descent_scale, self.descent_img)
+        try:
+            seed = int(params.get('seed', ['2025'])[0])
+        except ValueError:
+            raise QueryError('seed must be an integer')
+        # The greedy descent does not depend on the seed
+        return ('descent', algorithm, start, seed if algorithm == 'sa' else None), (start, algorithm, seed)
+
+    async def query(self, kind, params):
+        """
+            Answers a query. Returns (result, cached, coalesced): cached is True if the result was in the cache
+            and coalesced is True if the query waited for an identical one that was being computed.
+
+            kind: 'route' or 'descent'.
+            params: Dictionary of query parameters (lists of strings).
+        """
+        key, args = self.parse(kind, params)
+        result = self.cache.get(key)
+        if result is not None:
+            return result, True, False
+
+        future = self.pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, _run, kind, args)
+            self.pending[key] = future
+            try:
+                result = await future
+            finally:
+                del self.pending[key]
+            self.cache.put(key, result)
+            return result, False, False
+        return await asyncio.shield(future), False, True
+
+    def summary(self):
+        """ Returns the statistics of the service. """
+        return {'uptime': time.time() - self.started, 'workers': self.workers, 'cache_entries': len(self.cache.data),
+                'cache_size': self.cache.size, 'queries': {k: v.summary() for k, v in self.stats.items()}}
+
+    async def handle(self, target):
+        """ Returns (status, body) of an HTTP GET target. """
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        kind = url.path.strip('/')
+        if kind == 'stats':
+            return 200, self.summary()
+        if kind not in self.stats:
+            return 404, {'error': 'unknown path %r' % url.path}
+
+        t0 = time.perf_counter()
+        try:
+            result, cached, coalesced = await self.query(kind, params)
+        except QueryError as e:
+            self.stats[kind].errors += 1
+            return 400, {'error': str(e)}
+        except Exception as e:
+            # Failures of the search in the worker (or of the worker pool itself)
+            self.stats[kind].errors += 1
+            return 500, {'error': '%s: %s' % (type(e).__name__, e)}
+        latency = time.perf_counter() - t0
+        self.stats[kind].add(latency, cached, coalesced)
+
+        body = dict(result, cached=cached, coalesced=coalesced, latency=latency)
+        if params.get('path', ['1'])[0] == '0':
+            body.pop('path', None)
+        return 200, body
+
+    async def _connection(self, reader, writer):
+        try:
+            request = await reader.readline()
+            # Headers are not used
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            parts = request.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] != 'GET':
+                status, body = 405, {'error': 'only GET is supported'}
+            else:
+                status, body = await self.handle(parts[1])
+        except Exception as e:
+            status, body = 500, {'error': '%s: %s' % (type(e).__name__, e)}
+
+        data = json.dumps(body).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                  500: 'Internal Server Error'}.get(status, 'Error')
+        writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+                     b'Connection: close\r\n\r\n' % (status, reason.encode(), len(data)) + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, unix=None):
+        """
+            Serves queries until the task is cancelled.
+
+            host, port: TCP address (used when unix is not given).
+            unix: Path of a Unix socket.
+        """
+        if unix is not None:
+            server = await asyncio.start_unix_server(self._connection, unix)
+        else:
+            server = await asyncio.start_server(self._connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+#------------------------------------------------------------------------------------------------------------------
+#   Client
+#------------------------------------------------------------------------------------------------------------------
+
+def request(target, host=HOST, port=PORT, unix=None, timeout=60.0):
+    """
+        Sends a GET request to the service and returns (status, decoded JSON body).
+
+        target: Path and query string, for example '/route?x0=100&y0=200&x1=900&y1=700'.
+        host, port: TCP address (used when unix is not given).
+        unix: Path of the Unix socket of the service.
+        timeout: Seconds to wait for the answer.
+    """
+    if unix is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(unix)
+    else:
+        sock = socket.create_connection((host, port), timeout)
+    with sock:
+        sock.sendall(b'GET %s HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n' % target.encode())
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    head, _, body = b''.join(chunks).partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+#------------------------------------------------------------------------------------------------------------------
+#   Program
+#------------------------------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves route and descent queries on the Mars maps.')
+    parser.add_argument('--route-map', default='mars_map.npy')
+    parser.add_argument('--descent-map', default=None, help='height map for descents (the route map by default)')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', default=None, help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (0 = in-process thread)')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    parser.add_argument('--route-max-delta', type=float, default=ROUTE_MAX_DELTA)
+    parser.add_argument('--descent-max-delta', type=float, default=MAX_DELTA)
+    parser.add_argument('--route-scale', type=float, default=SCALE)
+    parser.add_argument('--descent-scale', type=float, default=None,
+                        help='meters per pixel of the descent map (%g for a separate descent map, the route '
+                             'scale otherwise)' % DESCENT_SCALE)
+    parser.add_argument('--preload-hpa', action='store_true', help='build the HPA* graph when the workers start')
+    args = parser.parse_args()
+
+    service = RouteService(args.route_map, args.descent_map, args.workers, args.cache_size, args.route_max_delta,
+                           args.descent_max_delta, args.route_scale, args.descent_scale, args.preload_hpa)
+    print('Serving on %s' % (args.unix or 'http://%s:%d' % (args.host, args.port)))
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == '__main__':
+    main()
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,165 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Local search agents of agenteLOCAL.ipynb with structured tracing
+#
+#   greedy_agent() and simulated_annealing_agent() follow the notebook step by step (same moves, same random
+#   numbers, same paths), but instead of printing every neighbour they record events into an optional
+#   agent_trace.AgentTrace. With no trace, or a trace in 'off' mode, the agents run without any tracing code.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+import random
+
+from traversability import MAX_DELTA, valid_neighbors
+from agent_trace import EVENT_INVALID, EVENT_REJECTED, EVENT_ACCEPTED, EVENT_STOP
+
+#------------------------------------------------------------------------------------------------------------------
+#   Greedy descent
+#------------------------------------------------------------------------------------------------------------------
+
+def greedy_agent(start_row, start_col, img, max_delta=MAX_DELTA, traversability=None, trace=None,
+                 reachability=None):
+    """
+        Greedy local descent: at every step the rover moves to the lowest valid neighbour that is lower than
+        the current pixel, and stops when there is none. Returns the list of (r, c) visited.
+
+        start_row, start_col: Start position (pixels).
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        traversability: Optional traversability.Traversability of img for max_delta.
+        trace: Optional AgentTrace; in full mode every neighbour evaluated is recorded.
+        reachability: Optional reachability.Reachability of img for max_delta; a start with no valid neighbour
+                      returns the one-cell path without evaluating any neighbour (nor recording events).
+    """
+    if reachability is not None and not reachability.can_move((start_row, start_col)):
+        return [(start_row, start_col)]
+
+    record = trace.recorder() if trace is not None else None
+    path = [(start_row, start_col)]
+    r, c = start_row, start_col
+    h0 = img[r, c]
+
+    if record is None:
+        while True:
+            better = [n for n in valid_neighbors(r, c, img, max_delta, traversability) if n[1] < h0]
+            if not better:
+                return path
+            (r, c), h0 = min(better, key=lambda x: x[1])
+            path.append((r, c))
+
+    run = trace.new_run()
+    nan = float('nan')
+    n_rows, n_cols = img.shape
+    step = 0
+    while True:
+        # Every neighbour in scan order, as the notebook prints them
+        evaluated = []
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr == 0 and dc == 0:
+                    continue
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < n_rows and 0 <= nc < n_cols:
+                    h = img[nr, nc]
+                    evaluated.append((nr, nc, h, h >= 0 and abs(h - h0) <= max_delta))
+                else:
+                    evaluated.append((nr, nc, nan, False))
+
+        valid = [e for e in evaluated if e[3]]
+        better = [e for e in valid if e[2] < h0]
+        best = min(better, key=lambda x: x[2]) if better else None
+        for e in evaluated:
+            event = EVENT_ACCEPTED if e is best else EVENT_REJECTED if e[3] else EVENT_INVALID
+            record(run, step, r, c, h0, e[0], e[1], e[2], len(valid), event, nan)
+
+        if best is None:
+            record(run, step, r, c, h0, r, c, h0, len(valid), EVENT_STOP, nan)
+            return path
+        r, c, h0 = best[0], best[1], best[2]
+        path.append((r, c))
+        step += 1
+
+#------------------------------------------------------------------------------------------------------------------
+#   Simulated annealing
+#------------------------------------------------------------------------------------------------------------------
+
+def simulated_annealing_agent(start_row, start_col, img, max_delta=MAX_DELTA, T0=20.0, Tmin=4.0, alpha=0.96,
+                              iters_per_T=25, max_steps=5000, seed=2025, verbose=False, traversability=None,
+                              trace=None, reachability=None):
+    """
+        Simulated annealing descent with geometric cooling by levels. Returns the list of (r, c) visited (empty
+        if the start is invalid).
+
+        start_row, start_col: Start position (pixels).
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+        T0, Tmin, alpha: Initial temperature, final temperature and cooling factor.
+        iters_per_T: Iterations at every temperature level.
+        max_steps: Maximum number of iterations.
+        seed: Seed of the random generator.
+        verbose: True to report an invalid start.
+        traversability: Optional traversability.Traversability of img for max_delta.
+        trace: Optional AgentTrace; one event is recorded per iteration (the proposed neighbour).
+        reachability: Optional reachability.Reachability of img for max_delta; a start with no valid neighbour
+                      returns the one-cell path without running the annealing (nor recording events).
+    """
+    rng = random.Random(seed)
+    if img[start_row, start_col] < 0:
+        if verbose:
+            print("Inicio fuera de máscara.")
+        return []
+    if reachability is not None and not reachability.can_move((start_row, start_col)):
+        return [(start_row, start_col)]
+
+    record = trace.recorder() if trace is not None else None
+    run = trace.new_run() if record is not None else 0
+
+    path = [(start_row, start_col)]
+    r, c = start_row, start_col
+    h = img[r, c]
+
+    T = T0
+    steps = 0
+    tcount = 0
+
+    while T > Tmin and steps < max_steps:
+        nbs = valid_neighbors(r, c, img, max_delta, traversability)
+        if not nbs:
+            break
+
+        # Random valid neighbour
+        idx = int(rng.random() * len(nbs))
+        if idx == len(nbs):
+            idx -= 1
+        (nr, nc), nh = nbs[idx]
+
+        # Metropolis acceptance for minimisation
+        dE = h - nh
+        if dE > 0:
+            accept = True
+        else:
+            accept = rng.random() <= math.exp(dE / T)
+
+        if record is not None:
+            record(run, steps, r, c, h, nr, nc, nh, len(nbs), EVENT_ACCEPTED if accept else EVENT_REJECTED, T)
+
+        if accept:
+            r, c, h = nr, nc, nh
+            path.append((r, c))
+
+        # Geometric cooling by levels
+        steps += 1
+        tcount += 1
+        if tcount >= iters_per_T:
+            T *= alpha
+            tcount = 0
+
+    if record is not None:
+        record(run, steps, r, c, h, r, c, h, 0, EVENT_STOP, T)
+    return path
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,263 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Lazy tiled access to full-resolution height maps
+#
+#   A TiledMap wraps a memory-mapped height map (a .npy file, or the raw samples of the PDS .img converted on
+#   the fly) and reads it in square tiles that are kept in an LRU cache. It offers the indexing the agents
+#   use (img[r, c], img[r0:r1, c0:c1], shape), so greedy_agent, simulated_annealing_agent and
+#   MarsRouteProblem run on maps larger than memory: only the tiles around the rover are resident.
+#
+#   The grid planners need flat arrays, so they run on windows: astar_window() searches the bounding box of
+#   the start and the goal plus a margin, and enlarges it when the route leaves the window.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from pds import read_label, open_image, convert_block
+from traversability import MAX_DELTA, compute_moves
+from route_problem import SCALE, ROUTE_MAX_DELTA
+from grid_astar import GridSearchResult, astar
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Rows and columns of a tile
+TILE_SHAPE = (256, 256)
+
+# Maximum number of tiles kept in memory
+MAX_TILES = 256
+
+# Rows of the bands used by tiled_moves()
+BAND_ROWS = 512
+
+# Initial margin of astar_window() around the start and the goal, in pixels
+WINDOW_MARGIN = 64
+
+# Largest window (in pixels) that astar_window() loads before giving up
+MAX_WINDOW = 1 << 22
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class TiledMap(object):
+    """
+        Class that reads a height map tile by tile with an LRU cache of tiles.
+    """
+
+    def __init__(self, source, tile_shape=TILE_SHAPE, max_tiles=MAX_TILES, convert=None):
+        """
+            This constructor wraps the source; no data is read until the map is indexed.
+
+            source: 2-D array-like, normally a read-only memmap.
+            tile_shape: (rows, cols) of a tile.
+            max_tiles: Maximum number of tiles kept in memory.
+            convert: Optional function applied to every block read from the source (raw samples -> heights).
+        """
+        self.source = source
+        self.shape = tuple(source.shape)
+        self.tile_shape = tuple(tile_shape)
+        self.max_tiles = max_tiles
+        self.convert = convert
+        self.dtype = np.dtype('float64') if convert is not None else source.dtype
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._last_key = None
+        self._last_tile = None
+
+    @classmethod
+    def from_npy(cls, map_file, tile_shape=TILE_SHAPE, max_tiles=MAX_TILES):
+        """ Opens a .npy height map as a memmap. """
+        return cls(np.load(map_file, mmap_mode='r'), tile_shape, max_tiles)
+
+    @classmethod
+    def from_pds(cls, input_file, label=None, tile_shape=TILE_SHAPE, max_tiles=MAX_TILES):
+        """
+            Opens the raw samples of a PDS .img file; the tiles are converted to heights (relative to the
+            valid minimum, -1 for pixels without data) as load_heights() does.
+        """
+        if label is None:
+            label = read_label(input_file)
+        return cls(open_image(input_file, label), tile_shape, max_tiles, lambda raw: convert_block(raw, label.minV))
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def size(self):
+        return self.shape[0]*self.shape[1]
+
+    @property
+    def resident_bytes(self):
+        """ Bytes of the tiles currently in memory. """
+        return sum(t.nbytes for t in self.tiles.values())
+
+    def _read(self, r0, r1, c0, c1):
+        block = np.asarray(self.source[r0:r1, c0:c1])
+        return self.convert(block) if self.convert is not None else np.array(block)
+
+    def tile(self, ti, tj):
+        """ Returns tile (ti, tj), reading it if it is not cached. """
+        key = (ti, tj)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.hits += 1
+            self.tiles.move_to_end(key)
+            return tile
+
+        self.misses += 1
+        th, tw = self.tile_shape
+        r0, c0 = ti*th, tj*tw
+        tile = self._read(r0, min(r0 + th, self.shape[0]), c0, min(c0 + tw, self.shape[1]))
+        self.tiles[key] = tile
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and len(key) == 2 and not isinstance(key[0], slice) \
+                and not isinstance(key[1], slice):
+            r, c = int(key[0]), int(key[1])
+            n_rows, n_cols = self.shape
+            if r < 0:
+                r += n_rows
+            if c < 0:
+                c += n_cols
+            if not (0 <= r < n_rows and 0 <= c < n_cols):
+                raise IndexError('index (%d, %d) is out of bounds for a map of shape %s' % (key[0], key[1],
+                                                                                          self.shape))
+            th, tw = self.tile_shape
+            tile_key = (r // th, c // tw)
+            # Consecutive reads usually fall in the same tile
+            if tile_key == self._last_key:
+                self.hits += 1
+                return self._last_tile[r - tile_key[0]*th, c - tile_key[1]*tw]
+            tile = self.tile(*tile_key)
+            self._last_key = tile_key
+            self._last_tile = tile
+            return tile[r - tile_key[0]*th, c - tile_key[1]*tw]
+
+        # Windows are read straight from the source, without going through the cache
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        bounds = []
+        squeeze = []
+        for axis, k in enumerate((rows, cols)):
+            if isinstance(k, slice):
+                bounds.append(k.indices(self.shape[axis]))
+            else:
+                i = int(k) + (self.shape[axis] if int(k) < 0 else 0)
+                bounds.append((i, i + 1, 1))
+                squeeze.append(axis)
+        (r0, r1, step_r), (c0, c1, step_c) = bounds
+        if step_r < 0 or step_c < 0:
+            raise IndexError('negative steps are not supported')
+        window = self._read(r0, max(r0, r1), c0, max(c0, c1))[::step_r, ::step_c]
+        return window.squeeze(axis=tuple(squeeze)) if squeeze else window
+
+    def __array__(self, dtype=None, copy=None):
+        # Reads the whole map: only for maps that fit in memory
+        window = self._read(0, self.shape[0], 0, self.shape[1])
+        return window.astype(dtype) if dtype is not None else window
+
+    def iter_bands(self, band_rows=BAND_ROWS, halo=0):
+        """
+            Yields (r0, r1, block) for consecutive bands of rows; block holds the rows [r0 - halo, r1 + halo)
+            clipped to the map.
+
+            band_rows: Rows of a band.
+            halo: Extra rows read above and below every band.
+        """
+        n_rows, n_cols = self.shape
+        for r0 in range(0, n_rows, band_rows):
+            r1 = min(r0 + band_rows, n_rows)
+            yield r0, r1, self._read(max(0, r0 - halo), min(n_rows, r1 + halo), 0, n_cols)
+
+#------------------------------------------------------------------------------------------------------------------
+#   Planning on tiled maps
+#------------------------------------------------------------------------------------------------------------------
+
+def tiled_moves(tiled, max_delta=MAX_DELTA, out=None, band_rows=BAND_ROWS):
+    """
+        Computes the traversability mask of a tiled map band by band (one row of halo above and below), so
+        only one band of heights is in memory at a time. Returns the uint8 mask.
+
+        tiled: TiledMap.
+        max_delta: Maximum height difference between neighbouring pixels.
+        out: Optional uint8 array (for example a memmap) for the result.
+        band_rows: Rows of a band.
+    """
+    if out is None:
+        out = np.empty(tiled.shape, dtype=np.uint8)
+    for r0, r1, block in tiled.iter_bands(band_rows, halo=1):
+        top = r0 - max(0, r0 - 1)
+        out[r0:r1] = compute_moves(block, max_delta)[top:top + r1 - r0]
+    return out
+
+
+def astar_window(tiled, start, goal, max_delta=ROUTE_MAX_DELTA, scale=SCALE, margin=WINDOW_MARGIN,
+                 max_window=MAX_WINDOW, reachability=None, **kwargs):
+    """
+        Grid A* inside a window of a (possibly huge) map: the bounding box of the start and the goal plus a
+        margin. If there is no route inside the window, the margin is doubled until the window covers the
+        map or would exceed max_window pixels. The route is optimal among the routes that stay inside the
+        last window. Returns a GridSearchResult in map coordinates; its stats hold the last window, the number
+        of windows tried and whether the search stopped at the size limit.
+
+        tiled: TiledMap (or any 2-D array).
+        start: (row, col) of the start.
+        goal: (row, col) of the goal.
+        max_delta: Maximum height difference between neighbouring pixels.
+        scale: Meters per pixel.
+        margin: Initial margin around the bounding box, in pixels.
+        max_window: Maximum number of pixels of a window (None for no limit).
+        reachability: Optional reachability.Reachability of the whole map; unreachable goals are rejected
+                      before reading any window.
+        kwargs: Other arguments of grid_astar.astar (heuristic, weight, max_expansions).
+    """
+    t0 = time.perf_counter()
+    n_rows, n_cols = tiled.shape
+    if reachability is not None and not reachability.reachable(start, goal):
+        return GridSearchResult(None, math.inf, 0, 0, time.perf_counter() - t0, rejected=True)
+
+    def bounds(margin):
+        return (max(0, min(start[0], goal[0]) - margin), min(n_rows, max(start[0], goal[0]) + margin + 1),
+                max(0, min(start[1], goal[1]) - margin), min(n_cols, max(start[1], goal[1]) + margin + 1))
+
+    expanded = generated = 0
+    windows = 0
+    limited = False
+    while True:
+        windows += 1
+        r0, r1, c0, c1 = bounds(margin)
+        window = np.asarray(tiled[r0:r1, c0:c1])
+
+        res = astar(window, (start[0] - r0, start[1] - c0), (goal[0] - r0, goal[1] - c0), max_delta, scale,
+                    **kwargs)
+        expanded += res.expanded
+        generated += res.generated
+        whole = r0 == 0 and c0 == 0 and r1 == n_rows and c1 == n_cols
+        if res.found or whole or window[start[0] - r0, start[1] - c0] < 0:
+            break
+        nr0, nr1, nc0, nc1 = bounds(2*margin)
+        if max_window is not None and (nr1 - nr0)*(nc1 - nc0) > max_window:
+            limited = True
+            break
+        margin *= 2
+
+    path = [(r + r0, c + c0) for r, c in res.path] if res.found else None
+    return GridSearchResult(path, res.cost if res.found else math.inf, expanded, generated,
+                            time.perf_counter() - t0, window=(r0, r1, c0, c1), windows=windows,
+                            limited=limited)
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
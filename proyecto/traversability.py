@@ -0,0 +1,177 @@
+#------------------------------------------------------------------------------------------------------------------
+#   Precomputed 8-neighbour traversability of the Mars height map
+#
+#   Every pixel gets a uint8 with one bit per direction, set when the rover may move to that neighbour: the
+#   neighbour is inside the map, has a valid height (h >= 0) and |h - h0| <= max_delta. These are the same
+#   rules as valid_neighbors() in agenteLOCAL.ipynb, so the valid moves of a pixel become one table lookup.
+#
+#   Bit k of the mask corresponds to DIRECTIONS[k] (N, NE, E, SE, S, SW, W, NW). The lookups return moves in
+#   the order in which valid_neighbors() scans them (NW, N, NE, W, E, SW, S, SE), so random choices made over
+#   the returned list are the same as with the notebook function.
+#------------------------------------------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------------------------------------------
+import os
+
+import numpy as np
+
+#------------------------------------------------------------------------------------------------------------------
+#   Constants
+#------------------------------------------------------------------------------------------------------------------
+
+# Maximum height difference between neighbouring pixels, in meters
+MAX_DELTA = 2.0
+
+# (dr, dc) of every bit of the mask
+DIRECTIONS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+DIRECTION_NAMES = ('N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW')
+
+# Bits in the scan order of valid_neighbors(): dr in (-1, 0, 1), dc in (-1, 0, 1)
+SCAN_ORDER = tuple(DIRECTIONS.index((dr, dc)) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0))
+
+# MOVES[mask] = tuple of (dr, dc) allowed by the mask, in scan order
+MOVES = tuple(tuple(DIRECTIONS[k] for k in SCAN_ORDER if mask >> k & 1) for mask in range(256))
+
+# Number of moves allowed by every mask
+MOVE_COUNT = np.array([len(m) for m in MOVES], dtype=np.uint8)
+
+# DR_TABLE[mask, i], DC_TABLE[mask, i] = i-th move of the mask (0 beyond MOVE_COUNT[mask]), for vectorised code
+DR_TABLE = np.zeros((256, 8), dtype=np.int8)
+DC_TABLE = np.zeros((256, 8), dtype=np.int8)
+for _mask, _moves in enumerate(MOVES):
+    for _i, (_dr, _dc) in enumerate(_moves):
+        DR_TABLE[_mask, _i] = _dr
+        DC_TABLE[_mask, _i] = _dc
+
+#------------------------------------------------------------------------------------------------------------------
+#   Precomputation
+#------------------------------------------------------------------------------------------------------------------
+
+def compute_moves(img, max_delta=MAX_DELTA):
+    """
+        Returns a uint8 array with the traversability mask of every pixel of the height map.
+
+        img: 2-D array of heights (invalid pixels < 0).
+        max_delta: Maximum height difference between neighbouring pixels.
+    """
+    img = np.asarray(img)
+    n_rows, n_cols = img.shape
+    moves = np.zeros((n_rows, n_cols), dtype=np.uint8)
+
+    for k, (dr, dc) in enumerate(DIRECTIONS):
+        # Destination and source windows of the pixels whose neighbour (dr, dc) is inside the map
+        src = (slice(max(0, -dr), n_rows - max(0, dr)), slice(max(0, -dc), n_cols - max(0, dc)))
+        dst = (slice(max(0, dr), n_rows - max(0, -dr)), slice(max(0, dc), n_cols - max(0, -dc)))
+        h0 = img[src]
+        h = img[dst]
+        ok = (h >= 0) & (np.abs(h - h0) <= max_delta)
+        moves[src] |= ok.astype(np.uint8) << k
+
+    return moves
+
+
+def moves_file(map_file, max_delta=MAX_DELTA):
+    """
+        Returns the path of the cached mask of a height map file (next to the map).
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+    """
+    stem = map_file[:-len('.npy')] if map_file.endswith('.npy') else map_file
+    return '%s.moves-%g.npy' % (stem, max_delta)
+
+
+def load_moves(map_file, max_delta=MAX_DELTA, img=None):
+    """
+        Returns the traversability mask of a height map file as a read-only memmap. The mask is computed and
+        saved next to the map if it does not exist or is older than the map.
+
+        map_file: Path of the .npy height map.
+        max_delta: Maximum height difference between neighbouring pixels.
+        img: The height map, if it is already loaded.
+    """
+    path = moves_file(map_file, max_delta)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(map_file):
+        if img is None:
+            img = np.load(map_file, mmap_mode='r')
+        tmp = path + '.tmp.npy'
+        np.save(tmp, compute_moves(img, max_delta))
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode='r')
+
+#------------------------------------------------------------------------------------------------------------------
+#   Class definitions
+#------------------------------------------------------------------------------------------------------------------
+
+class Traversability(object):
+    """
+        Class that answers which moves are allowed from a pixel with a single lookup in the precomputed mask.
+    """
+
+    def __init__(self, img, max_delta=MAX_DELTA, moves=None):
+        """
+            This constructor stores the height map and its mask (computed if not given).
+
+            img: 2-D array of heights.
+            max_delta: Maximum height difference between neighbouring pixels.
+            moves: Precomputed mask for img and max_delta (for example from load_moves).
+        """
+        self.img = img
+        self.max_delta = max_delta
+        self.mask = compute_moves(img, max_delta) if moves is None else moves
+        self.shape = self.mask.shape
+
+    @classmethod
+    def from_file(cls, map_file, max_delta=MAX_DELTA):
+        """
+            Loads a height map and its cached mask.
+
+            map_file: Path of the .npy height map.
+            max_delta: Maximum height difference between neighbouring pixels.
+        """
+        img = np.load(map_file)
+        return cls(img, max_delta, load_moves(map_file, max_delta, img))
+
+    def moves(self, row, col):
+        """ Returns the tuple of (dr, dc) moves allowed from (row, col). """
+        return MOVES[self.mask[row, col]]
+
+    def can_move(self, row, col, dr, dc):
+        """ Returns True if the move (dr, dc) is allowed from (row, col). """
+        return bool(self.mask[row, col] >> DIRECTIONS.index((dr, dc)) & 1)
+
+    def neighbors(self, row, col):
+        """
+            Returns the list of ((r, c), h) of the valid neighbours of (row, col), as valid_neighbors() does.
+        """
+        img = self.img
+        return [((row + dr, col + dc), img[row + dr, col + dc]) for dr, dc in MOVES[self.mask[row, col]]]
+
+
+def valid_neighbors(row, col, img, max_delta=MAX_DELTA, traversability=None):
+    """
+        Drop-in replacement of valid_neighbors() from agenteLOCAL.ipynb. If a Traversability built for the same
+        map and max_delta is given, the moves come from its mask instead of being tested one by one.
+    """
+    if traversability is not None:
+        return traversability.neighbors(row, col)
+
+    n_rows, n_cols = img.shape
+    h0 = img[row, col]
+    out = []
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if dr == 0 and dc == 0:
+                continue
+            r, c = row + dr, col + dc
+            if 0 <= r < n_rows and 0 <= c < n_cols:
+                h = img[r, c]
+                if h >= 0 and abs(h - h0) <= max_delta:
+                    out.append(((r, c), h))
+    return out
+
+#------------------------------------------------------------------------------------------------------------------
+#   End of file
+#------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,218 @@
+#---------------------------------------------------------------------------------------------------------------
+#    All Out / Lights Out con tableros de bits
+#
+#    El tablero de R x C focos se guarda en un solo entero: el bit r*C + c es el foco (r, c). Un clic es un
+#    XOR con una máscara precalculada (el foco y sus vecinos en vecindad 4), así que result() no construye
+#    listas ni tuplas y los estados son enteros baratos de guardar en los conjuntos de la búsqueda de grafo.
+#
+#    Además del PSA para SimpleAI se incluye un solucionador exacto: apagar el tablero b equivale a resolver
+#    A x = b sobre GF(2), donde A es la matriz de efectos de los clics (simétrica) y x indica qué focos se
+#    pican (el orden de los clics no importa y picar dos veces el mismo foco no hace nada). Con eliminación
+#    de Gauss-Jordan se obtiene una solución y la base del espacio nulo de A; la solución con menos clics se
+#    busca entre las 2^d combinaciones del espacio nulo (d es pequeño: 4 en 4x4, 0 en 20x20).
+#---------------------------------------------------------------------------------------------------------------
+
+from typing import List, Optional, Sequence, Tuple
+
+from simpleai.search import SearchProblem
+
+#---------------------------------------------------------------------------------------------------------------
+#   Tableros de bits
+#---------------------------------------------------------------------------------------------------------------
+
+# Máxima dimensión del espacio nulo que se recorre completa para minimizar el número de clics
+MAX_NULLITY = 24
+
+def click_masks(rows: int, cols: int) -> Tuple[int, ...]:
+    """ Regresa la máscara de cada clic (índice r*cols + c): el foco y sus vecinos en vecindad 4.
+
+        rows: renglones del tablero.
+        cols: columnas del tablero.
+    """
+    masks = []
+    for r in range(rows):
+        for c in range(cols):
+            m = 0
+            for dr, dc in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+                rr, cc = r + dr, c + dc
+                if 0 <= rr < rows and 0 <= cc < cols:
+                    m |= 1 << (rr*cols + cc)
+            masks.append(m)
+    return tuple(masks)
+
+
+def encode(board: Sequence) -> int:
+    """ Convierte un tablero (lista de renglones con 0/1, o secuencia plana) en un entero. """
+    flat = [int(x) for row in board for x in row] if isinstance(board[0], (list, tuple)) else list(board)
+    assert all(x in (0, 1) for x in flat), "Sólo 0/1"
+    state = 0
+    for k, v in enumerate(flat):
+        state |= v << k
+    return state
+
+
+def decode(state: int, rows: int, cols: int) -> Tuple[int, ...]:
+    """ Convierte un entero en la tupla plana de rows*cols focos (0/1). """
+    return tuple((state >> k) & 1 for k in range(rows*cols))
+
+
+def pretty(state: int, rows: int, cols: int) -> str:
+    """ Render amigable: ●=encendido, ·=apagado. """
+    return "\n".join(" ".join("●" if (state >> (r*cols + c)) & 1 else "·" for c in range(cols))
+                     for r in range(rows))
+
+
+def apply_clicks(state: int, clicks: Sequence[Tuple[int, int]], cols: int, masks: Sequence[int]) -> int:
+    """ Regresa el tablero después de picar los focos (r, c) de la lista. """
+    for r, c in clicks:
+        state ^= masks[r*cols + c]
+    return state
+
+#---------------------------------------------------------------------------------------------------------------
+#   PSA con tableros de bits
+#---------------------------------------------------------------------------------------------------------------
+
+class BitboardAllOutProblem(SearchProblem):
+    """
+        PSA para All Out / Lights Out de rows x cols.
+        Estado: entero con un bit por foco. Meta: 0.
+        Acción: índice del foco picado (r*cols + c). Costo de acción: 1 por clic.
+
+        Heurística: ceil(#ON / 5) (un clic cambia a lo más 5 focos); admisible y consistente.
+
+        Para mostrar un estado se usa pretty(state, rows, cols) y una acción a es el clic en divmod(a, cols).
+        No se redefine state_representation(): los viewers de SimpleAI la llaman para cada nodo de la
+        frontera en cada iteración.
+    """
+
+    def __init__(self, initial_state, rows: int = 4, cols: Optional[int] = None):
+        """ Constructor de la clase.
+
+            initial_state: tablero inicial (entero, o lista de renglones con 0/1).
+            rows: renglones del tablero.
+            cols: columnas del tablero (por omisión igual a rows).
+        """
+        self.rows = rows
+        self.cols = rows if cols is None else cols
+        if not isinstance(initial_state, int):
+            initial_state = encode(initial_state)
+        self.masks = click_masks(self.rows, self.cols)
+        self._actions = tuple(range(self.rows*self.cols))
+        SearchProblem.__init__(self, initial_state)
+
+    def actions(self, state: int) -> Tuple[int, ...]:
+        # La misma tupla para todos los estados: no se crea nada por nodo
+        return self._actions
+
+    def result(self, state: int, action: int) -> int:
+        return state ^ self.masks[action]
+
+    def is_goal(self, state: int) -> bool:
+        return state == 0
+
+    def cost(self, state: int, action: int, state2: int) -> int:
+        return 1
+
+    def heuristic(self, state: int) -> int:
+        return -(-state.bit_count() // 5)
+
+#---------------------------------------------------------------------------------------------------------------
+#   Solucionador sobre GF(2)
+#---------------------------------------------------------------------------------------------------------------
+
+class GF2Solver(object):
+    """
+        Clase que resuelve tableros de rows x cols con álgebra lineal sobre GF(2). La eliminación se hace
+        una sola vez por tamaño de tablero; resolver un tablero es aplicar la transformación guardada.
+    """
+
+    def __init__(self, rows: int, cols: Optional[int] = None):
+        """ Constructor de la clase. Hace la eliminación de Gauss-Jordan de la matriz de clics.
+
+            rows: renglones del tablero.
+            cols: columnas del tablero (por omisión igual a rows).
+        """
+        self.rows = rows
+        self.cols = rows if cols is None else cols
+        n = self.rows*self.cols
+        self.masks = click_masks(self.rows, self.cols)
+
+        # Cada ecuación es (coeficientes, combinación): el renglón i de A es la máscara del clic i porque A
+        # es simétrica, y la combinación indica qué focos del tablero suman en la ecuación transformada.
+        coef = list(self.masks)
+        comb = [1 << i for i in range(n)]
+        pivots = []
+        rank = 0
+        for col in range(n):
+            bit = 1 << col
+            p = next((i for i in range(rank, n) if coef[i] & bit), None)
+            if p is None:
+                continue
+            coef[rank], coef[p] = coef[p], coef[rank]
+            comb[rank], comb[p] = comb[p], comb[rank]
+            cr, tr = coef[rank], comb[rank]
+            for i in range(n):
+                if i != rank and coef[i] & bit:
+                    coef[i] ^= cr
+                    comb[i] ^= tr
+            pivots.append(col)
+            rank += 1
+
+        self.rank = rank
+        self.pivots = pivots
+        # Ecuaciones de solución: x[pivots[k]] = paridad(comb[k] & b) con las variables libres en 0
+        self.solution_rows = comb[:rank]
+        # Ecuaciones 0 = paridad(comb & b): un tablero es soluble si todas se cumplen
+        self.constraints = comb[rank:]
+
+        # Base del espacio nulo: una variable libre en 1 y las pivote que la compensan
+        pivot_set = set(pivots)
+        self.null_basis = []
+        for f in range(n):
+            if f not in pivot_set:
+                v = 1 << f
+                for k, col in enumerate(pivots):
+                    if (coef[k] >> f) & 1:
+                        v |= 1 << col
+                self.null_basis.append(v)
+
+    @property
+    def nullity(self) -> int:
+        return len(self.null_basis)
+
+    def solvable(self, state: int) -> bool:
+        """ Indica si el tablero se puede apagar. """
+        return all(not (t & state).bit_count() & 1 for t in self.constraints)
+
+    def solve(self, state, minimize: bool = True) -> Optional[List[Tuple[int, int]]]:
+        """ Regresa la lista de clics (r, c) que apaga el tablero, o None si no tiene solución.
+
+            state: tablero (entero, o lista de renglones con 0/1).
+            minimize: si es True (y la dimensión del espacio nulo es a lo más MAX_NULLITY) la solución tiene
+                      el mínimo número de clics.
+        """
+        if not isinstance(state, int):
+            state = encode(state)
+        if not self.solvable(state):
+            return None
+
+        x = 0
+        for t, col in zip(self.solution_rows, self.pivots):
+            if (t & state).bit_count() & 1:
+                x |= 1 << col
+
+        if minimize and 0 < self.nullity <= MAX_NULLITY:
+            # Recorre las 2^d soluciones en código Gray: cada paso cambia un solo vector de la base
+            best, best_clicks = x, x.bit_count()
+            for i in range(1, 1 << self.nullity):
+                x ^= self.null_basis[(i & -i).bit_length() - 1]
+                clicks = x.bit_count()
+                if clicks < best_clicks:
+                    best, best_clicks = x, clicks
+            x = best
+
+        return [divmod(k, self.cols) for k in range(self.rows*self.cols) if (x >> k) & 1]
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------
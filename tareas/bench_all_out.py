@@ -0,0 +1,123 @@
+#---------------------------------------------------------------------------------------------------------------
+#    Comparación de los métodos para All Out / Lights Out
+#
+#    1) Los tres desafíos de 4x4 con BFS y A* (búsqueda de grafo) usando el PSA con tuplas del notebook
+#       all_out_puzzle.ipynb y el PSA con tableros de bits, y con el solucionador sobre GF(2).
+#    2) Tableros aleatorios solubles de 4x4 hasta 20x20 resueltos con GF(2).
+#
+#    Uso: python bench_all_out.py [--max-size N] [--boards K] [--seed S]
+#---------------------------------------------------------------------------------------------------------------
+
+import argparse
+import math
+import random
+import time
+
+from simpleai.search import SearchProblem, breadth_first, astar
+from simpleai.search.viewers import BaseViewer
+
+from all_out import BitboardAllOutProblem, GF2Solver, click_masks, apply_clicks
+
+#---------------------------------------------------------------------------------------------------------------
+#   PSA de referencia (estados como tuplas de 16 enteros, como en el notebook)
+#---------------------------------------------------------------------------------------------------------------
+
+SIZE = 4
+
+class TupleAllOutProblem(SearchProblem):
+    """ PSA del notebook: el estado es una tupla de 16 ints y cada clic reconstruye la tupla. """
+
+    def actions(self, state):
+        return [(r, c) for r in range(SIZE) for c in range(SIZE)]
+
+    def result(self, state, action):
+        r, c = action
+        s = list(state)
+        for dr, dc in [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]:
+            rr, cc = r + dr, c + dc
+            if 0 <= rr < SIZE and 0 <= cc < SIZE:
+                s[rr*SIZE + cc] = 1 - s[rr*SIZE + cc]
+        return tuple(s)
+
+    def is_goal(self, state):
+        return all(v == 0 for v in state)
+
+    def cost(self, state, action, state2):
+        return 1
+
+    def heuristic(self, state):
+        return int(math.ceil(sum(state) / 5.0))
+
+# Los tres desafíos del notebook
+BOARDS = [
+    [[0, 1, 0, 0], [1, 1, 1, 0], [0, 1, 0, 1], [0, 0, 1, 1]],
+    [[1, 0, 0, 0], [1, 1, 0, 0], [1, 1, 1, 1], [1, 0, 1, 0]],
+    [[1, 0, 1, 1], [0, 1, 1, 0], [1, 1, 0, 1], [1, 0, 1, 0]],
+]
+
+#---------------------------------------------------------------------------------------------------------------
+#   Programa
+#---------------------------------------------------------------------------------------------------------------
+
+def run(algo, make_problem):
+    """
+        Regresa (clics, nodos visitados, segundos) de una búsqueda de grafo. El tiempo se mide sin viewer
+        (BaseViewer procesa toda la frontera en cada iteración) y los nodos en una segunda corrida.
+    """
+    t0 = time.perf_counter()
+    node = algo(make_problem(), graph_search=True)
+    elapsed = time.perf_counter() - t0
+    viewer = BaseViewer()
+    algo(make_problem(), graph_search=True, viewer=viewer)
+    return len(node.path()) - 1, viewer.stats['visited_nodes'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara la búsqueda con el solucionador GF(2) de All Out.')
+    parser.add_argument('--max-size', type=int, default=20)
+    parser.add_argument('--boards', type=int, default=20, help='tableros aleatorios por tamaño')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print('%-10s %-6s %8s %10s %10s   %8s %10s %10s' % ('desafío', 'algo', 'clics', 'visitados', 'tupla (s)',
+                                                      'clics', 'visitados', 'bits (s)'))
+    solver = GF2Solver(SIZE)
+    for k, board in enumerate(BOARDS):
+        for name, algo in (('BFS', breadth_first), ('A*', astar)):
+            a = run(algo, lambda: TupleAllOutProblem(tuple(x for row in board for x in row)))
+            b = run(algo, lambda: BitboardAllOutProblem(board))
+            print('%-10d %-6s %8d %10d %10.4f   %8d %10d %10.4f' % ((k + 1, name) + a + b))
+        t0 = time.perf_counter()
+        clicks = solver.solve(board)
+        print('%-10d %-6s %8s %10s %10s   %8d %10s %10.6f' % (k + 1, 'GF(2)', '', '', '', len(clicks), '',
+                                                              time.perf_counter() - t0))
+
+    print()
+    print('%-8s %8s %14s %14s %10s' % ('tamaño', 'nulidad', 'eliminación (ms)', 'por tablero (ms)', 'clics'))
+    rng = random.Random(args.seed)
+    for n in range(4, args.max_size + 1):
+        t0 = time.perf_counter()
+        solver = GF2Solver(n)
+        t1 = time.perf_counter()
+        masks = click_masks(n, n)
+        boards = []
+        for _ in range(args.boards):
+            # Tableros solubles: se generan picando focos al azar desde el tablero apagado
+            state = 0
+            for _ in range(n*n):
+                state ^= masks[rng.randrange(n*n)]
+            boards.append(state)
+        t2 = time.perf_counter()
+        solutions = [solver.solve(b) for b in boards]
+        t3 = time.perf_counter()
+        assert all(apply_clicks(b, s, n, masks) == 0 for b, s in zip(boards, solutions))
+        print('%-8s %8d %14.2f %14.3f %10.1f' % ('%dx%d' % (n, n), solver.nullity, 1e3*(t1 - t0),
+                                                 1e3*(t3 - t2) / len(boards),
+                                                 sum(len(s) for s in solutions) / len(boards)))
+
+if __name__ == '__main__':
+    main()
+
+#---------------------------------------------------------------------------------------------------------------
+#   Fin del archivo
+#---------------------------------------------------------------------------------------------------------------